@@ -0,0 +1,476 @@
+"""
+αβ探索による自動プレイヤー
+
+negamax + αβ枝刈り（PVS）、反復深化、置換表（Zobristハッシュ）、
+置換表の手・キラー手・速攻（相手の着手可能数）・履歴・マスの重みによる手の並べ替え、
+並べ替えで後ろになった手を浅く読む削減（LMR）を行う。
+盤面は bitboard モジュールの (own, opp) 形式で扱う。
+"""
+
+import random
+import time
+
+from bitboard import (
+    OTHELLO_COL,
+    board_to_bits,
+    flips,
+    legal_moves,
+)
+from endgame import EndgameSolver, SolveTimeout, empties_for_time
+from mcts import MCTSPlayer
+
+INFINITY = 1 << 30
+# 終局時の評価値の倍率（評価関数の値より必ず大きくなるようにする）
+WIN_SCORE = 10000
+
+# 置換表のエントリの種類
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# 時間切れを確認する間隔（ノード数、2のべき乗 - 1）
+CHECK_INTERVAL = 1023
+# 手の並べ替えで速攻（相手の着手可能数）を使う残り深さ
+FASTEST_FIRST_DEPTH = 3
+# 並べ替えで REDUCTION_MOVES 番目以降の手は、残り深さ REDUCTION_DEPTH 以上なら1手浅く読む
+REDUCTION_DEPTH = 3
+REDUCTION_MOVES = 3
+# キラー手を覚える手数（パスを含む）
+MAX_PLY = 128
+# 思考時間のうち完全読みに使う割合（読み切れなければ残りで通常の探索をする）
+ENDGAME_TIME_SHARE = 0.5
+
+# マスの重み
+SQUARE_WEIGHTS = (
+    (100, -20, 10, 5, 5, 10, -20, 100),
+    (-20, -50, -2, -2, -2, -2, -50, -20),
+    (10, -2, -1, -1, -1, -1, -2, 10),
+    (5, -2, -1, -1, -1, -1, -2, 5),
+    (5, -2, -1, -1, -1, -1, -2, 5),
+    (10, -2, -1, -1, -1, -1, -2, 10),
+    (-20, -50, -2, -2, -2, -2, -50, -20),
+    (100, -20, 10, 5, 5, 10, -20, 100),
+)
+MOBILITY_WEIGHT = 8
+
+
+def _build_weight_masks():
+    """同じ重みのマスをまとめたビットマスクを作る"""
+    masks = {}
+    for row in range(8):
+        for col in range(8):
+            weight = SQUARE_WEIGHTS[row][col]
+            masks[weight] = masks.get(weight, 0) | (1 << (row * OTHELLO_COL + col))
+    return tuple(masks.items())
+
+
+WEIGHT_MASKS = _build_weight_masks()
+# 手の並べ替え用のマスの重み（ビット番号順）
+SQUARE_ORDER = tuple(SQUARE_WEIGHTS[sq >> 3][sq & 7] for sq in range(64))
+
+
+def _build_zobrist_tables(seed=0x0E110):
+    """バイトごとのZobrist乱数表を作る（シード固定で常に同じ値になる）"""
+    rng = random.Random(seed)
+    own = tuple(tuple(rng.getrandbits(64) for _ in range(256)) for _ in range(8))
+    opp = tuple(tuple(rng.getrandbits(64) for _ in range(256)) for _ in range(8))
+    return own, opp
+
+
+ZOBRIST_OWN, ZOBRIST_OPP = _build_zobrist_tables()
+
+
+def zobrist(own, opp):
+    """
+    局面の64ビットZobristハッシュを計算する。
+
+    マスごとの乱数を8マス(1バイト)単位でまとめた表を引くので、
+    石の数によらず16回の表引きで済む。
+    """
+    h = 0
+    for i in range(8):
+        h ^= ZOBRIST_OWN[i][own & 0xFF] ^ ZOBRIST_OPP[i][opp & 0xFF]
+        own >>= 8
+        opp >>= 8
+    return h
+
+
+def evaluate(own, opp, own_moves=None):
+    """手番側から見た局面の評価値（マスの重み + 着手可能数の差）"""
+    score = 0
+    for weight, mask in WEIGHT_MASKS:
+        score += weight * ((own & mask).bit_count() - (opp & mask).bit_count())
+    if own_moves is None:
+        own_moves = legal_moves(own, opp)
+    mobility = own_moves.bit_count() - legal_moves(opp, own).bit_count()
+    return score + MOBILITY_WEIGHT * mobility
+
+
+def final_score(own, opp):
+    """終局時の評価値（石数差に WIN_SCORE を掛けたもの）"""
+    return (own.bit_count() - opp.bit_count()) * WIN_SCORE
+
+
+class SearchTimeout(Exception):
+    """探索の制限時間を超えた"""
+
+
+class TranspositionTable:
+    """
+    固定サイズの置換表。
+
+    各スロットには1局面だけを保持し、衝突時は
+    「古い探索世代のエントリ」か「探索深さが同じか浅いエントリ」を置き換える。
+    """
+
+    def __init__(self, size_bits=20):
+        self.mask = (1 << size_bits) - 1
+        self.entries = [None] * (1 << size_bits)
+        self.generation = 0
+
+    def new_search(self):
+        """探索世代を進める（前回の探索のエントリを置き換え対象にする）"""
+        self.generation += 1
+
+    def probe(self, key):
+        """(深さ, 種類, 評価値, 最善手) を返す。見つからなければ None"""
+        entry = self.entries[key & self.mask]
+        if entry is not None and entry[0] == key:
+            return entry[1:5]
+        return None
+
+    def store(self, key, depth, flag, value, move):
+        """置き換え方針に従ってエントリを保存"""
+        index = key & self.mask
+        old = self.entries[index]
+        if (old is None or old[0] == key or old[5] != self.generation
+                or depth >= old[1]):
+            self.entries[index] = (key, depth, flag, value, move, self.generation)
+
+    def clear(self):
+        """全エントリを消去"""
+        self.entries = [None] * (self.mask + 1)
+        self.generation = 0
+
+
+class AlphaBetaPlayer:
+    """
+    反復深化αβ探索で手を選ぶ自動プレイヤー。
+
+    Args:
+        time_limit (float): 1手あたりの思考時間（秒）
+        max_depth (int): 最大探索深さ
+        tt_bits (int): 置換表のサイズ（2のべき乗の指数）
+        endgame_empties (int): 空きマスがこの数以下なら完全読みに切り替える
+                               （None なら思考時間の ENDGAME_TIME_SHARE で読み切れる数）
+        book (OpeningBook): 定石（定石にある局面では探索しない）
+    """
+
+    def __init__(self, time_limit=1.0, max_depth=60, tt_bits=20, endgame_empties=None,
+                 book=None):
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.tt = TranspositionTable(tt_bits)
+        if endgame_empties is None:
+            endgame_empties = empties_for_time(time_limit * ENDGAME_TIME_SHARE)
+        self.endgame_empties = endgame_empties
+        self.solver = EndgameSolver()
+        self.book = book
+        self.nodes = 0
+        self.deadline = 0.0
+        # 直前の探索結果 (到達深さ, 評価値, ノード数, 経過時間)
+        self.last_info = None
+
+    def new_game(self, seed=None):
+        """
+        対局の始めに呼ぶ。前の対局の置換表と探索結果を捨てる。
+
+        Args:
+            seed (int): 乱数シード（このプレイヤーは乱数を使わない）
+        """
+        self.tt.clear()
+        self.solver.tt.clear()
+        self.last_info = None
+
+    def search(self, own, opp):
+        """
+        手番側の最善手を探索する。
+
+        Returns:
+            tuple: (最善手のビット番号, 評価値)。合法手がなければ (None, 0)
+        """
+        moves = legal_moves(own, opp)
+        if not moves:
+            return None, 0
+
+        start = time.perf_counter()
+        if self.book is not None:
+            book_move = self.book.best_move(own, opp)
+            if book_move is not None:
+                self.last_info = (0, 0, 0, time.perf_counter() - start)
+                return book_move, 0
+
+        self.deadline = start + self.time_limit
+        self.nodes = 0
+        self.tt.new_search()
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = [0] * 64
+
+        best_move = self._order_moves(own, opp, moves, None, 1, 0)[0]
+        if moves & (moves - 1) == 0:
+            # 1手しかない
+            self.last_info = (0, 0, 0, 0.0)
+            return best_move, 0
+
+        empties = 64 - (own | opp).bit_count()
+        if empties <= self.endgame_empties:
+            # 読み切れなければ残りの時間で通常の探索を行う
+            try:
+                margin, solved_move = self.solver.solve(
+                    own, opp, deadline=start + self.time_limit * ENDGAME_TIME_SHARE)
+            except SolveTimeout:
+                pass
+            else:
+                self.last_info = (empties, margin * WIN_SCORE, self.solver.nodes,
+                                  time.perf_counter() - start)
+                return solved_move, margin * WIN_SCORE
+
+        best_score = 0
+        depth = 0
+        for depth in range(1, min(self.max_depth, empties) + 1):
+            try:
+                move, score = self._search_root(own, opp, moves, depth, best_move)
+            except SearchTimeout:
+                depth -= 1
+                break
+            best_move, best_score = move, score
+            # 勝敗が確定したら打ち切り
+            if abs(score) >= WIN_SCORE:
+                break
+            if time.perf_counter() >= self.deadline:
+                break
+
+        self.last_info = (depth, best_score, self.nodes, time.perf_counter() - start)
+        return best_move, best_score
+
+    def close(self):
+        """後始末（MCTSPlayer と同じ使い方ができるようにするためのもの）"""
+
+    def choose_move(self, board, turn, empty):
+        """
+        board[row][col] 形式の盤面で手を選ぶ。
+
+        Returns:
+            tuple: (row, col)。置ける場所がなければ None
+        """
+        own, opp = board_to_bits(board, turn, empty)
+        move, _ = self.search(own, opp)
+        if move is None:
+            return None
+        return divmod(move, OTHELLO_COL)
+
+    def _search_root(self, own, opp, moves, depth, pv_move):
+        """ルート局面の探索"""
+        alpha = -INFINITY
+        beta = INFINITY
+        best_move = pv_move
+        for i, sq in enumerate(self._order_moves(own, opp, moves, pv_move, depth, 0)):
+            f = flips(own, opp, sq)
+            child_own = opp ^ f
+            child_opp = own | f | (1 << sq)
+            if i == 0:
+                score = -self._negamax(child_own, child_opp, depth - 1, -beta, -alpha, 1)
+            else:
+                score = -self._negamax(child_own, child_opp, depth - 1, -alpha - 1, -alpha, 1)
+                if alpha < score < beta:
+                    score = -self._negamax(child_own, child_opp, depth - 1, -beta, -score, 1)
+            if score > alpha:
+                alpha = score
+                best_move = sq
+        self.tt.store(zobrist(own, opp), depth, EXACT, alpha, best_move)
+        return best_move, alpha
+
+    def _negamax(self, own, opp, depth, alpha, beta, ply):
+        """negamax + αβ枝刈り（PVS）"""
+        self.nodes += 1
+        if not self.nodes & CHECK_INTERVAL and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+
+        moves = legal_moves(own, opp)
+        if not moves:
+            if not legal_moves(opp, own):
+                return final_score(own, opp)
+            # パス（深さは消費しない）
+            return -self._negamax(opp, own, depth, -beta, -alpha, ply + 1)
+
+        if depth <= 0:
+            return evaluate(own, opp, moves)
+
+        key = zobrist(own, opp)
+        tt_move = None
+        entry = self.tt.probe(key)
+        if entry is not None:
+            tt_depth, flag, value, tt_move = entry
+            if tt_depth >= depth:
+                if flag == EXACT:
+                    return value
+                if flag == LOWER and value >= beta:
+                    return value
+                if flag == UPPER and value <= alpha:
+                    return value
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = None
+        for i, sq in enumerate(self._order_moves(own, opp, moves, tt_move, depth, ply)):
+            # ひっくり返る石は探索する手だけ求める（βカットの後の手は求めない）
+            f = flips(own, opp, sq)
+            child_own = opp ^ f
+            child_opp = own | f | (1 << sq)
+            if i == 0:
+                score = -self._negamax(child_own, child_opp, depth - 1, -beta, -alpha, ply + 1)
+            else:
+                if depth >= REDUCTION_DEPTH and i >= REDUCTION_MOVES:
+                    # 並べ替えの後ろの手は浅く読み、α を超えたときだけ読み直す
+                    score = -self._negamax(child_own, child_opp, depth - 2, -alpha - 1, -alpha,
+                                           ply + 1)
+                else:
+                    score = alpha + 1
+                if score > alpha:
+                    score = -self._negamax(child_own, child_opp, depth - 1, -alpha - 1, -alpha,
+                                           ply + 1)
+                if alpha < score < beta:
+                    score = -self._negamax(child_own, child_opp, depth - 1, -beta, -score,
+                                           ply + 1)
+            if score > best_score:
+                best_score = score
+                best_move = sq
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        self._record_cutoff(sq, depth, ply)
+                        break
+
+        if best_score <= original_alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(key, depth, flag, best_score, best_move)
+        return best_score
+
+    def _record_cutoff(self, sq, depth, ply):
+        """βカットを起こした手をキラー手と履歴に記録する"""
+        killers = self.killers[ply]
+        if killers[0] != sq:
+            killers[1] = killers[0]
+            killers[0] = sq
+        self.history[sq] += depth * depth
+
+    def _order_moves(self, own, opp, moves, first, depth, ply):
+        """
+        手を有望な順に並べ、ビット番号のリストを返す。
+
+        置換表の手, キラー手の順に先頭に置き、残りは深い探索では相手の着手可能数が少ない順
+        （速攻）、浅い探索では履歴（βカットを起こした回数）とマスの重みの順に並べる。
+        """
+        killers = self.killers[ply]
+        history = self.history
+        keyed = []
+        while moves:
+            low = moves & -moves
+            sq = low.bit_length() - 1
+            moves ^= low
+            if sq == first:
+                key = -INFINITY
+            elif sq == killers[0]:
+                key = -INFINITY + 1
+            elif sq == killers[1]:
+                key = -INFINITY + 2
+            elif depth >= FASTEST_FIRST_DEPTH:
+                f = flips(own, opp, sq)
+                key = (legal_moves(opp ^ f, own | f | low).bit_count() * 16
+                       - SQUARE_ORDER[sq])
+            else:
+                key = -history[sq] - SQUARE_ORDER[sq]
+            keyed.append((key, sq))
+        keyed.sort()
+        return [sq for _, sq in keyed]
+
+
+class RandomPlayer:
+    """合法手からランダムに選ぶプレイヤー（対戦相手・動作確認用）"""
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.last_info = None
+
+    def new_game(self, seed=None):
+        """対局の始めに呼ぶ。乱数を seed で設定し直す"""
+        self.rng.seed(seed)
+        self.last_info = None
+
+    def close(self):
+        """後始末（何もしない）"""
+
+    def search(self, own, opp):
+        """ランダムな合法手を (ビット番号, 0) で返す。なければ (None, 0)"""
+        moves = legal_moves(own, opp)
+        if not moves:
+            return None, 0
+        for _ in range(self.rng.randrange(moves.bit_count())):
+            moves &= moves - 1
+        return (moves & -moves).bit_length() - 1, 0
+
+    def choose_move(self, board, turn, empty):
+        """board[row][col] 形式の盤面で (row, col) を返す。なければ None"""
+        move, _ = self.search(*board_to_bits(board, turn, empty))
+        return divmod(move, OTHELLO_COL) if move is not None else None
+
+
+class GreedyPlayer(RandomPlayer):
+    """マスの重みとひっくり返す石の数で1手だけ読むプレイヤー"""
+
+    def search(self, own, opp):
+        """評価が最大の手を (ビット番号, 評価値) で返す。なければ (None, 0)"""
+        best_move = None
+        best_score = -INFINITY
+        moves = legal_moves(own, opp)
+        while moves:
+            low = moves & -moves
+            sq = low.bit_length() - 1
+            moves ^= low
+            score = SQUARE_ORDER[sq] * 4 + flips(own, opp, sq).bit_count()
+            # 同点ならランダムに選ぶ
+            if score > best_score or (score == best_score and self.rng.random() < 0.5):
+                best_move, best_score = sq, score
+        if best_move is None:
+            return None, 0
+        return best_move, best_score
+
+
+ENGINES = ("alphabeta", "mcts", "greedy", "random")
+
+
+def create_player(engine, time_limit=1.0, book=None, rave=False, workers=1, seed=None):
+    """
+    名前を指定して自動プレイヤーを作る。
+
+    Args:
+        engine (str): ENGINES のいずれか
+        time_limit (float): 1手あたりの思考時間（秒）
+        book (OpeningBook): αβ探索で使う定石
+        rave (bool): MCTS で RAVE を使うか
+        workers (int): MCTS のワーカープロセス数（省略時は1, 0 ならCPU数）
+        seed (int): random / greedy の乱数シード
+    """
+    if engine == "alphabeta":
+        return AlphaBetaPlayer(time_limit=time_limit, book=book)
+    if engine == "mcts":
+        return MCTSPlayer(time_limit=time_limit, workers=workers, rave=rave)
+    if engine == "greedy":
+        return GreedyPlayer(seed)
+    if engine == "random":
+        return RandomPlayer(seed)
+    raise ValueError(f"unknown engine: {engine}")
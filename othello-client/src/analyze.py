@@ -0,0 +1,315 @@
+"""
+対局の集計（棋譜ストアや棋譜ファイルをまとめて分析する）
+
+序盤の出現数, 初手ごとの勝率, 平均石数差, パスの頻度を数える。
+1局ずつ「読み込み → 復号 → 再生 → 集計」のジェネレータを通すので、
+対局数が多くても使うメモリは変わらない。
+入力はセグメント（棋譜ストア）や一定のバイト数（棋譜ファイル）ごとに分けて
+プロセスプールで並列に集計し、最後に結果を足し合わせる。
+
+使い方:
+    python analyze.py games/ results.jsonl --opening-plies 4 --top 10
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from bitboard import flips, parse_moves, replay, square_name
+from gamestore import FLAG_TRUNCATED, GameStore, decode_record, segment_paths
+
+# 序盤として数える手数の既定値
+DEFAULT_OPENING_PLIES = 4
+# 棋譜ファイルを分けるバイト数
+DEFAULT_CHUNK_BYTES = 32 << 20
+
+
+class GameStats:
+    """
+    対局の集計結果（ワーカーごとに作り、merge で足し合わせる）
+
+    Args:
+        opening_plies (int): 序盤として数える手数
+    """
+
+    def __init__(self, opening_plies=DEFAULT_OPENING_PLIES):
+        self.opening_plies = opening_plies
+        self.games = 0
+        self.invalid = 0  # 再生できなかった対局
+        self.truncated = 0  # 最後の手が欠けている対局
+        self.results = [0, 0, 0]  # 黒勝ち, 白勝ち, 引き分け
+        self.margin_total = 0  # 黒から見た石数差の合計
+        self.moves_total = 0
+        self.passes = 0
+        self.games_with_pass = 0
+        self.openings = {}  # 序盤の棋譜表記 -> 対局数
+        self.first_moves = {}  # 初手 -> [黒勝ち, 白勝ち, 引き分け]
+
+    def add(self, game):
+        """再生済みの対局（replay_games が返す辞書）を1局加える"""
+        self.games += 1
+        if game["flags"] & FLAG_TRUNCATED:
+            self.truncated += 1
+        result = (0, 1, 2)[game["winner"]]  # winner == -1 は引き分け
+        self.results[result] += 1
+        self.margin_total += game["black_score"] - game["white_score"]
+        self.moves_total += len(game["moves"])
+        self.passes += game["passes"]
+        if game["passes"]:
+            self.games_with_pass += 1
+
+        moves = game["moves"]
+        if len(moves) >= self.opening_plies:
+            opening = "".join(square_name(sq) for sq in moves[:self.opening_plies])
+            self.openings[opening] = self.openings.get(opening, 0) + 1
+        if moves:
+            entry = self.first_moves.setdefault(square_name(moves[0]), [0, 0, 0])
+            entry[result] += 1
+
+    def merge(self, other):
+        """別の集計結果を足し合わせる"""
+        for name in ("games", "invalid", "truncated", "margin_total", "moves_total", "passes",
+                     "games_with_pass"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for i, count in enumerate(other.results):
+            self.results[i] += count
+        for opening, count in other.openings.items():
+            self.openings[opening] = self.openings.get(opening, 0) + count
+        for move, counts in other.first_moves.items():
+            entry = self.first_moves.setdefault(move, [0, 0, 0])
+            for i, count in enumerate(counts):
+                entry[i] += count
+
+    def report(self, top=10):
+        """集計結果を辞書にまとめる"""
+        games = self.games or 1
+        openings = sorted(self.openings.items(), key=lambda item: (-item[1], item[0]))[:top]
+        first_moves = {}
+        for move, (black, white, draw) in sorted(self.first_moves.items()):
+            total = black + white + draw
+            first_moves[move] = {
+                "games": total,
+                "black_win_rate": round(black / total, 4),
+                "white_win_rate": round(white / total, 4),
+                "draw_rate": round(draw / total, 4),
+            }
+        return {
+            "games": self.games,
+            "invalid": self.invalid,
+            "truncated": self.truncated,
+            "black_wins": self.results[0],
+            "white_wins": self.results[1],
+            "draws": self.results[2],
+            "average_margin": round(self.margin_total / games, 3),
+            "average_moves": round(self.moves_total / games, 3),
+            "passes_per_game": round(self.passes / games, 4),
+            "games_with_pass": self.games_with_pass,
+            "openings": [{"moves": moves, "games": count} for moves, count in openings],
+            "first_moves": first_moves,
+        }
+
+
+# ---- 入力の分割 ----
+
+def plan_shards(paths, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """
+    入力を並列に処理できる単位に分ける。
+
+    Yields:
+        tuple: ("store", ディレクトリ, セグメント番号) または ("text", パス, 開始位置, 終了位置)
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            segment = 0
+            while os.path.exists(segment_paths(path, segment)[1]):
+                yield ("store", path, segment)
+                segment += 1
+        else:
+            size = os.path.getsize(path)
+            for start in range(0, max(size, 1), chunk_bytes):
+                yield ("text", path, start, min(start + chunk_bytes, size))
+
+
+# ---- パイプラインの各段 ----
+
+def read_shard(shard):
+    """
+    分割した入力から生のレコードを順に返す。
+
+    Yields:
+        tuple: ("store", 対局番号, mmap, 位置) または ("text", 行)
+    """
+    if shard[0] == "store":
+        _, directory, segment = shard
+        with GameStore(directory) as store:
+            for game_id in store.segment_ids(segment):
+                yield ("store", game_id, *store.locate(game_id))
+        return
+
+    # 行の途中から始まる範囲は次の行から読み、終了位置をまたぐ行までを担当する
+    _, path, start, end = shard
+    with open(path, "rb") as f:
+        if start:
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            yield ("text", line)
+
+
+def decode_games(records):
+    """レコードを対局の辞書にする（棋譜ファイルの石数と勝者は再生して決める）"""
+    for record in records:
+        if record[0] == "store":
+            _, game_id, data, offset = record
+            yield decode_record(data, offset, game_id)
+            continue
+
+        line = record[1].decode("utf-8", errors="replace").strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            if line.startswith("{"):
+                result = json.loads(line)
+                moves = parse_moves(result["moves"])
+            else:
+                moves = parse_moves(line.split()[0])
+        except (ValueError, KeyError):
+            moves = None
+        yield {"moves": moves, "black_score": None, "white_score": None, "winner": None,
+               "flags": 0}
+
+
+def replay_games(games, stats):
+    """
+    着手を再生してパスの回数と最終局面を求める（再生できない対局は数えて捨てる）。
+
+    記録に石数がない対局は最終局面の石数と勝者を入れる。
+    """
+    for game in games:
+        moves = game["moves"]
+        if moves is None:
+            stats.invalid += 1
+            continue
+        passes = 0
+        expected = True  # パスがなければ次は黒番
+        position = None
+        try:
+            for own, opp, sq, black_to_move in replay(moves):
+                if black_to_move != expected:
+                    passes += 1
+                expected = not black_to_move
+                position = (own, opp, sq, black_to_move)
+        except ValueError:
+            stats.invalid += 1
+            continue
+        game["passes"] = passes
+
+        if game["black_score"] is None:
+            if position is None:
+                black_score = white_score = 2
+            else:
+                own, opp, sq, black_to_move = position
+                f = flips(own, opp, sq)
+                mover = (own | f | (1 << sq)).bit_count()
+                other = (opp ^ f).bit_count()
+                black_score, white_score = (mover, other) if black_to_move else (other, mover)
+            game["black_score"] = black_score
+            game["white_score"] = white_score
+        if game["winner"] is None:
+            margin = game["black_score"] - game["white_score"]
+            game["winner"] = 0 if margin > 0 else 1 if margin < 0 else -1
+        yield game
+
+
+def analyze_shard(shard, opening_plies=DEFAULT_OPENING_PLIES):
+    """1つの分割を集計する（ワーカープロセスで実行）"""
+    stats = GameStats(opening_plies)
+    for game in replay_games(decode_games(read_shard(shard)), stats):
+        stats.add(game)
+    return stats
+
+
+def analyze(paths, opening_plies=DEFAULT_OPENING_PLIES, workers=1,
+            chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """
+    入力をすべて集計する。
+
+    Args:
+        paths (list): 棋譜ストアのディレクトリか棋譜ファイル（1行1局、arena.py の結果も可）
+        opening_plies (int): 序盤として数える手数
+        workers (int): ワーカープロセス数（1ならこのプロセスで処理）
+        chunk_bytes (int): 棋譜ファイルを分けるバイト数
+
+    Returns:
+        GameStats: 集計結果
+    """
+    total = GameStats(opening_plies)
+    shards = plan_shards(paths, chunk_bytes)
+    if workers == 1:
+        for shard in shards:
+            total.merge(analyze_shard(shard, opening_plies))
+        return total
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(analyze_shard, shard, opening_plies) for shard in shards]
+        for future in as_completed(futures):
+            total.merge(future.result())
+    return total
+
+
+def print_report(report):
+    """集計結果を表で表示する"""
+    games = report["games"]
+    print(f"games: {games}  invalid: {report['invalid']}  truncated: {report['truncated']}")
+    if not games:
+        return
+    print(f"black wins: {report['black_wins']}  white wins: {report['white_wins']}  "
+          f"draws: {report['draws']}")
+    print(f"average margin (black - white): {report['average_margin']:+.2f}  "
+          f"average moves: {report['average_moves']:.1f}")
+    print(f"passes per game: {report['passes_per_game']:.3f}  "
+          f"games with pass: {report['games_with_pass']} "
+          f"({report['games_with_pass'] / games:.1%})")
+    print("openings:")
+    for entry in report["openings"]:
+        print(f"  {entry['moves']}  {entry['games']} ({entry['games'] / games:.1%})")
+    print("first moves:")
+    for move, entry in report["first_moves"].items():
+        print(f"  {move}  games: {entry['games']}  black: {entry['black_win_rate']:.1%}  "
+              f"white: {entry['white_win_rate']:.1%}  draw: {entry['draw_rate']:.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="棋譜ストアや棋譜ファイルの対局を集計する")
+    parser.add_argument("inputs", nargs="+",
+                        help="棋譜ストアのディレクトリか棋譜ファイル（1行1局、arena.py の結果も可）")
+    parser.add_argument("--opening-plies", type=int, default=DEFAULT_OPENING_PLIES,
+                        help="序盤として数える手数")
+    parser.add_argument("--top", type=int, default=10, help="表示する序盤の数")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="ワーカープロセス数")
+    parser.add_argument("--chunk-mb", type=int, default=DEFAULT_CHUNK_BYTES >> 20,
+                        help="棋譜ファイルを分けるサイズ（MB）")
+    parser.add_argument("--json", action="store_true", help="結果を JSON で出力する")
+    args = parser.parse_args()
+
+    for path in args.inputs:
+        if not os.path.exists(path):
+            parser.error(f"{path} が見つかりません")
+
+    stats = analyze(args.inputs, args.opening_plies, args.workers, args.chunk_mb << 20)
+    report = stats.report(args.top)
+    if args.json:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+自動プレイヤー同士の対戦場（画面・ソケットなし）
+
+対局をプロセスプールに分散し、終わった対局から順に1行1局の JSON で結果を書き出す。
+
+使い方:
+    python arena.py --black alphabeta:0.1 --white mcts:0.1 --games 1000 -o results.jsonl
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from ai import ENGINES, create_player
+from bitboard import (
+    INITIAL_BLACK,
+    INITIAL_WHITE,
+    flips,
+    legal_moves,
+    parse_moves,
+    replay,
+    square_name,
+)
+
+# ワーカープロセスごとに作ったプレイヤー（置換表などのメモリを対局間で使い回す）
+# キーは (プレイヤー指定, 色)。同じ指定どうしの対局でも黒と白は別のプレイヤーにする
+_players = {}
+
+
+def parse_player(spec):
+    """
+    'エンジン名[:思考時間]' を (エンジン名, 思考時間) に変換する。
+
+    例: 'alphabeta:0.1', 'mcts:0.5', 'random'
+    """
+    engine, _, limit = spec.partition(":")
+    if engine not in ENGINES:
+        raise ValueError(f"unknown engine: {engine}")
+    return engine, float(limit) if limit else 0.1
+
+
+def _get_player(spec, colour, seed):
+    """
+    ワーカープロセス内でプレイヤーを作る（作成済みなら使い回す）。
+
+    使い回すプレイヤーも new_game で置換表などの前の対局の状態を捨て、
+    乱数を対局のシードから設定し直すので、
+    対局の結果はどのワーカーが何局目に打ったかによらない。
+
+    Args:
+        spec (str): プレイヤー指定
+        colour (int): 0: 黒, 1: 白
+        seed (int): 対局の乱数シード
+    """
+    player = _players.get((spec, colour))
+    if player is None:
+        engine, time_limit = parse_player(spec)
+        # 並列化は対局単位で行うので MCTS はプロセスを増やさない
+        player = create_player(engine, time_limit=time_limit, workers=1)
+        _players[(spec, colour)] = player
+    player.new_game(seed * 2 + colour)
+    return player
+
+
+def random_opening(rng, plies):
+    """ランダムに plies 手打った序盤の着手列を作る（終局してしまう場合は途中まで）"""
+    own, opp = INITIAL_BLACK, INITIAL_WHITE
+    moves = []
+    while len(moves) < plies:
+        candidates = legal_moves(own, opp)
+        if not candidates:
+            if not legal_moves(opp, own):
+                break
+            own, opp = opp, own
+            continue
+        for _ in range(rng.randrange(candidates.bit_count())):
+            candidates &= candidates - 1
+        sq = (candidates & -candidates).bit_length() - 1
+        f = flips(own, opp, sq)
+        own, opp = opp ^ f, own | f | (1 << sq)
+        moves.append(sq)
+    return moves
+
+
+def play_game(game_id, black_spec, white_spec, opening, seed):
+    """
+    1局対戦させる。
+
+    Args:
+        game_id (int): 対局番号
+        black_spec (str): 黒のプレイヤー指定
+        white_spec (str): 白のプレイヤー指定
+        opening (list): 序盤の着手（ビット番号）
+        seed (int): プレイヤーの乱数シード
+
+    Returns:
+        dict: 対局結果
+    """
+    start = time.perf_counter()
+    players = (_get_player(black_spec, 0, seed), _get_player(white_spec, 1, seed))
+    think_time = [0.0, 0.0]
+    moves = list(opening)
+
+    # 序盤の着手を再生して現在の局面を作る
+    own, opp = INITIAL_BLACK, INITIAL_WHITE
+    side = 0  # 0: 黒番, 1: 白番
+    for p_own, p_opp, sq, black_to_move in replay(opening):
+        f = flips(p_own, p_opp, sq)
+        own, opp = p_opp ^ f, p_own | f | (1 << sq)
+        side = 1 if black_to_move else 0
+
+    passed = False
+    while True:
+        if not legal_moves(own, opp):
+            if passed or not legal_moves(opp, own):
+                break
+            passed = True
+            own, opp = opp, own
+            side ^= 1
+            continue
+        passed = False
+
+        t = time.perf_counter()
+        sq, _ = players[side].search(own, opp)
+        think_time[side] += time.perf_counter() - t
+
+        f = flips(own, opp, sq)
+        own, opp = opp ^ f, own | f | (1 << sq)
+        moves.append(sq)
+        side ^= 1
+
+    black, white = (own, opp) if side == 0 else (opp, own)
+    black_score = black.bit_count()
+    white_score = white.bit_count()
+    return {
+        "id": game_id,
+        "black": black_spec,
+        "white": white_spec,
+        "opening": len(opening),
+        "moves": "".join(square_name(sq) for sq in moves),
+        "black_score": black_score,
+        "white_score": white_score,
+        # サーバーと同じく 0: 黒勝ち, 1: 白勝ち, -1: 引き分け
+        "winner": 0 if black_score > white_score else 1 if white_score > black_score else -1,
+        "black_time": round(think_time[0], 4),
+        "white_time": round(think_time[1], 4),
+        "time": round(time.perf_counter() - start, 4),
+    }
+
+
+def play_batch(tasks):
+    """ワーカープロセスで複数の対局をまとめて行う"""
+    return [play_game(*task) for task in tasks]
+
+
+def generate_tasks(args):
+    """対局の引数を順に作る（swap 指定時は同じ序盤で先後を入れ替えて2局ずつ）"""
+    rng = random.Random(args.seed)
+    openings = []
+    if args.openings:
+        with open(args.openings, encoding="utf-8") as f:
+            openings = [parse_moves(line.split()[0]) for line in f
+                        if line.strip() and not line.startswith("#")]
+
+    game_id = 0
+    index = 0
+    while game_id < args.games:
+        if openings:
+            opening = openings[index % len(openings)]
+        else:
+            opening = random_opening(rng, args.random_plies)
+        index += 1
+
+        pairs = [(args.black, args.white)]
+        if args.swap:
+            pairs.append((args.white, args.black))
+        for black_spec, white_spec in pairs:
+            if game_id >= args.games:
+                break
+            yield game_id, black_spec, white_spec, opening, rng.getrandbits(32)
+            game_id += 1
+
+
+def run(args, out):
+    """対局を実行し、終わった順に結果を out に書き出す。集計結果を返す"""
+    summary = {}
+    tasks = generate_tasks(args)
+    started = time.perf_counter()
+    finished = 0
+
+    def record(result):
+        nonlocal finished
+        out.write(json.dumps(result, ensure_ascii=False, separators=(",", ":")) + "\n")
+        finished += 1
+        for color, spec in ((0, result["black"]), (1, result["white"])):
+            stats = summary.setdefault(spec, {"games": 0, "wins": 0, "draws": 0, "discs": 0})
+            stats["games"] += 1
+            if result["winner"] == color:
+                stats["wins"] += 1
+            elif result["winner"] == -1:
+                stats["draws"] += 1
+            stats["discs"] += result["black_score"] if color == 0 else result["white_score"]
+        if args.progress and finished % args.progress == 0:
+            rate = finished / (time.perf_counter() - started)
+            print(f"{finished} games ({rate:.1f} games/s)", file=sys.stderr)
+
+    def next_batch():
+        batch = []
+        for task in tasks:
+            batch.append(task)
+            if len(batch) >= args.batch:
+                break
+        return batch
+
+    if args.workers == 1:
+        while True:
+            batch = next_batch()
+            if not batch:
+                break
+            for result in play_batch(batch):
+                record(result)
+            out.flush()
+        return summary
+
+    # 投入中のバッチ数を制限して、対局数が多くてもメモリを使いすぎないようにする
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        pending = set()
+        while True:
+            while len(pending) < args.workers * 2:
+                batch = next_batch()
+                if not batch:
+                    break
+                pending.add(executor.submit(play_batch, batch))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for result in future.result():
+                    record(result)
+            out.flush()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="自動プレイヤー同士を対戦させる")
+    parser.add_argument("--black", default="alphabeta:0.1",
+                        help=f"黒のプレイヤー（{'/'.join(ENGINES)}[:思考時間]）")
+    parser.add_argument("--white", default="random", help="白のプレイヤー")
+    parser.add_argument("-n", "--games", type=int, default=100, help="対局数")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="ワーカープロセス数")
+    parser.add_argument("--batch", type=int, default=4, help="1回でワーカーに渡す対局数")
+    parser.add_argument("--random-plies", type=int, default=4,
+                        help="ランダムに打つ序盤の手数")
+    parser.add_argument("--openings", help="序盤の着手列のファイル（1行1つ, 例: f5d6c3）")
+    parser.add_argument("--no-swap", dest="swap", action="store_false",
+                        help="同じ序盤で先後を入れ替えた対局を行わない")
+    parser.add_argument("--seed", type=int, help="乱数シード")
+    parser.add_argument("-o", "--output", default="-", help="結果の出力先（'-' で標準出力）")
+    parser.add_argument("--progress", type=int, default=0,
+                        help="この対局数ごとに進捗を表示（0で表示しない）")
+    args = parser.parse_args()
+
+    for spec in (args.black, args.white):
+        try:
+            parse_player(spec)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.output == "-":
+        summary = run(args, sys.stdout)
+    else:
+        with open(args.output, "a", encoding="utf-8") as out:
+            summary = run(args, out)
+
+    for spec, stats in summary.items():
+        print(f"{spec}: games={stats['games']} wins={stats['wins']} draws={stats['draws']} "
+              f"avg_discs={stats['discs'] / stats['games']:.1f}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
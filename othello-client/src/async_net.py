@@ -0,0 +1,171 @@
+"""
+asyncio による非同期通信
+
+1つのイベントループ（専用のデーモンスレッド）が全接続のソケットを持ち、
+StreamReader で受信し、送信キューに積まれたデータを順に書き込む。
+受信して JSON に変換したメッセージは接続ごとのキューに入れ、
+描画ループ側が poll() で取り出して処理する。
+メッセージには受信した時刻と解析にかかった時間も付けておく（poll_timed() で取り出せる）。
+ゲーム状態を書き換えるのは poll() を呼ぶスレッドだけになるので、
+描画中に受信スレッドが盤面を書き換えることはない。
+"""
+
+import asyncio
+import queue
+import threading
+import time
+
+from framing import FrameDecoder
+
+# 1回に読み込む最大バイト数
+BUFFER_SIZE = 4096
+
+# poll() が返すイベントの種類
+MESSAGE = "message"
+ERROR = "error"
+CLOSED = "closed"
+
+
+class NetworkLoop:
+    """複数の接続で共有するイベントループ"""
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name="network-loop", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    @classmethod
+    def default(cls):
+        """プロセス内で共有する既定のループ（初回に作成）"""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    def submit(self, coro):
+        """コルーチンをループで実行する（concurrent.futures.Future を返す）"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call_soon(self, callback, *args):
+        """ループのスレッドで callback を呼ぶ"""
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def stop(self):
+        """ループを止めてスレッドの終了を待つ"""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+class AsyncConnection:
+    """
+    接続済みソケット1本をイベントループで読み書きする。
+
+    Args:
+        sock (socket.socket): 接続済みのソケット
+        network_loop (NetworkLoop): 使うループ（省略時は共有のループ）
+        on_event: イベントを inbox に入れるたびにループのスレッドから呼ぶ関数
+                  （描画ループを起こすためなど。すぐに戻ること）
+    """
+
+    def __init__(self, sock, network_loop=None, on_event=None):
+        self.sock = sock
+        self.network = network_loop or NetworkLoop.default()
+        self.on_event = on_event
+        # (種類, 内容, 受信時刻, 解析時間) のイベント。イベントループが入れ、poll() で取り出す
+        self.inbox = queue.SimpleQueue()
+        self.closed = False
+        self._send_queue = asyncio.Queue()
+        self._task = None
+        self.network.call_soon(self._start)
+
+    def _start(self):
+        self._task = self.network.loop.create_task(self._run())
+
+    async def _run(self):
+        """受信ループ（終了時に送信側も止めて CLOSED を通知する）"""
+        writer = None
+        sender = None
+        try:
+            reader, writer = await asyncio.open_connection(sock=self.sock, limit=BUFFER_SIZE)
+            sender = asyncio.create_task(self._send_loop(writer))
+            decoder = FrameDecoder()
+            while True:
+                data = await reader.read(BUFFER_SIZE)
+                if not data:
+                    break
+                received = time.perf_counter()
+                messages = decoder.feed(data)
+                if messages:
+                    # 1回の受信で届いたメッセージの解析時間を等分する
+                    parse_time = (time.perf_counter() - received) / len(messages)
+                    for message in messages:
+                        self._put(MESSAGE, message, received, parse_time)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self._put(ERROR, f"受信エラー: {str(e)}")
+        finally:
+            if sender is not None:
+                sender.cancel()
+            if writer is not None:
+                writer.close()
+            self.closed = True
+            self._put(CLOSED, None)
+
+    def _put(self, kind, payload, received=None, parse_time=0.0):
+        """イベントを inbox に入れて通知する"""
+        self.inbox.put((kind, payload, received, parse_time))
+        if self.on_event is not None:
+            self.on_event()
+
+    async def _send_loop(self, writer):
+        """送信キューのデータを順に書き込む"""
+        while True:
+            data = await self._send_queue.get()
+            writer.write(data)
+            try:
+                await writer.drain()
+            except OSError as e:
+                self._put(ERROR, f"送信エラー: {str(e)}")
+                return
+
+    def send(self, data):
+        """data (bytes) を送信キューに積む（どのスレッドからでも呼べる）"""
+        if self.closed:
+            raise ConnectionError("接続は閉じられています")
+        self.network.call_soon(self._send_queue.put_nowait, data)
+
+    def poll(self):
+        """届いているイベント (種類, 内容) をすべて取り出す"""
+        return [(kind, payload) for kind, payload, _, _ in self.poll_timed()]
+
+    def poll_timed(self):
+        """
+        届いているイベントを受信時刻と解析時間付きですべて取り出す。
+
+        Returns:
+            list: (種類, 内容, 受信時刻, 解析時間) のリスト。
+                  受信時刻は time.perf_counter() の値（メッセージ以外は None）、解析時間は秒
+        """
+        events = []
+        while True:
+            try:
+                events.append(self.inbox.get_nowait())
+            except queue.Empty:
+                return events
+
+    def close(self):
+        """受信を止めてソケットを閉じる"""
+        if not self.closed:
+            self.network.call_soon(self._cancel)
+
+    def _cancel(self):
+        if self._task is not None:
+            self._task.cancel()
@@ -0,0 +1,497 @@
+"""
+ルールの関数とクライアントの処理のマイクロベンチマーク
+
+決まった中盤・終盤の局面（CORPUS の棋譜を再生したもの）に対して、
+ルールの関数（othello.py, othello2.py）, メッセージの変換, クライアントの
+メッセージ処理, 石数, 描画の1回あたりの時間を測る。
+timeit と同じく GC を止めて何回か測り、最も速い回の値を使う。
+
+結果は JSON で保存でき、保存しておいた基準の結果と比べて、
+許容する割合より遅くなった項目があれば終了コード1で終わる。
+描画は SDL のダミーのビデオドライバで画面を開かずに測る。
+
+使い方:
+    python bench.py                                # 測って表示
+    python bench.py --save-baseline baseline.json  # 基準として保存
+    python bench.py --baseline baseline.json       # 基準と比べる
+    python bench.py --filter draw --json result.json
+"""
+
+import os
+
+# 画面を開かずに描画する（pygame を読み込む前に設定する）
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+
+import othello
+import othello2
+from bitboard import (
+    bits_to_board,
+    iter_squares,
+    legal_moves,
+    make_move,
+    parse_moves,
+    replay,
+)
+from board_state import BoardState
+from client import ReversiClient
+from framing import board_hash
+
+# 中盤と終盤の局面の棋譜（初期局面からの着手。最後まで再生した局面を使う）
+CORPUS = {
+    "midgame": [
+        "e6f4g3d6e3f6c7d7g7g4e7g2g5e8h4c8d8g6d3g8",
+        "f5f6d3e3f7c4c3g6b5c2f4e6h5g5c1f8f2g7e7c5c6f3g3h2",
+        "e6d6c5f4e7c7e3d3c2b4a3f5b8f7f6e8c6d7f3g4h5f2g5h4e2h3g3c4",
+        "c4e3f5g6f3c5e6g3c3c6g4b3e2f7h3e1a3g2c7b4d3d2d1b2c2f4d7b6b5f6h7h5",
+    ],
+    "endgame": [
+        "e6f4c3d6g4e3f2e7f7c4c7b2e8e2b3g5e1d7d3b4a5g1c6g8f5h4g6d8h5c2b1a4d2a2f1h7c5f3f6g3h1g7"
+        "g2h3c1a3h2d1",
+        "d3c5c6c7b7e3f3d2c4e2f2g2d1a7e6e7c8c3a6b3h2b6f4d6f6g3e8f7a8d7f8g1b5b8g4f5g6g7a2a3b2c2"
+        "a4b4h1g5d8a1c1a5e1b1",
+        "e6f6d3e3f5d6g7g4e2g6d7e1h7c6f7c5f3c4b6c3b4b3b2g3c2b7f4h6b5a4h3a7c7b8a6d2d1f1f2e7d8g2"
+        "c8g1h1f8g8a1g5h2a2h5e8h8",
+        "c4c3c2f4d3c6d6c5g4b3a3h4b4b2b5e6f7b6a6d7a2g8f5b7e8e2f6c8a4c7d8b1a7b8a8e7e3g7a5d2e1f1"
+        "g1f3g5f8g2g3f2g6h8c1h2h7d1h3",
+    ],
+}
+
+# 着手フレームとして送る、各棋譜の最後の手数
+DELTA_PLIES = 8
+# 1回の計測に最低限かける時間（秒）
+DEFAULT_MIN_TIME = 0.05
+DEFAULT_REPEAT = 5
+# 基準より遅いとみなす割合（0.25 なら 25% 以上遅くなったら）
+DEFAULT_TOLERANCE = 0.25
+
+DIRECTIONS = [(d_row, d_col) for d_row in (-1, 0, 1) for d_col in (-1, 0, 1)
+              if d_row or d_col]
+SQUARES = [(row, col) for row in range(8) for col in range(8)]
+
+
+class Position:
+    """コーパスの1局面（手番側と各形式の盤面）"""
+
+    def __init__(self, black, white, black_to_move):
+        self.black = black
+        self.white = white
+        self.black_to_move = black_to_move
+        own, opp = (black, white) if black_to_move else (white, black)
+        self.moves = [divmod(sq, 8) for sq in iter_squares(legal_moves(own, opp))]
+        self.client_board = bits_to_board(black, white, 0, 1, 2)
+        self.othello_board = bits_to_board(black, white, othello.NO_STONE, othello.BLACK,
+                                           othello.WHITE)
+        self.othello2_board = bits_to_board(black, white, "EMPTY", othello2.BLACK,
+                                            othello2.WHITE)
+        self.turn = othello.BLACK if black_to_move else othello.WHITE
+        self.current_turn = 0 if black_to_move else 1
+        self.state = BoardState()
+        self.state.set_bits(black, white)
+
+
+def replay_game(moves):
+    """
+    棋譜を再生して各手の後の局面を返す（パスがあれば手番を飛ばす）。
+
+    Returns:
+        list: [(黒, 白, 黒番なら True, 着手 (row, col), 打った石の色), ...]
+    """
+    positions = []
+    for own, opp, sq, black_to_move in replay(moves):
+        after_opp, after_own = make_move(own, opp, sq)
+        black, white = (after_own, after_opp) if black_to_move else (after_opp, after_own)
+        # 相手が打てなければ同じ側が続けて打つ
+        next_black = not black_to_move
+        if not legal_moves(after_opp, after_own) and legal_moves(after_own, after_opp):
+            next_black = black_to_move
+        positions.append((black, white, next_black, divmod(sq, 8), 1 if black_to_move else 2))
+    return positions
+
+
+def load_corpus():
+    """
+    コーパスを再生する。
+
+    Returns:
+        tuple: (最後の局面のリスト, 棋譜ごとの各手の後の局面のリスト)
+    """
+    positions = []
+    games = []
+    for kind in ("midgame", "endgame"):
+        for text in CORPUS[kind]:
+            game = replay_game(parse_moves(text))
+            games.append(game)
+            black, white, black_to_move, _, _ = game[-1]
+            positions.append(Position(black, white, black_to_move))
+    return positions, games
+
+
+# ---- 計測する処理 ----
+# 各関数は (1回の処理の呼び出し回数, 準備, 処理) を返す。
+# 準備は計測の外で毎回呼ばれ、その戻り値が処理に渡される（盤面を書き換える処理のため）。
+
+def case_count_flip_stone(positions, games, client):
+    count_flip_stone = othello.count_flip_stone
+    calls = [(p.turn, row, col, d_row, d_col, p.othello_board)
+             for p in positions for row, col in SQUARES
+             if p.othello_board[row][col] == othello.NO_STONE
+             for d_row, d_col in DIRECTIONS]
+
+    def run(_):
+        for args in calls:
+            count_flip_stone(*args)
+    return len(calls), None, run
+
+
+def case_check_position(positions, games, client):
+    check_position = othello.check_position
+    calls = [(p.turn, row, col, p.othello_board) for p in positions for row, col in SQUARES]
+
+    def run(_):
+        for args in calls:
+            check_position(*args)
+    return len(calls), None, run
+
+
+def case_flip(positions, games, client):
+    flip = othello.flip
+    calls = [(p.turn, row, col, p.othello_board) for p in positions for row, col in p.moves]
+
+    def prepare():
+        return [(turn, row, col, [r[:] for r in board]) for turn, row, col, board in calls]
+
+    def run(copies):
+        for args in copies:
+            flip(*args)
+    return len(calls), prepare, run
+
+
+def case_can_place_stone(positions, games, client):
+    can_place_stone = othello2.can_place_stone
+    calls = [(p.othello2_board, row, col, p.turn) for p in positions for row, col in SQUARES]
+
+    def run(_):
+        for args in calls:
+            can_place_stone(*args)
+    return len(calls), None, run
+
+
+def case_flip_stones(positions, games, client):
+    flip_stones = othello2.flip_stones
+    calls = [(p.othello2_board, row, col, p.turn) for p in positions for row, col in p.moves]
+
+    def prepare():
+        return [([r[:] for r in board], row, col, turn) for board, row, col, turn in calls]
+
+    def run(copies):
+        for args in copies:
+            flip_stones(*args)
+    return len(calls), prepare, run
+
+
+def _sample_msgs(games):
+    """接続要求と、各棋譜の着手のメッセージ"""
+    msgs = []
+    m = othello.Msg()
+    m.type = othello.CONN_REQ
+    m.name = "player"
+    m.color = othello.BLACK
+    m.row, m.col = 0, 0
+    msgs.append(m)
+    for game in games:
+        for _, _, _, (row, col), color in game:
+            m = othello.Msg()
+            m.type = othello.PUT_MY_STONE
+            m.color = othello.BLACK if color == 1 else othello.WHITE
+            m.row, m.col = row, col
+            msgs.append(m)
+    return msgs
+
+
+def case_msg_serialize(positions, games, client):
+    msgs = _sample_msgs(games)
+
+    def run(_):
+        for m in msgs:
+            m.serialize()
+    return len(msgs), None, run
+
+
+def case_msg_deserialize(positions, games, client):
+    deserialize = othello.Msg.deserialize
+    data = [m.serialize() for m in _sample_msgs(games)]
+
+    def run(_):
+        for d in data:
+            deserialize(d)
+    return len(data), None, run
+
+
+def _sample_messages(games):
+    """
+    各棋譜について、盤面全体の JSON メッセージ、スナップショットと最後の着手フレームを
+    クライアントが受け取る辞書の形で並べる。
+    """
+    messages = []
+    for game in games:
+        black, white, black_to_move, move, _ = game[-DELTA_PLIES - 1]
+        messages.append({"board": bits_to_board(black, white, 0, 1, 2),
+                         "current_turn": 0 if black_to_move else 1, "winner": -1})
+        messages.append({"board": bits_to_board(black, white, 0, 1, 2),
+                         "current_turn": 0 if black_to_move else 1, "winner": -1,
+                         "move": move, "black": black, "white": white, "seq": 0})
+        for seq, (black, white, black_to_move, move, color) in enumerate(
+                game[-DELTA_PLIES:], 1):
+            messages.append({"delta": True, "seq": seq, "move": move, "color": color,
+                             "current_turn": 0 if black_to_move else 1, "winner": -1,
+                             "hash": board_hash(black, white)})
+    return messages
+
+
+def case_process_message(positions, games, client):
+    messages = _sample_messages(games)
+
+    def prepare():
+        # 盤面のリストはクライアントが書き換えるので毎回作り直す
+        return [dict(m, board=[r[:] for r in m["board"]]) if "board" in m else m
+                for m in messages]
+
+    def run(copies):
+        process_message = client.process_message
+        for message in copies:
+            process_message(message)
+    return len(messages), prepare, run
+
+
+def case_count_stones(positions, games, client):
+    states = [p.state for p in positions]
+
+    def run(_):
+        for state in states:
+            client.state = state
+            client.count_stones()
+    return len(states), None, run
+
+
+def _show(client, position):
+    """局面をクライアントの盤面にする"""
+    client.board = [r[:] for r in position.client_board]
+    client.state = position.state
+    client.current_turn = position.current_turn
+
+
+def case_draw_full(positions, games, client):
+    def run(_):
+        for p in positions:
+            _show(client, p)
+            client.full_redraw = True
+            client.draw()
+    return len(positions), None, run
+
+
+def case_draw_incremental(positions, games, client):
+    # 棋譜の最後の数手を順に表示する（1手ごとに変わったマスだけ描き直す）
+    frames = []
+    for game in games:
+        for black, white, black_to_move, _, _ in game[-DELTA_PLIES:]:
+            frames.append(Position(black, white, black_to_move))
+
+    def prepare():
+        _show(client, frames[-1])
+        client.draw()
+
+    def run(_):
+        for p in frames:
+            _show(client, p)
+            client.draw()
+    return len(frames), prepare, run
+
+
+CASES = {
+    "othello.count_flip_stone": case_count_flip_stone,
+    "othello.check_position": case_check_position,
+    "othello.flip": case_flip,
+    "othello2.can_place_stone": case_can_place_stone,
+    "othello2.flip_stones": case_flip_stones,
+    "Msg.serialize": case_msg_serialize,
+    "Msg.deserialize": case_msg_deserialize,
+    "ReversiClient.process_message": case_process_message,
+    "ReversiClient.count_stones": case_count_stones,
+    "ReversiClient.draw.full": case_draw_full,
+    "ReversiClient.draw.incremental": case_draw_incremental,
+}
+
+
+def create_client():
+    """接続せずに描画とメッセージ処理だけを行うクライアント（自分が黒の対局中）"""
+    client = ReversiClient(show_hints=True)
+    client.player_number = 0
+    client.is_spectator = False
+    client.game_status = "playing"
+    return client
+
+
+def measure(calls, prepare, run, repeat=DEFAULT_REPEAT, min_time=DEFAULT_MIN_TIME):
+    """
+    処理を繰り返して1回の呼び出しあたりの時間を測る。
+
+    1回の計測が min_time 以上になるまで処理を続けて行う回数を増やし（timeit.autorange と同じ）、
+    それを repeat 回測る。
+
+    Returns:
+        dict: best_us, median_us（1回の呼び出しあたりのマイクロ秒）, calls, loops, repeat
+    """
+    prepare = prepare or (lambda: None)
+
+    def timed(loops):
+        inputs = [prepare() for _ in range(loops)]
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            for data in inputs:
+                run(data)
+            return time.perf_counter() - start
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    loops = 1
+    while True:
+        elapsed = timed(loops)
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed * 4 >= min_time else 10
+    times = [timed(loops) / (loops * calls) * 1e6 for _ in range(repeat)]
+    return {
+        "best_us": round(min(times), 4),
+        "median_us": round(statistics.median(times), 4),
+        "calls": calls,
+        "loops": loops,
+        "repeat": repeat,
+    }
+
+
+def run_benchmarks(names, repeat=DEFAULT_REPEAT, min_time=DEFAULT_MIN_TIME, progress=None):
+    """
+    指定した項目を測る。
+
+    Args:
+        names (list): CASES のキー
+        progress: 項目ごとに (名前, 結果) で呼ぶ関数
+
+    Returns:
+        dict: 実行環境と項目ごとの結果
+    """
+    positions, games = load_corpus()
+    client = create_client()
+    results = {}
+    try:
+        for name in names:
+            calls, prepare, run = CASES[name](positions, games, client)
+            results[name] = measure(calls, prepare, run, repeat, min_time)
+            if progress is not None:
+                progress(name, results[name])
+    finally:
+        client.cleanup()
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "corpus": {kind: len(texts) for kind, texts in CORPUS.items()},
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    基準の結果と比べる（best_us の比）。
+
+    Returns:
+        list: 両方にある項目の (名前, 基準, 今回, 比, 遅くなったなら True)
+    """
+    rows = []
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        ratio = result["best_us"] / base["best_us"] if base["best_us"] else 1.0
+        rows.append((name, base["best_us"], result["best_us"], ratio, ratio > 1 + tolerance))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ルールの関数とクライアントの処理のベンチマーク")
+    parser.add_argument("--filter", help="名前にこの文字列を含む項目だけ測る")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="計測の回数")
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME,
+                        help="1回の計測に最低限かける時間（秒）")
+    parser.add_argument("--json", help="結果を JSON で書き出すファイル（- なら標準出力）")
+    parser.add_argument("--baseline", help="比べる基準の結果（JSON）")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="基準より遅いとみなす割合（0.25 なら 25%%）")
+    parser.add_argument("--save-baseline", help="結果を基準として書き出すファイル")
+    args = parser.parse_args()
+
+    names = [name for name in CASES if args.filter is None or args.filter in name]
+    if not names:
+        parser.error(f"{args.filter} を含む項目はありません")
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            parser.error(f"基準の結果を読めません: {e}")
+
+    quiet = args.json == "-"
+
+    def progress(name, result):
+        if not quiet:
+            print(f"{name:32s} {result['best_us']:10.3f} us  (median {result['median_us']:.3f} us,"
+                  f" {result['calls']} calls x {result['loops']})", flush=True)
+
+    report = run_benchmarks(names, args.repeat, args.min_time, progress)
+
+    regressions = []
+    if baseline is not None:
+        rows = compare(report, baseline, args.tolerance)
+        report["baseline"] = {
+            "path": args.baseline,
+            "tolerance": args.tolerance,
+            "ratios": {name: round(ratio, 3) for name, _, _, ratio, _ in rows},
+        }
+        regressions = [name for name, _, _, _, slower in rows if slower]
+        report["regressions"] = regressions
+        if not quiet:
+            print(f"\n基準: {args.baseline}（{args.tolerance:.0%} 以上遅ければ REGRESSION）")
+            for name, base, now, ratio, slower in rows:
+                print(f"{name:32s} {base:10.3f} -> {now:10.3f} us  x{ratio:.2f}"
+                      f"{'  REGRESSION' if slower else ''}")
+
+    for path in (args.json, args.save_baseline):
+        if path == "-":
+            json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+            print()
+        elif path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+                f.write("\n")
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,529 @@
+"""
+ビットボードによるオセロのルールエンジン
+
+盤面を「手番側の石」「相手側の石」の2つの64ビット整数で表す。
+マス (row, col) はビット番号 row * 8 + col に対応する（(0, 0) が最下位ビット）。
+"""
+
+OTHELLO_ROW = 8
+OTHELLO_COL = 8
+FULL = 0xFFFFFFFFFFFFFFFF
+
+# シフト後に列の折り返しを防ぐためのマスク
+NOT_A_FILE = 0xFEFEFEFEFEFEFEFE  # 0列目を除く
+NOT_H_FILE = 0x7F7F7F7F7F7F7F7F  # 7列目を除く
+INNER = 0x7E7E7E7E7E7E7E7E  # 0列目と7列目を除く
+
+# 局面の状態
+PLAYING = 0    # 手番側に合法手がある
+PASS = 1       # 手番側はパス（相手には合法手がある）
+GAME_OVER = 2  # 両者とも合法手がない
+
+# 初期配置（黒番から見た own, opp）
+INITIAL_BLACK = (1 << 28) | (1 << 35)  # (3, 4), (4, 3)
+INITIAL_WHITE = (1 << 27) | (1 << 36)  # (3, 3), (4, 4)
+
+
+def square(row, col):
+    """(row, col) をビット番号に変換"""
+    return row * OTHELLO_COL + col
+
+
+def to_row_col(sq):
+    """ビット番号を (row, col) に変換"""
+    return divmod(sq, OTHELLO_COL)
+
+
+def popcount(bits):
+    """立っているビットの数を数える"""
+    return bits.bit_count()
+
+
+DIRECTIONS = (
+    (-1, -1), (-1, 0), (-1, 1),
+    (0, -1),           (0, 1),
+    (1, -1),  (1, 0),  (1, 1),
+)
+
+
+def _build_rays():
+    """各マスから8方向に伸びる半直線を (隣のマス, 半直線) の組で作る（長さ2未満は除く）"""
+    positive = []
+    negative = []
+    for sq in range(OTHELLO_ROW * OTHELLO_COL):
+        row, col = divmod(sq, OTHELLO_COL)
+        pos_rays = []
+        neg_rays = []
+        for d_row, d_col in DIRECTIONS:
+            ray = 0
+            r, c = row + d_row, col + d_col
+            while 0 <= r < OTHELLO_ROW and 0 <= c < OTHELLO_COL:
+                ray |= 1 << (r * OTHELLO_COL + c)
+                r += d_row
+                c += d_col
+            if ray.bit_count() < 2:
+                continue
+            if ray > (1 << sq):
+                pos_rays.append((ray & -ray, ray))
+            else:
+                neg_rays.append((1 << (ray.bit_length() - 1), ray))
+        positive.append(tuple(pos_rays))
+        negative.append(tuple(neg_rays))
+    return tuple(positive), tuple(negative)
+
+
+# RAYS_POS[sq]: ビット番号が増える向きの半直線, RAYS_NEG[sq]: 減る向きの半直線
+# （隣のマスが相手の石でない向きは調べなくてよいので、隣のマスも一緒に持つ）
+RAYS_POS, RAYS_NEG = _build_rays()
+
+# NEIGHBORS[sq]: 周囲8マスのマスク
+NEIGHBORS = tuple(
+    sum(1 << ((sq >> 3) + d_row) * OTHELLO_COL + (sq & 7) + d_col
+        for d_row, d_col in DIRECTIONS
+        if 0 <= (sq >> 3) + d_row < OTHELLO_ROW and 0 <= (sq & 7) + d_col < OTHELLO_COL)
+    for sq in range(OTHELLO_ROW * OTHELLO_COL)
+)
+
+
+def flips(own, opp, sq):
+    """
+    マス sq に石を置いたときにひっくり返る相手の石を求める。
+
+    各方向について「相手の石ではない最初のマス」を1回のビット演算で求め、
+    それが自分の石であれば間のマスをまとめて返す。
+
+    Args:
+        own (int): 手番側の石
+        opp (int): 相手側の石
+        sq (int): 石を置くビット番号
+
+    Returns:
+        int: ひっくり返る石のビットマスク（置けない場合は0）
+    """
+    if ((own | opp) >> sq) & 1 or not opp & NEIGHBORS[sq]:
+        return 0
+
+    flipped = 0
+    not_opp = ~opp
+    for adjacent, ray in RAYS_POS[sq]:
+        if not opp & adjacent:
+            continue
+        blocker = ray & not_opp
+        # 最も近い（最下位の）非相手マス
+        first = blocker & -blocker
+        if first & own:
+            flipped |= ray & (first - 1)
+    for adjacent, ray in RAYS_NEG[sq]:
+        if not opp & adjacent:
+            continue
+        blocker = ray & not_opp
+        if blocker:
+            # 最も近い（最上位の）非相手マス
+            first = 1 << (blocker.bit_length() - 1)
+            if first & own:
+                flipped |= ray & ~((first << 1) - 1)
+
+    return flipped
+
+
+def make_move(own, opp, sq):
+    """
+    マス sq に石を置き、手番を交代した局面を返す。
+
+    Args:
+        own (int): 手番側の石
+        opp (int): 相手側の石
+        sq (int): 石を置くビット番号
+
+    Returns:
+        tuple: (次の手番側の石, 次の相手側の石)。置けない場合は None
+    """
+    flipped = flips(own, opp, sq)
+    if not flipped:
+        return None
+    return opp ^ flipped, own | flipped | (1 << sq)
+
+
+def legal_moves(own, opp):
+    """
+    手番側の合法手をすべて求める。
+
+    8方向それぞれについて、自分の石から相手の石が連続する範囲をシフトで広げ、
+    その先の空きマスを合法手とする。64マスを1つずつ調べる必要はない。
+    範囲は 1, 2 マス広げた後、2マス分ずつまとめて広げる（相手の石は最大6個並ぶ）。
+    横と斜めは端の列の相手の石を除いておくので、行をまたいで広がらない。
+
+    Args:
+        own (int): 手番側の石
+        opp (int): 相手側の石
+
+    Returns:
+        int: 合法手のビットマスク
+    """
+    inner = opp & INNER
+    # 横（1）
+    t = inner & (own << 1)
+    t |= inner & (t << 1)
+    pair = inner & (inner << 1)
+    t |= pair & (t << 2)
+    t |= pair & (t << 2)
+    moves = t << 1
+    t = inner & (own >> 1)
+    t |= inner & (t >> 1)
+    pair = inner & (inner >> 1)
+    t |= pair & (t >> 2)
+    t |= pair & (t >> 2)
+    moves |= t >> 1
+    # 縦（8）
+    t = opp & (own << 8)
+    t |= opp & (t << 8)
+    pair = opp & (opp << 8)
+    t |= pair & (t << 16)
+    t |= pair & (t << 16)
+    moves |= t << 8
+    t = opp & (own >> 8)
+    t |= opp & (t >> 8)
+    pair = opp & (opp >> 8)
+    t |= pair & (t >> 16)
+    t |= pair & (t >> 16)
+    moves |= t >> 8
+    # 斜め（7, 9）
+    t = inner & (own << 7)
+    t |= inner & (t << 7)
+    pair = inner & (inner << 7)
+    t |= pair & (t << 14)
+    t |= pair & (t << 14)
+    moves |= t << 7
+    t = inner & (own >> 7)
+    t |= inner & (t >> 7)
+    pair = inner & (inner >> 7)
+    t |= pair & (t >> 14)
+    t |= pair & (t >> 14)
+    moves |= t >> 7
+    t = inner & (own << 9)
+    t |= inner & (t << 9)
+    pair = inner & (inner << 9)
+    t |= pair & (t << 18)
+    t |= pair & (t << 18)
+    moves |= t << 9
+    t = inner & (own >> 9)
+    t |= inner & (t >> 9)
+    pair = inner & (inner >> 9)
+    t |= pair & (t >> 18)
+    t |= pair & (t >> 18)
+    moves |= t >> 9
+
+    return moves & ~(own | opp) & FULL
+
+
+def has_valid_moves(own, opp):
+    """手番側に合法手があるか（サーバーの has_valid_moves 相当）"""
+    return legal_moves(own, opp) != 0
+
+
+def game_status(own, opp, moves=None):
+    """
+    局面の状態を判定する。
+
+    Args:
+        own (int): 手番側の石
+        opp (int): 相手側の石
+        moves (int): 計算済みの手番側の合法手（省略時は計算する）
+
+    Returns:
+        int: PLAYING, PASS, GAME_OVER のいずれか
+    """
+    if moves is None:
+        moves = legal_moves(own, opp)
+    if moves:
+        return PLAYING
+    # 手番側に手がないときだけ相手側を調べる
+    if legal_moves(opp, own):
+        return PASS
+    return GAME_OVER
+
+
+def iter_moves(moves):
+    """合法手のビットマスクから (row, col) を順に返す"""
+    while moves:
+        low = moves & -moves
+        yield divmod(low.bit_length() - 1, OTHELLO_COL)
+        moves ^= low
+
+
+def count_stones(own, opp):
+    """(手番側の石数, 相手側の石数) を返す"""
+    return own.bit_count(), opp.bit_count()
+
+
+def iter_squares(bits):
+    """ビットマスクの立っているビット番号を小さい順に返す"""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+# ---- 棋譜 ----
+
+def square_name(sq):
+    """ビット番号を棋譜表記（例: (4, 5) → 'f5'）に変換"""
+    row, col = divmod(sq, OTHELLO_COL)
+    return "abcdefgh"[col] + str(row + 1)
+
+
+def parse_square(name):
+    """棋譜表記（例: 'f5'）をビット番号に変換"""
+    col = "abcdefgh".index(name[0].lower())
+    row = int(name[1]) - 1
+    if not 0 <= row < OTHELLO_ROW:
+        raise ValueError(f"invalid square: {name}")
+    return square(row, col)
+
+
+def parse_moves(text):
+    """棋譜文字列（例: 'f5d6c3'）をビット番号のリストに変換"""
+    text = text.strip()
+    return [parse_square(text[i:i + 2]) for i in range(0, len(text) - 1, 2)]
+
+
+def replay(moves, own=INITIAL_BLACK, opp=INITIAL_WHITE):
+    """
+    着手のリストを初期局面から再生する。パスは自動で処理する。
+
+    Yields:
+        tuple: (着手前の own, 着手前の opp, 着手, 黒番なら True)
+
+    Raises:
+        ValueError: 合法でない手が含まれている場合
+    """
+    black_to_move = True
+    for sq in moves:
+        f = flips(own, opp, sq)
+        if not f:
+            # 手番側が打てなければパスして相手の手として扱う
+            if legal_moves(own, opp):
+                raise ValueError(f"illegal move: {square_name(sq)}")
+            own, opp = opp, own
+            black_to_move = not black_to_move
+            f = flips(own, opp, sq)
+            if not f:
+                raise ValueError(f"illegal move: {square_name(sq)}")
+        yield own, opp, sq, black_to_move
+        own, opp = opp ^ f, own | f | (1 << sq)
+        black_to_move = not black_to_move
+
+
+def final_position(moves):
+    """
+    着手のリストを最後まで再生した局面を返す。
+
+    Returns:
+        tuple: (黒の石, 白の石)
+    """
+    black, white = INITIAL_BLACK, INITIAL_WHITE
+    for own, opp, sq, black_to_move in replay(moves):
+        own, opp = make_move(own, opp, sq)
+        # make_move 後は手番が入れ替わっている
+        black, white = (opp, own) if black_to_move else (own, opp)
+    return black, white
+
+
+# ---- 盤面の対称変換 ----
+
+def flip_vertical(bits):
+    """上下反転（row → 7 - row）"""
+    return int.from_bytes(bits.to_bytes(8, "little"), "big")
+
+
+def mirror_horizontal(bits):
+    """左右反転（col → 7 - col）"""
+    bits = ((bits >> 1) & 0x5555555555555555) | ((bits & 0x5555555555555555) << 1)
+    bits = ((bits >> 2) & 0x3333333333333333) | ((bits & 0x3333333333333333) << 2)
+    return ((bits >> 4) & 0x0F0F0F0F0F0F0F0F) | ((bits & 0x0F0F0F0F0F0F0F0F) << 4)
+
+
+def flip_diagonal(bits):
+    """主対角線での反転（row と col の入れ替え）"""
+    t = 0x0F0F0F0F00000000 & (bits ^ (bits << 28))
+    bits ^= t ^ (t >> 28)
+    t = 0x3333000033330000 & (bits ^ (bits << 14))
+    bits ^= t ^ (t >> 14)
+    t = 0x5500550055005500 & (bits ^ (bits << 7))
+    bits ^= t ^ (t >> 7)
+    return bits
+
+
+def transform(bits, sym):
+    """
+    8通りの対称変換のうち sym 番目を適用する。
+
+    sym のビット0: 左右反転, ビット1: 上下反転, ビット2: 対角線反転（この順に適用）
+    """
+    if sym & 1:
+        bits = mirror_horizontal(bits)
+    if sym & 2:
+        bits = flip_vertical(bits)
+    if sym & 4:
+        bits = flip_diagonal(bits)
+    return bits
+
+
+def _build_symmetry_tables():
+    """各対称変換でのマスの移り先と、逆変換の番号を求める"""
+    squares = tuple(
+        tuple(transform(1 << sq, sym).bit_length() - 1 for sq in range(64))
+        for sym in range(8)
+    )
+    identity = tuple(range(64))
+    inverse = tuple(
+        next(inv for inv in range(8)
+             if tuple(squares[inv][squares[sym][sq]] for sq in range(64)) == identity)
+        for sym in range(8)
+    )
+    return squares, inverse
+
+
+# SYMMETRY_SQUARES[sym][sq]: 変換後のマス, SYMMETRY_INVERSE[sym]: 逆変換の番号
+SYMMETRY_SQUARES, SYMMETRY_INVERSE = _build_symmetry_tables()
+
+
+def canonical(own, opp):
+    """
+    8通りの対称変換のうち (own, opp) が最小になるものを代表局面とする。
+
+    Returns:
+        tuple: (代表局面の own, 代表局面の opp, 使った対称変換の番号)
+    """
+    best = (own, opp, 0)
+    for sym in range(1, 8):
+        t_own = transform(own, sym)
+        if t_own > best[0]:
+            continue
+        t_opp = transform(opp, sym)
+        if t_own < best[0] or t_opp < best[1]:
+            best = (t_own, t_opp, sym)
+    return best
+
+
+# ---- list[list] 形式の盤面との相互変換 ----
+
+def board_to_bits(board, turn, empty):
+    """
+    board[row][col] 形式の盤面を (own, opp) に変換する。
+
+    turn と等しいマスを手番側、empty 以外のマスを相手側とみなす。
+    """
+    own = opp = 0
+    bit = 1
+    for row in board:
+        for cell in row:
+            if cell == turn:
+                own |= bit
+            elif cell != empty:
+                opp |= bit
+            bit <<= 1
+    return own, opp
+
+
+def apply_flips(board, turn, flipped):
+    """ひっくり返った石を board[row][col] 形式の盤面に書き戻す"""
+    for sq in iter_squares(flipped):
+        board[sq >> 3][sq & 7] = turn
+
+
+def bits_to_board(black, white, empty, black_value, white_value):
+    """(黒, 白) のビットボードを board[row][col] 形式の盤面に変換"""
+    board = []
+    bit = 1
+    for _ in range(OTHELLO_ROW):
+        row = []
+        for _ in range(OTHELLO_COL):
+            if black & bit:
+                row.append(black_value)
+            elif white & bit:
+                row.append(white_value)
+            else:
+                row.append(empty)
+            bit <<= 1
+        board.append(row)
+    return board
+
+
+def find_moves(board, turn, empty):
+    """
+    board[row][col] 形式の盤面について合法手と局面の状態を一度に求める。
+
+    Returns:
+        tuple: (合法手のビットマスク, PLAYING / PASS / GAME_OVER)。
+               合法手の座標は iter_moves(合法手) で取り出せる
+    """
+    own, opp = board_to_bits(board, turn, empty)
+    moves = legal_moves(own, opp)
+    return moves, game_status(own, opp, moves)
+
+
+# ---- othello.py 互換 (空きマス ' ') ----
+
+# NEIGHBOR_CELLS[sq]: 周囲8マスの (row, col)
+NEIGHBOR_CELLS = tuple(
+    tuple(divmod(n, OTHELLO_COL) for n in iter_squares(NEIGHBORS[sq]))
+    for sq in range(OTHELLO_ROW * OTHELLO_COL)
+)
+
+
+def _may_flip(board, row, col, turn, empty):
+    """空きマスで、隣に相手の石がある（盤面全体を変換する前の絞り込み）"""
+    if board[row][col] != empty:
+        return False
+    for r, c in NEIGHBOR_CELLS[row * OTHELLO_COL + col]:
+        cell = board[r][c]
+        if cell != turn and cell != empty:
+            return True
+    return False
+
+
+def check_position(turn, row, col, board, empty=' '):
+    """othello.check_position と同じく、ひっくり返せる石の数を返す"""
+    if not _may_flip(board, row, col, turn, empty):
+        return 0
+    own, opp = board_to_bits(board, turn, empty)
+    return flips(own, opp, square(row, col)).bit_count()
+
+
+def flip(turn, row, col, board, empty=' '):
+    """othello.flip と同じく、石を置いて挟んだ石をひっくり返す"""
+    own, opp = board_to_bits(board, turn, empty)
+    board[row][col] = turn
+    apply_flips(board, turn, flips(own, opp, square(row, col)))
+
+
+# ---- othello2.py 互換 (空きマス 'EMPTY') ----
+
+def can_place_stone(board, row, col, current_turn, empty='EMPTY'):
+    """othello2.can_place_stone と同じ判定を行う"""
+    if not _may_flip(board, row, col, current_turn, empty):
+        return False
+    own, opp = board_to_bits(board, current_turn, empty)
+    return flips(own, opp, square(row, col)) != 0
+
+
+def flip_stones(board, row, col, current_turn, empty='EMPTY'):
+    """othello2.flip_stones と同じく、挟んだ石をひっくり返す"""
+    # 置いたばかりの石は手番側として扱われるので、空きマスとして計算し直す
+    own, opp = board_to_bits(board, current_turn, empty)
+    own &= ~(1 << square(row, col))
+    flipped = flips(own, opp, square(row, col))
+    apply_flips(board, current_turn, flipped)
+    return flipped != 0
+
+
+def place_stone(board, row, col, current_turn, empty='EMPTY'):
+    """othello2.place_stone と同じく、置ける場合のみ石を置く"""
+    own, opp = board_to_bits(board, current_turn, empty)
+    flipped = flips(own, opp, square(row, col))
+    if not flipped:
+        return False
+    board[row][col] = current_turn
+    apply_flips(board, current_turn, flipped)
+    return True
@@ -0,0 +1,175 @@
+"""
+盤面の集計値を差分で保つ
+
+石の数, 空きマスの数, 空きマスの偶奇, Zobristハッシュを盤面の更新と一緒に書き換え、
+描画や自動プレイヤーからは O(1) で読めるようにする。
+盤面は bitboard モジュールと同じくビット番号 row*8+col の (黒, 白) のビットボードで持つ。
+"""
+
+import random
+from collections import OrderedDict
+
+from bitboard import board_to_bits, iter_squares, legal_moves
+
+# 盤面のマス数
+SQUARES = 64
+# 合法手を覚えておく局面の数の既定値
+DEFAULT_MOVE_CACHE_ENTRIES = 64
+
+
+def _build_zobrist_table(seed=0x0B5D):
+    """マスと色ごとのZobrist乱数表（シード固定で常に同じ値になる）"""
+    rng = random.Random(seed)
+    black = tuple(rng.getrandbits(64) for _ in range(SQUARES))
+    white = tuple(rng.getrandbits(64) for _ in range(SQUARES))
+    return black, white
+
+
+ZOBRIST_BLACK, ZOBRIST_WHITE = _build_zobrist_table()
+# 石の色が入れ替わったときにハッシュへ XOR する値
+ZOBRIST_FLIP = tuple(b ^ w for b, w in zip(ZOBRIST_BLACK, ZOBRIST_WHITE))
+
+
+def zobrist(black, white):
+    """(黒, 白) のビットボードのハッシュを最初から計算する"""
+    h = 0
+    for sq in iter_squares(black):
+        h ^= ZOBRIST_BLACK[sq]
+    for sq in iter_squares(white):
+        h ^= ZOBRIST_WHITE[sq]
+    return h
+
+
+class BoardState:
+    """
+    (黒, 白) のビットボードと、その集計値。
+
+    盤面全体が届いたときは set_bits()/set_board() で作り直し、
+    着手は play() で返った石の数に比例する手間だけで反映する。
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """空の盤面にする"""
+        self.black = 0
+        self.white = 0
+        self.black_count = 0
+        self.white_count = 0
+        self.empties = SQUARES
+        self.hash = 0
+
+    def set_bits(self, black, white):
+        """(黒, 白) のビットボードから作り直す"""
+        self.black = black
+        self.white = white
+        self.black_count = black.bit_count()
+        self.white_count = white.bit_count()
+        self.empties = SQUARES - self.black_count - self.white_count
+        self.hash = zobrist(black, white)
+
+    def set_board(self, board):
+        """board[row][col] 形式の盤面（0: 空き, 1: 黒, 2: 白）から作り直す"""
+        self.set_bits(*board_to_bits(board, 1, 0))
+
+    def play(self, color, sq, flipped):
+        """
+        着手を反映する（合法手かどうかは呼び出し側で確かめておくこと）。
+
+        Args:
+            color (int): 打った石の色（1: 黒, 2: 白）
+            sq (int): 打ったマスのビット番号
+            flipped (int): 返った石のビットマスク
+        """
+        count = flipped.bit_count()
+        h = self.hash
+        for f in iter_squares(flipped):
+            h ^= ZOBRIST_FLIP[f]
+        if color == 1:
+            self.black |= flipped | (1 << sq)
+            self.white ^= flipped
+            self.black_count += count + 1
+            self.white_count -= count
+            h ^= ZOBRIST_BLACK[sq]
+        else:
+            self.white |= flipped | (1 << sq)
+            self.black ^= flipped
+            self.white_count += count + 1
+            self.black_count -= count
+            h ^= ZOBRIST_WHITE[sq]
+        self.empties -= 1
+        self.hash = h
+
+    def copy(self):
+        """同じ内容の BoardState を作る"""
+        other = BoardState.__new__(BoardState)
+        other.__dict__.update(self.__dict__)
+        return other
+
+    @property
+    def parity(self):
+        """空きマスの数の偶奇（1: 奇数）"""
+        return self.empties & 1
+
+    def counts(self):
+        """(黒の石数, 白の石数)"""
+        return self.black_count, self.white_count
+
+    def summary(self):
+        """集計値を辞書で返す"""
+        return {
+            "black": self.black_count,
+            "white": self.white_count,
+            "empties": self.empties,
+            "parity": self.parity,
+            "hash": self.hash,
+        }
+
+
+class LegalMoveCache:
+    """
+    局面ごとの合法手の LRU キャッシュ（ハッシュと手番で引く）。
+
+    描画のたびに同じ局面の合法手を求め直さないために使う。
+
+    Args:
+        max_entries (int): 保持する局面の最大数
+    """
+
+    def __init__(self, max_entries=DEFAULT_MOVE_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, state, turn):
+        """
+        手番側の合法手のビットマスクを返す。
+
+        Args:
+            state (BoardState): 盤面
+            turn (int): 手番（0: 黒, 1: 白）
+        """
+        key = (state.hash, turn)
+        entry = self.entries.get(key)
+        # ハッシュの衝突に備えて盤面も比べる
+        if entry is not None and entry[0] == state.black and entry[1] == state.white:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry[2]
+
+        self.misses += 1
+        if turn == 0:
+            moves = legal_moves(state.black, state.white)
+        else:
+            moves = legal_moves(state.white, state.black)
+        self.entries[key] = (state.black, state.white, moves)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return moves
+
+    def stats(self):
+        """ヒット数, ミス数, 保持数"""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.entries)}
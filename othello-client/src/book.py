@@ -0,0 +1,283 @@
+"""
+定石（オープニングブック）
+
+棋譜から「代表局面のハッシュ → 候補手, 評価値, 対局数」の表を作り、
+キー順に並べた固定長レコードのバイナリファイルとして保存する。
+読み込み側はファイルを mmap して二分探索するだけなので、
+ファイルが大きくても起動時に読み込む必要はない。
+
+ファイル形式（リトルエンディアン）:
+    ヘッダ  : マジック 'OTBK', バージョン(u16), 予約(u16), レコード数(u64)
+    レコード: ハッシュ(u64), 着手(u8), 予約(u8), 平均石数差(i16), 対局数(u32)
+"""
+
+import argparse
+import math
+import mmap
+import os
+import struct
+import sys
+
+from ai import zobrist
+from bitboard import (
+    INITIAL_BLACK,
+    INITIAL_WHITE,
+    OTHELLO_COL,
+    SYMMETRY_INVERSE,
+    SYMMETRY_SQUARES,
+    board_to_bits,
+    canonical,
+    final_position,
+    legal_moves,
+    make_move,
+    parse_moves,
+    replay,
+    square_name,
+)
+
+MAGIC = b"OTBK"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQ")
+RECORD = struct.Struct("<QBxhI")
+KEY = struct.Struct("<Q")
+
+# 定石として記録する手数
+DEFAULT_PLIES = 20
+# 定石の手として選ぶのに必要な対局数（1局だけの結果では選ばない）
+DEFAULT_MIN_GAMES = 5
+# 1局ごとの最終石数差の標準偏差の目安（ファイルには平均しかないので固定値を使う）
+SCORE_STDDEV = 20.0
+
+
+def position_key(own, opp):
+    """
+    対称な局面で同じ値になる局面のハッシュを求める。
+
+    Returns:
+        tuple: (ハッシュ, 代表局面への対称変換の番号)
+    """
+    c_own, c_opp, sym = canonical(own, opp)
+    return zobrist(c_own, c_opp), sym
+
+
+class BookBuilder:
+    """
+    棋譜から定石ファイルを作る。
+
+    Args:
+        plies (int): 各対局の先頭から記録する手数
+    """
+
+    def __init__(self, plies=DEFAULT_PLIES):
+        self.plies = plies
+        # (ハッシュ, 代表局面での着手) -> [対局数, 石数差の合計]
+        self.stats = {}
+        self.games = 0
+        self.skipped = 0
+
+    def add_game(self, moves):
+        """
+        1局分の着手（ビット番号のリスト）を追加する。
+
+        Returns:
+            bool: 追加できた場合は True（不正な棋譜は読み飛ばす）
+        """
+        try:
+            black, white = final_position(moves)
+            positions = list(replay(moves[:self.plies]))
+        except ValueError:
+            self.skipped += 1
+            return False
+
+        margin = black.bit_count() - white.bit_count()
+        for own, opp, sq, black_to_move in positions:
+            key, sym = position_key(own, opp)
+            entry = self.stats.setdefault((key, SYMMETRY_SQUARES[sym][sq]), [0, 0])
+            entry[0] += 1
+            entry[1] += margin if black_to_move else -margin
+        self.games += 1
+        return True
+
+    def add_records(self, lines):
+        """棋譜文字列（1行1局, 例: 'f5d6c3...'）をまとめて追加"""
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                moves = parse_moves(line.split()[0])
+            except ValueError:
+                self.skipped += 1
+                continue
+            self.add_game(moves)
+
+    def write(self, path, min_games=1):
+        """
+        定石ファイルを書き出す。
+
+        同じ局面のレコードは対局数の多い順に並べる。
+
+        Returns:
+            int: 書き出したレコード数
+        """
+        records = sorted(
+            ((key, -games, move, total) for (key, move), (games, total) in self.stats.items()
+             if games >= min_games)
+        )
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, len(records)))
+            for key, neg_games, move, total in records:
+                games = -neg_games
+                score = max(-64, min(64, round(total / games)))
+                f.write(RECORD.pack(key, move, score, min(games, 0xFFFFFFFF)))
+        os.replace(tmp_path, path)
+        return len(records)
+
+
+class OpeningBook:
+    """
+    mmap した定石ファイルを二分探索で引く。
+
+    Args:
+        path (str): 定石ファイルのパス
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # 空のファイルは mmap できない
+            self.file.close()
+            raise ValueError(f"{path}: 定石ファイルではありません")
+
+        magic, version, _, self.count = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path}: 定石ファイルではありません")
+        if HEADER.size + self.count * RECORD.size > len(self.map):
+            self.close()
+            raise ValueError(f"{path}: ファイルが壊れています")
+
+    def close(self):
+        """ファイルを閉じる"""
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _lower_bound(self, key):
+        """key 以上のハッシュを持つ最初のレコード番号"""
+        lo, hi = 0, self.count
+        data = self.map
+        unpack = KEY.unpack_from
+        base = HEADER.size
+        size = RECORD.size
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            if unpack(data, base + mid * size)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def lookup(self, own, opp):
+        """
+        局面の候補手を返す。
+
+        Returns:
+            list: (着手のビット番号, 平均石数差, 対局数) のリスト（対局数の多い順）
+        """
+        key, sym = position_key(own, opp)
+        inverse = SYMMETRY_SQUARES[SYMMETRY_INVERSE[sym]]
+        moves = legal_moves(own, opp)
+
+        result = []
+        index = self._lower_bound(key)
+        offset = HEADER.size + index * RECORD.size
+        while index < self.count:
+            r_key, move, score, games = RECORD.unpack_from(self.map, offset)
+            if r_key != key:
+                break
+            sq = inverse[move]
+            # ハッシュの衝突に備えて合法手か確認する
+            if (moves >> sq) & 1:
+                result.append((sq, score, games))
+            index += 1
+            offset += RECORD.size
+        return result
+
+    def best_move(self, own, opp, min_games=DEFAULT_MIN_GAMES):
+        """
+        平均石数差の下側信頼限界（平均 - SCORE_STDDEV / sqrt(対局数)）が最大の手を返す。
+
+        対局数の少ない手は平均が高くても偶然の可能性があるので割り引く
+        （同じなら対局数の多い手）。
+
+        Args:
+            min_games (int): 候補にする手の最小の対局数
+
+        Returns:
+            int: 着手のビット番号。定石にない局面なら None
+        """
+        best = None
+        for sq, score, games in self.lookup(own, opp):
+            if games < min_games:
+                continue
+            bound = score - SCORE_STDDEV / math.sqrt(games)
+            if best is None or (bound, games) > best[1:]:
+                best = (sq, bound, games)
+        return best[0] if best is not None else None
+
+    def best_move_on_board(self, board, turn, empty):
+        """board[row][col] 形式の盤面で定石の手を返す。なければ None"""
+        own, opp = board_to_bits(board, turn, empty)
+        move = self.best_move(own, opp)
+        return divmod(move, OTHELLO_COL) if move is not None else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="定石ファイルの作成と検索")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="棋譜ファイル（1行1局）から定石ファイルを作る")
+    build.add_argument("records", nargs="+", help="棋譜ファイル（'-' で標準入力）")
+    build.add_argument("-o", "--output", required=True, help="出力する定石ファイル")
+    build.add_argument("--plies", type=int, default=DEFAULT_PLIES, help="記録する手数")
+    build.add_argument("--min-games", type=int, default=1, help="記録に必要な対局数")
+
+    query = sub.add_parser("query", help="初期局面から着手を進めた局面の定石を表示")
+    query.add_argument("book", help="定石ファイル")
+    query.add_argument("moves", nargs="?", default="", help="着手（例: f5d6）")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        builder = BookBuilder(args.plies)
+        for path in args.records:
+            if path == "-":
+                builder.add_records(sys.stdin)
+            else:
+                with open(path, encoding="utf-8") as f:
+                    builder.add_records(f)
+        count = builder.write(args.output, args.min_games)
+        print(f"games: {builder.games}  skipped: {builder.skipped}  records: {count}")
+
+    elif args.command == "query":
+        own, opp = INITIAL_BLACK, INITIAL_WHITE
+        for p_own, p_opp, sq, _ in replay(parse_moves(args.moves)):
+            own, opp = make_move(p_own, p_opp, sq)
+        with OpeningBook(args.book) as book:
+            best = book.best_move(own, opp)
+            for sq, score, games in book.lookup(own, opp):
+                mark = "  *" if sq == best else ""
+                print(f"{square_name(sq)}  score: {score:+d}  games: {games}{mark}")
+
+
+if __name__ == "__main__":
+    main()
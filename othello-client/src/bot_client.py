@@ -0,0 +1,112 @@
+"""
+画面を持たないボット用クライアント
+
+pygame を初期化しないので、X や SDL のないサーバー上でも多数起動できる。
+通信とメッセージ処理は ReversiClient と同じ BaseReversiClient を使い、
+自分の手番になったら自動プレイヤーに手を選ばせる。
+
+使い方:
+    python bot_client.py 127.0.0.1 --engine alphabeta --time 0.5
+"""
+
+import argparse
+
+from ai import ENGINES, create_player
+from book import OpeningBook
+from client_base import SERVER_PORT, BaseReversiClient
+from gamestore import GameWriter
+
+
+class HeadlessReversiClient(BaseReversiClient):
+    """
+    画面なしで自動プレイヤーに対局させるクライアント。
+
+    Args:
+        auto_player: 手を選ぶプレイヤー（choose_move(board, turn, empty) を持つもの）
+        exit_on_game_over (bool): 対局が終わったら終了するか
+        verbose (bool): メッセージを標準出力に表示するか
+        binary_frames (bool): サーバーが対応していれば盤面をバイナリフレームで受け取る
+        delta_updates (bool): サーバーが対応していれば着手だけを受け取る
+    """
+
+    def __init__(self, auto_player, exit_on_game_over=True, verbose=False, binary_frames=True,
+                 delta_updates=True):
+        super().__init__(auto_player, binary_frames, delta_updates)
+        self.exit_on_game_over = exit_on_game_over
+        self.verbose = verbose
+
+    def set_message(self, text):
+        super().set_message(text)
+        if self.verbose:
+            print(text)
+
+    def set_error(self, text):
+        super().set_error(text)
+        if self.verbose:
+            print(f"エラー: {text}")
+
+    def process_message(self, message):
+        """メッセージを処理し、自分の手番なら手を打つ"""
+        super().process_message(message)
+
+        if self.game_status == "ended" or message.get("type") == "game_over":
+            if self.verbose:
+                black, white = self.count_stones()
+                print(f"ゲーム終了: 勝者={self.winner} 黒={black} 白={white}")
+            if self.exit_on_game_over:
+                self.running = False
+                return
+
+        self.play_auto_move()
+
+    def start(self):
+        """受信ループをこのスレッドで実行（切断または対局終了まで戻らない）"""
+        if not self.connected:
+            self.set_error("サーバーに接続されていません")
+            return
+        try:
+            self.receive_loop()
+        finally:
+            self.close()
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="画面なしでAIに対局させる")
+    parser.add_argument("server_ip", nargs="?", default="127.0.0.1", help="サーバーIP")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help="サーバーのポート")
+    parser.add_argument("--engine", choices=ENGINES, default="alphabeta", help="AIの種類")
+    parser.add_argument("--time", type=float, default=1.0, help="AIの1手あたりの思考時間（秒）")
+    parser.add_argument("--book", help="AIが使う定石ファイル")
+    parser.add_argument("--rave", action="store_true", help="MCTSでRAVEを使う")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="MCTSのワーカープロセス数（0ならCPU数）")
+    parser.add_argument("--keep-alive", action="store_true", help="対局が終わっても接続を続ける")
+    parser.add_argument("-v", "--verbose", action="store_true", help="メッセージを表示する")
+    parser.add_argument("--no-binary", dest="binary", action="store_false",
+                        help="盤面をバイナリフレームで受け取らない（JSONのみ）")
+    parser.add_argument("--no-delta", dest="delta", action="store_false",
+                        help="着手だけでなく毎回盤面全体を受け取る")
+    parser.add_argument("--record", metavar="DIR", help="対局を棋譜ストアに保存する")
+    args = parser.parse_args()
+
+    book = OpeningBook(args.book) if args.book else None
+    player = create_player(args.engine, time_limit=args.time, book=book, rave=args.rave,
+                           workers=args.workers)
+    client = HeadlessReversiClient(player, exit_on_game_over=not args.keep_alive,
+                                   verbose=args.verbose, binary_frames=args.binary,
+                                   delta_updates=args.delta)
+    if args.record:
+        client.game_writer = GameWriter(args.record)
+        client.player_name = args.engine
+
+    if not client.connect_to_server(args.server_ip, args.port):
+        print(f"サーバーに接続できません: {client.error}")
+        client.close()
+        return
+
+    client.start()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,15 @@
 import pygame
-import socket
-import json
-import threading
 import time
 import sys
 import os
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 
-# サーバー設定
-SERVER_PORT = 10000
-BUFFER_SIZE = 4096
+from ai import ENGINES, create_player
+from book import OpeningBook
+from client_base import DEBUG, SERVER_PORT, BaseReversiClient
+from gamestore import GameWriter
+from text_cache import get_font, render_text
 
 # ゲーム表示設定
 WINDOW_WIDTH = 920
@@ -25,32 +26,44 @@ GRAY = (128, 128, 128)
 RED = (255, 0, 0)
 BLUE = (0, 0, 255)
 TRANSPARENT = (0, 0, 0, 128)
-
-# デバッグモード
-DEBUG = False
-
-
-class ReversiClient:
-    def __init__(self):
-        # ネットワーク関連
-        self.socket = None
-        self.connected = False
-        self.receive_thread = None
-
-        # ゲーム状態
-        self.player_number = -1  # -1: 未割り当て/観戦者, 0: 黒, 1: 白
-        self.is_spectator = True
-        self.board = [[0 for _ in range(BOARD_SIZE)]
-                      for _ in range(BOARD_SIZE)]
-        self.current_turn = 0  # 0: 黒, 1: 白
-        self.game_status = "not_started"  # not_started, waiting, playing, ended
-        self.winner = -1  # -1: 未決着, 0: 黒勝ち, 1: 白勝ち
-
-        # メッセージとエラー表示
-        self.message = ""
-        self.message_timer = 0
-        self.error = ""
-        self.error_timer = 0
+HINT_COLOR = (0, 0, 0, 64)
+
+# 表示上のマスの値（0: 空き, 1: 黒, 2: 白 に加えて、手番で打てる空きマス）
+HINT = -1
+
+# 描画の上限（フレーム/秒）。メッセージ表示の時間もこのフレーム数で数える
+FPS = 30
+# 何も起きなくても起きる間隔（ミリ秒）
+IDLE_TIMEOUT_MS = 1000
+# 受信したメッセージがあることを描画ループに知らせるイベント
+NETWORK_EVENT = pygame.event.custom_type()
+
+# 盤以外で描き直す領域 (x, y, 幅, 高さ)
+STATUS_AREA = (540, 40, WINDOW_WIDTH - 540, 270)
+ERROR_AREA = (0, 515, WINDOW_WIDTH, 30)
+MESSAGE_AREA = (0, 545, WINDOW_WIDTH, WINDOW_HEIGHT - 545)
+METRICS_AREA = (540, 310, WINDOW_WIDTH - 540, 200)
+
+# 処理時間の表示を更新する間隔（秒）
+METRICS_REFRESH = 0.5
+# 処理時間の表示の行（表示名, ヒストグラムの名前）
+METRICS_ROWS = (
+    ("frame", "frame.total"),
+    ("network", "frame.network"),
+    ("events", "frame.events"),
+    ("update", "frame.update"),
+    ("draw", "frame.draw"),
+    ("parse", "net.parse"),
+    ("recv>draw", "net.recv_to_render"),
+    ("move rtt", "net.move_rtt"),
+)
+
+
+class ReversiClient(BaseReversiClient):
+    def __init__(self, auto_player=None, binary_frames=True, delta_updates=True,
+                 optimistic_moves=False, show_hints=True, show_metrics=False, metrics_path=None):
+        # 通信とゲーム状態
+        super().__init__(auto_player, binary_frames, delta_updates, optimistic_moves)
 
         # Pygame初期化
         pygame.init()
@@ -62,22 +75,39 @@ class ReversiClient:
 
         self.clock = pygame.time.Clock()
 
-        # 実行状態
-        self.running = True
+        # 変化しない部分（背景, 盤, 座標）は一度だけ描いておく
+        self.background = self.build_background()
+        # 打てるマスの目印（自分の手番で表示する）
+        self.show_hints = show_hints
+        self.hints = 0
+        self.hint_marker = self.build_hint_marker()
+        # 画面に描いてある内容（変化した部分だけ描き直すため）
+        self.full_redraw = True
+        self.drawn_board = [[None] * BOARD_SIZE for _ in range(BOARD_SIZE)]
+        self.drawn_layers = {}
+        self.drawn_overlay = False
+
+        # 受信の通知を送ってまだ処理していないか（通知をためすぎないため）
+        self.wake_pending = False
+        self.last_update = time.monotonic()
 
         # 最後のクリック位置記録用
         self.last_click_pos = None
 
-        # デバッグログ
-        self.debug_log = []
-
-    def debug_print(self, message):
-        """デバッグメッセージを出力"""
-        if DEBUG:
-            print(f"[DEBUG] {message}")
-            self.debug_log.append(message)
-            if len(self.debug_log) > 10:  # 最大10行保持
-                self.debug_log.pop(0)
+        # 処理時間の表示（F3 キーで切り替え）と、終了時に書き出す JSON のパス
+        self.show_metrics = show_metrics
+        self.metrics_path = metrics_path
+        self.metrics_text = ()
+        self.metrics_refreshed = 0.0
+        # 勝敗画面で入力を待っていた時間（フレームの処理時間から除く）
+        self.input_wait = 0.0
+
+        # 自動プレイヤーの探索は別スレッドで行い、その間も描画と受信を続ける
+        self.search_executor = None
+        if auto_player is not None:
+            self.search_executor = ThreadPoolExecutor(max_workers=1,
+                                                      thread_name_prefix="auto-player")
+        self.auto_search = None  # (探索している局面, Future) / None: 探索していない
 
     def load_japanese_font(self):
         """日本語フォントを読み込む"""
@@ -119,159 +149,81 @@ class ReversiClient:
             self.font = pygame.font.SysFont(None, 24)
             self.big_font = pygame.font.SysFont(None, 36)
 
-    def connect_to_server(self, ip, port):
-        """サーバーに接続"""
-        try:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.connect((ip, port))
-            self.connected = True
-            self.set_message("サーバーに接続しました")
-            self.debug_print(f"サーバー接続成功: {ip}:{port}")
-            return True
-        except Exception as e:
-            self.set_error(f"接続エラー: {str(e)}")
-            self.debug_print(f"接続エラー: {str(e)}")
-            return False
-
     def start(self):
         """メインループを開始"""
         if not self.connected:
             self.set_error("サーバーに接続されていません")
             return
 
-        # 受信スレッド開始
-        self.receive_thread = threading.Thread(target=self.receive_loop)
-        self.receive_thread.daemon = True
-        self.receive_thread.start()
+        # 受信はイベントループに任せ、状態の更新はこのスレッドで行う
+        self.start_transport(on_event=self.wake)
 
-        # メインゲームループ
+        # メインゲームループ（入力, 受信, 表示の期限のどれかが来るまで眠る）
         while self.running:
-            self.handle_events()
+            events = self.wait_events()
+            self.wake_pending = False
+            start = time.perf_counter()
+            self.poll_network()
+            polled = time.perf_counter()
+            self.handle_events(events)
+            handled = time.perf_counter()
             self.update()
+            updated = time.perf_counter()
             self.draw()
-            self.clock.tick(30)
+            self.record_frame(start, polled, handled, updated, time.perf_counter())
+            # 受信が続いても描画は FPS までに抑える
+            self.clock.tick(FPS)
 
         # クリーンアップ
         self.cleanup()
 
-    def receive_loop(self):
-        """メッセージ受信ループ（別スレッド）"""
-        buffer = ""
-        while self.connected and self.running:
+    def record_frame(self, start, polled, handled, updated, drawn):
+        """1フレームの処理時間と、受信してから描き終えるまでの時間を記録する"""
+        metrics = self.metrics
+        waited = self.input_wait
+        self.input_wait = 0.0
+        metrics.add("frame.network", polled - start)
+        metrics.add("frame.events", handled - polled)
+        metrics.add("frame.update", updated - handled - waited)
+        metrics.add("frame.draw", drawn - updated)
+        metrics.add("frame.total", drawn - start - waited)
+        if self.received_at is not None:
+            metrics.add("net.recv_to_render", max(0.0, drawn - self.received_at - waited))
+            self.received_at = None
+
+    def wake(self):
+        """受信したことを描画ループに知らせる（イベントループのスレッドから呼ばれる）"""
+        if not self.wake_pending:
+            self.wake_pending = True
             try:
-                data = self.socket.recv(BUFFER_SIZE).decode()
-                if not data:
-                    self.handle_disconnection()
-                    break
-
-                buffer += data
-                self.debug_print(f"受信データ: {data}")
-
-                # 複数のJSONメッセージが連結している可能性があるので分割処理
-                while buffer:
-                    try:
-                        message = json.loads(buffer)
-                        self.debug_print(f"処理メッセージ: {json.dumps(message)}")
-                        self.process_message(message)
-                        buffer = ""
-                        break
-                    except json.JSONDecodeError:
-                        # 完全なJSONでない場合は次回に持ち越し
-                        try:
-                            # 途中まで処理できるか試す
-                            pos = buffer.find("}{")
-                            if pos != -1:
-                                message = json.loads(buffer[:pos+1])
-                                self.debug_print(
-                                    f"部分メッセージ処理: {json.dumps(message)}")
-                                self.process_message(message)
-                                buffer = buffer[pos+1:]
-                            else:
-                                # 不完全なメッセージは次回に持ち越し
-                                self.debug_print(f"不完全なメッセージ保留: {buffer}")
-                                break
-                        except Exception as e:
-                            self.debug_print(f"部分メッセージ処理エラー: {str(e)}")
-                            # 不完全なメッセージは次回に持ち越し
-                            break
-
-            except Exception as e:
-                self.set_error(f"受信エラー: {str(e)}")
-                self.debug_print(f"受信エラー: {str(e)}")
-                self.handle_disconnection()
-                break
-
-    def process_message(self, message):
-        """受信したメッセージを処理"""
-        if "type" in message:
-            self.handle_type_message(message)
-        elif "board" in message:
-            self.handle_board_message(message)
-        elif "error" in message:
-            self.handle_error_message(message)
-        else:
-            self.debug_print(f"不明なメッセージフォーマット: {json.dumps(message)}")
-
-    def handle_type_message(self, message):
-        """タイプメッセージの処理"""
-        msg_type = message["type"]
-        self.debug_print(f"タイプメッセージ: {msg_type}")
-
-        if msg_type == "player_assigned":
-            self.player_number = message["player_number"]
-            self.is_spectator = False
-            player_str = "黒（先手）" if self.player_number == 0 else "白（後手）"
-            self.set_message(f"あなたはプレイヤー {player_str} です")
-            self.game_status = "waiting"
-            self.debug_print(f"プレイヤー割り当て: {player_str}")
-
-        elif msg_type == "spectator_assigned":
-            self.is_spectator = True
-            self.player_number = -1
-            self.set_message("あなたは観戦者です")
-            self.game_status = "waiting"
-            self.debug_print("観戦者として割り当てられました")
-
-        elif msg_type == "game_start":
-            self.game_status = "playing"
-            self.set_message("ゲームが開始されました")
-            self.debug_print("ゲーム開始")
-
-        elif msg_type == "game_over":
-            self.game_status = "ended"
-            self.winner = message["winner"]
-            self.debug_print(f"ゲーム終了: 勝者={self.winner}")
-
-            # 次のゲームのためにwaiting状態に戻す
-            self.game_status = "waiting"
-
-    def handle_board_message(self, message):
-        """盤面メッセージの処理"""
-        self.board = message["board"]
-        self.current_turn = message["current_turn"]
-        self.debug_print(f"盤面更新: 現在の手番={self.current_turn}")
-
-        if message["winner"] != -1:
-            self.winner = message["winner"]
-            self.game_status = "ended"
-            self.debug_print(f"ゲーム終了: 勝者={self.winner}")
-
-    def handle_error_message(self, message):
-        """エラーメッセージの処理"""
-        error_text = message["error"]
-        self.set_error(error_text)
-        self.debug_print(f"エラーメッセージ: {error_text}")
-
-    def handle_disconnection(self):
-        """切断処理"""
-        if self.connected:
-            self.connected = False
-            self.set_error("サーバーから切断されました")
-            self.debug_print("サーバーから切断されました")
+                pygame.event.post(pygame.event.Event(NETWORK_EVENT))
+            except pygame.error:
+                # 終了処理で pygame を閉じた後
+                pass
 
-    def handle_events(self):
+    def next_timeout(self):
+        """次に起きるまでの時間（ミリ秒）。表示中のメッセージとエラーが消える時刻まで"""
+        timeout = IDLE_TIMEOUT_MS
+        if self.show_metrics:
+            timeout = int(METRICS_REFRESH * 1000)
+        timers = [timer for timer in (self.message_timer, self.error_timer) if timer > 0]
+        if not timers:
+            return timeout
+        return max(1, min(timeout, int(min(timers) * 1000 / FPS) + 1))
+
+    def wait_events(self):
+        """イベントが来るか次に表示を変える時刻まで待ち、たまっているイベントを返す"""
+        event = pygame.event.wait(self.next_timeout())
+        events = pygame.event.get()
+        if event.type != pygame.NOEVENT:
+            events.insert(0, event)
+        return events
+
+    def handle_events(self, events=None):
         """イベント処理"""
-        for event in pygame.event.get():
+        if events is None:
+            events = pygame.event.get()
+        for event in events:
             if event.type == pygame.QUIT:
                 self.running = False
 
@@ -295,6 +247,12 @@ class ReversiClient:
                         not self.is_spectator and
                             self.current_turn == self.player_number):
 
+                        # 局面ごとに覚えてある合法手で、置けないマスのクリックは送らない
+                        if self.check_move(board_y, board_x) == 0:
+                            self.set_error("その場所には置けません")
+                            self.debug_print(f"置けないマス: row={board_y}, col={board_x}")
+                            continue
+
                         self.debug_print(f"手を送信: row={board_y}, col={board_x}")
                         self.send_move(board_y, board_x)  # row, colの順
                     else:
@@ -314,6 +272,10 @@ class ReversiClient:
                     self.force_win(1)
                 elif event.key == pygame.K_r:  # "R"キーで引き分け
                     self.force_win(-1)
+                elif event.key == pygame.K_h:  # "H"キーで打てるマスの表示を切り替え
+                    self.show_hints = not self.show_hints
+                elif event.key == pygame.K_F3:  # "F3"キーで処理時間の表示を切り替え
+                    self.show_metrics = not self.show_metrics
                             
     def force_win(self, winner):
         """
@@ -350,22 +312,25 @@ class ReversiClient:
         else:
             winner_text = "引き分け！"
 
-        winner_surface = self.big_font.render(winner_text, True, WHITE)
+        winner_surface = render_text(self.big_font, winner_text, True, WHITE)
         winner_rect = winner_surface.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 - 50))
         self.screen.blit(winner_surface, winner_rect)
 
         # 再戦または終了のメッセージ
         restart_text = "スペースキーで再戦 / ESCキーで終了"
-        restart_surface = self.font.render(restart_text, True, WHITE)
+        restart_surface = render_text(self.font, restart_text, True, WHITE)
         restart_rect = restart_surface.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 50))
         self.screen.blit(restart_surface, restart_rect)
 
         pygame.display.flip()
+        self.full_redraw = True
 
-        # ユーザー入力を待つ
+        # ユーザー入力を待つ（待っている時間は処理時間に数えない）
+        wait_start = time.perf_counter()
         waiting = True
         while waiting:
-            for event in pygame.event.get():
+            # 入力があるまで眠る
+            for event in [pygame.event.wait()] + pygame.event.get():
                 if event.type == pygame.QUIT:
                     self.running = False
                     waiting = False
@@ -376,6 +341,7 @@ class ReversiClient:
                     elif event.key == pygame.K_ESCAPE:  # ESCキーで終了
                         self.running = False
                         waiting = False
+        self.input_wait += time.perf_counter() - wait_start
 
     def reset_game(self):
         """ゲームをリセット"""
@@ -384,29 +350,148 @@ class ReversiClient:
         self.board[4][4] = 2
         self.board[3][4] = 1
         self.board[4][3] = 1
+        self.state.set_board(self.board)
+        self.final_score = None
         self.current_turn = 0
         self.game_status = "playing"
         self.winner = -1
         self.set_message("新しいゲームを開始しました")
 
+    def play_auto_move(self):
+        """
+        自動プレイヤーの手番なら探索を別スレッドで始め、終わっていれば手を送信する。
+
+        探索が終わると wake() で描画ループを起こす。探索中に盤面が変わった
+        （仮の手の取り消し, スナップショット, 終局など）場合、その手は捨てて探索し直す。
+        """
+        if self.auto_search is not None:
+            position, future = self.auto_search
+            if not future.done():
+                return
+            self.auto_search = None
+            move = future.result()
+            if position == self.auto_move_target():
+                self.send_auto_move(position, move)
+                return
+
+        position = self.auto_move_target()
+        if position is None:
+            return
+        # 探索中もこのスレッドで盤面を書き換えるので、複製を渡す
+        board = [row[:] for row in self.board]
+        future = self.search_executor.submit(self.auto_player.choose_move, board,
+                                             self.player_number + 1, 0)
+        future.add_done_callback(lambda _: self.wake())
+        self.auto_search = (position, future)
+
     def update(self):
         """状態更新"""
+        # 前回から経過したフレーム数（ループは不定期に回るので時間から求める）
+        now = time.monotonic()
+        frames = (now - self.last_update) * FPS
+        self.last_update = now
+
         # メッセージタイマー更新
         if self.message_timer > 0:
-            self.message_timer -= 1
+            self.message_timer = max(0, self.message_timer - frames)
 
         # エラータイマー更新
         if self.error_timer > 0:
-            self.error_timer -= 1
+            self.error_timer = max(0, self.error_timer - frames)
+
+        # 自動プレイヤーの手番
+        self.play_auto_move()
 
         # ゲーム終了時に勝敗画面遷移
         if self.game_status == "ended":
             self.show_winner_screen()
 
+    def layer_keys(self):
+        """盤以外の領域ごとに、表示内容を決める値をまとめる（変化したら描き直す）"""
+        return {
+            "status": (self.is_spectator, self.player_number, self.current_turn,
+                       self.count_stones(), self.game_status, self.winner, self.connected),
+            "error": self.error if self.error and self.error_timer > 0 else "",
+            "message": self.message if self.message and self.message_timer > 0 else "",
+            "metrics": self.metrics_lines() if self.show_metrics else (),
+        }
+
+    def metrics_lines(self):
+        """処理時間の表示の各行（METRICS_REFRESH ごとに作り直す）"""
+        now = time.monotonic()
+        if now - self.metrics_refreshed >= METRICS_REFRESH:
+            self.metrics_refreshed = now
+            lines = ["ms          p50     p95     max"]
+            for label, name in METRICS_ROWS:
+                histogram = self.metrics.get(name)
+                if histogram is None:
+                    lines.append(f"{label:10s}      -")
+                    continue
+                lines.append(f"{label:10s}{histogram.percentile(50) * 1e3:8.2f}"
+                             f"{histogram.percentile(95) * 1e3:8.2f}{histogram.max * 1e3:8.2f}")
+            self.metrics_text = tuple(lines)
+        return self.metrics_text
+
+    def hint_mask(self):
+        """目印を表示するマスのビットマスク（自分の手番でなければ 0）"""
+        if (not self.show_hints or self.game_status != "playing" or self.is_spectator or
+                self.current_turn != self.player_number or self.provisional is not None):
+            return 0
+        return self.legal_moves()
+
+    def cell_value(self, row, col):
+        """マスの表示内容（石の値か、打てる空きマスなら HINT）"""
+        value = self.board[row][col]
+        if value == 0 and self.hints >> (row * BOARD_SIZE + col) & 1:
+            return HINT
+        return value
+
     def draw(self):
-        """画面描画"""
-        # 背景
-        self.screen.fill(GREEN)
+        """画面描画（前回から変化した部分だけ描き直して画面に反映する）"""
+        self.hints = self.hint_mask()
+        changed = [(row, col) for row in range(BOARD_SIZE) for col in range(BOARD_SIZE)
+                   if self.cell_value(row, col) != self.drawn_board[row][col]]
+        layers = self.layer_keys()
+        overlay = self.game_status == "waiting" and not self.is_spectator
+
+        # 半透明の画面全体の表示とデバッグ表示は重なる部分が多いので全体を描き直す
+        if self.full_redraw or DEBUG or overlay != self.drawn_overlay or (
+                overlay and (changed or layers != self.drawn_layers)):
+            self.draw_all(overlay)
+            self.drawn_layers = layers
+            return
+
+        dirty = [self.draw_cell(row, col) for row, col in changed]
+        painters = {
+            "status": self.draw_status,
+            "error": self.draw_error,
+            "message": self.draw_message,
+            "metrics": self.draw_metrics,
+        }
+        areas = {"status": STATUS_AREA, "error": ERROR_AREA, "message": MESSAGE_AREA,
+                 "metrics": METRICS_AREA}
+        for name, key in layers.items():
+            area = pygame.Rect(areas[name])
+            # 内容が変わったか、表示中の文字の下の石を描き直した場合に描き直す
+            if key == self.drawn_layers.get(name) and not (key and area.collidelist(dirty) != -1):
+                continue
+            self.screen.set_clip(area)
+            self.screen.blit(self.background, area, area)
+            for row in range(BOARD_SIZE):
+                for col in range(BOARD_SIZE):
+                    if self.cell_rect(row, col).colliderect(area):
+                        self.draw_cell(row, col)
+            painters[name]()
+            self.screen.set_clip(None)
+            dirty.append(area)
+        self.drawn_layers = layers
+
+        if dirty:
+            pygame.display.update(dirty)
+
+    def draw_all(self, overlay):
+        """画面全体を描き直す"""
+        self.screen.blit(self.background, (0, 0))
 
         # ボード
         self.draw_board()
@@ -420,8 +505,11 @@ class ReversiClient:
         # エラー
         self.draw_error()
 
+        # 処理時間
+        self.draw_metrics()
+
         # 接続待ち表示
-        if self.game_status == "waiting" and not self.is_spectator:
+        if overlay:
             self.draw_waiting_screen()
 
         # デバッグ情報
@@ -429,6 +517,8 @@ class ReversiClient:
             self.draw_debug_info()
 
         pygame.display.flip()
+        self.full_redraw = False
+        self.drawn_overlay = overlay
 
     def draw_debug_info(self):
         """デバッグ情報の表示"""
@@ -439,21 +529,21 @@ class ReversiClient:
         self.screen.blit(debug_surface, debug_rect)
 
         # ゲーム状態の詳細表示
-        state_text = self.font.render(
-            f"状態: {self.game_status} | プレイヤー: {self.player_number} | 手番: {self.current_turn}", True, WHITE)
+        state_text = render_text(
+            self.font, f"状態: {self.game_status} | プレイヤー: {self.player_number} | 手番: {self.current_turn}", True, WHITE)
         self.screen.blit(state_text, (20, 350))
 
         # 最後のクリック位置表示
         if self.last_click_pos:
-            click_text = self.font.render(
-                f"最後のクリック: {self.last_click_pos}", True, WHITE)
+            click_text = render_text(
+                self.font, f"最後のクリック: {self.last_click_pos}", True, WHITE)
             self.screen.blit(click_text, (20, 375))
 
         # デバッグログの表示
         y_pos = 400
         for i, log in enumerate(self.debug_log[-5:]):  # 最新の5件のみ表示
-            log_text = self.font.render(
-                str(log)[-60:] if len(str(log)) > 60 else str(log), True, WHITE)  # 長すぎる場合は末尾のみ
+            log_text = render_text(
+                self.font, str(log)[-60:] if len(str(log)) > 60 else str(log), True, WHITE)  # 長すぎる場合は末尾のみ
             self.screen.blit(log_text, (20, y_pos + i * 20))
 
     def draw_waiting_screen(self):
@@ -466,14 +556,14 @@ class ReversiClient:
             self.screen.blit(overlay, (0, 0))
 
             # 待機メッセージ
-            waiting_text = self.big_font.render("対戦相手を待っています...", True, WHITE)
+            waiting_text = render_text(self.big_font, "対戦相手を待っています...", True, WHITE)
             text_rect = waiting_text.get_rect(
                 center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2))
             self.screen.blit(waiting_text, text_rect)
 
             # 補足情報
-            info_text = self.font.render(
-                "ゲームを開始するには2人のプレイヤーが必要です", True, WHITE)
+            info_text = render_text(
+                self.font, "ゲームを開始するには2人のプレイヤーが必要です", True, WHITE)
             info_rect = info_text.get_rect(
                 center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 50))
             self.screen.blit(info_text, info_rect)
@@ -512,10 +602,10 @@ class ReversiClient:
         # 座標表示
         for i in range(BOARD_SIZE):
             # 列番号
-            col_text = self.font.render(str(i), True, BLACK)
+            col_text = render_text(self.font, str(i), True, BLACK)
             self.screen.blit(col_text, (BOARD_MARGIN + i * CELL_SIZE + CELL_SIZE // 2 - 5, TOP_MARGIN - 25))
             # 行番号
-            row_text = self.font.render(str(i), True, BLACK)
+            row_text = render_text(self.font, str(i), True, BLACK)
             self.screen.blit(row_text, (BOARD_MARGIN - 25, TOP_MARGIN + i * CELL_SIZE + CELL_SIZE // 2 - 5))
 
         # 石数表示（左上・右下はそのまま）
@@ -534,18 +624,21 @@ class ReversiClient:
 
             # 左上：相手
             pygame.draw.circle(self.screen, opp_color, (60, 40), 25)
-            opp_font = pygame.font.Font(None, 48)
-            opp_text = opp_font.render(str(opp_count), True, BLACK if opp_color == WHITE else WHITE)
+            opp_font = get_font(None, 48, sysfont=False)
+            opp_text = render_text(opp_font, str(opp_count), True, BLACK if opp_color == WHITE else WHITE)
             self.screen.blit(opp_text, (95, 22))
 
             # 右下：自分
             pygame.draw.circle(self.screen, my_color, (WINDOW_WIDTH - 80, WINDOW_HEIGHT - 40), 25)
-            my_font = pygame.font.Font(None, 48)
-            my_text = my_font.render(str(my_count), True, BLACK if my_color == WHITE else WHITE)
+            my_font = get_font(None, 48, sysfont=False)
+            my_text = render_text(my_font, str(my_count), True, BLACK if my_color == WHITE else WHITE)
             self.screen.blit(my_text, (WINDOW_WIDTH - 50, WINDOW_HEIGHT - 58))
 
-    def draw_board(self):
-        """ボードの描画"""
+    def build_background(self):
+        """背景, ボード, 座標を描いたサーフェスを作る"""
+        background = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+        background.fill(GREEN)
+
         # ボード背景
         board_rect = pygame.Rect(
             BOARD_MARGIN - 5,
@@ -553,44 +646,71 @@ class ReversiClient:
             CELL_SIZE * BOARD_SIZE + 10,
             CELL_SIZE * BOARD_SIZE + 10
         )
-        pygame.draw.rect(self.screen, DARKGREEN, board_rect)
+        pygame.draw.rect(background, DARKGREEN, board_rect)
 
-        # セルとコマの描画
+        # セル
         for row in range(BOARD_SIZE):
             for col in range(BOARD_SIZE):
-                # セル
-                cell_rect = pygame.Rect(
-                    BOARD_MARGIN + col * CELL_SIZE,
-                    BOARD_MARGIN + row * CELL_SIZE,
-                    CELL_SIZE,
-                    CELL_SIZE
-                )
-                pygame.draw.rect(self.screen, LIGHTGREEN, cell_rect)
-                pygame.draw.rect(self.screen, BLACK, cell_rect, 1)
-
-                # コマ
-                if self.board[row][col] != 0:
-                    center_x = BOARD_MARGIN + col * CELL_SIZE + CELL_SIZE // 2
-                    center_y = BOARD_MARGIN + row * CELL_SIZE + CELL_SIZE // 2
-
-                    color = BLACK if self.board[row][col] == 1 else WHITE
-                    radius = CELL_SIZE // 2 - 5
-
-                    pygame.draw.circle(self.screen, color,
-                                       (center_x, center_y), radius)
+                cell_rect = self.cell_rect(row, col)
+                pygame.draw.rect(background, LIGHTGREEN, cell_rect)
+                pygame.draw.rect(background, BLACK, cell_rect, 1)
 
         # 座標表示
         for i in range(BOARD_SIZE):
             # 列番号（0-7）
-            col_text = self.font.render(str(i), True, BLACK)
-            self.screen.blit(col_text, (BOARD_MARGIN + i *
-                             CELL_SIZE + CELL_SIZE // 2 - 5, BOARD_MARGIN - 25))
+            col_text = render_text(self.font, str(i), True, BLACK)
+            background.blit(col_text, (BOARD_MARGIN + i *
+                            CELL_SIZE + CELL_SIZE // 2 - 5, BOARD_MARGIN - 25))
 
             # 行番号（0-7）
-            row_text = self.font.render(str(i), True, BLACK)
-            self.screen.blit(row_text, (BOARD_MARGIN - 25,
-                             BOARD_MARGIN + i * CELL_SIZE + CELL_SIZE // 2 - 5))
+            row_text = render_text(self.font, str(i), True, BLACK)
+            background.blit(row_text, (BOARD_MARGIN - 25,
+                            BOARD_MARGIN + i * CELL_SIZE + CELL_SIZE // 2 - 5))
+
+        return background
+
+    def build_hint_marker(self):
+        """打てるマスに重ねる半透明の目印を作る"""
+        marker = pygame.Surface((CELL_SIZE, CELL_SIZE), pygame.SRCALPHA)
+        pygame.draw.circle(marker, HINT_COLOR, (CELL_SIZE // 2, CELL_SIZE // 2), CELL_SIZE // 6)
+        return marker
+
+    def cell_rect(self, row, col):
+        """マスの画面上の矩形"""
+        return pygame.Rect(
+            BOARD_MARGIN + col * CELL_SIZE,
+            BOARD_MARGIN + row * CELL_SIZE,
+            CELL_SIZE,
+            CELL_SIZE
+        )
+
+    def draw_cell(self, row, col):
+        """
+        1マスを背景から描き直し、石があれば描く。
+
+        Returns:
+            pygame.Rect: 描き直した矩形
+        """
+        cell_rect = self.cell_rect(row, col)
+        self.screen.blit(self.background, cell_rect, cell_rect)
+
+        # コマ
+        value = self.cell_value(row, col)
+        if value == HINT:
+            self.screen.blit(self.hint_marker, cell_rect)
+        elif value != 0:
+            color = BLACK if value == 1 else WHITE
+            radius = CELL_SIZE // 2 - 5
+            pygame.draw.circle(self.screen, color, cell_rect.center, radius)
 
+        self.drawn_board[row][col] = value
+        return cell_rect
+
+    def draw_board(self):
+        """ボードの描画（背景は描画済みとして石だけを描く）"""
+        for row in range(BOARD_SIZE):
+            for col in range(BOARD_SIZE):
+                self.draw_cell(row, col)
 
     def draw_status(self):
         """ステータス情報の描画"""
@@ -598,132 +718,137 @@ class ReversiClient:
         if not self.is_spectator:
             player_str = "あなた: " + \
                 ("黒（先手）" if self.player_number == 0 else "白（後手）")
-            player_text = self.font.render(player_str, True, BLACK)
+            player_text = render_text(self.font, player_str, True, BLACK)
             self.screen.blit(player_text, (550, 50))
         else:
-            spectator_text = self.font.render("あなたは観戦者です", True, BLACK)
+            spectator_text = render_text(self.font, "あなたは観戦者です", True, BLACK)
             self.screen.blit(spectator_text, (550, 50))
 
         # 現在の手番
         turn_str = "現在の手番: " + ("黒" if self.current_turn == 0 else "白")
-        turn_text = self.font.render(turn_str, True, BLACK)
+        turn_text = render_text(self.font, turn_str, True, BLACK)
         self.screen.blit(turn_text, (550, 80))
 
         # 石の数
         black_count, white_count = self.count_stones()
-        count_text = self.font.render(
-            f"黒: {black_count}  白: {white_count}", True, BLACK)
+        count_text = render_text(
+            self.font, f"黒: {black_count}  白: {white_count}", True, BLACK)
         self.screen.blit(count_text, (550, 110))
 
         # ゲーム状態
         if self.game_status == "not_started":
-            status_text = self.font.render("接続中...", True, BLACK)
+            status_text = render_text(self.font, "接続中...", True, BLACK)
             self.screen.blit(status_text, (550, 140))
         elif self.game_status == "waiting":
-            status_text = self.font.render("ゲーム開始を待っています...", True, BLACK)
+            status_text = render_text(self.font, "ゲーム開始を待っています...", True, BLACK)
             self.screen.blit(status_text, (550, 140))
         elif self.game_status == "playing":
             if not self.is_spectator and self.current_turn == self.player_number:
-                status_text = self.font.render("あなたの番です", True, BLUE)
+                status_text = render_text(self.font, "あなたの番です", True, BLUE)
                 self.screen.blit(status_text, (550, 140))
             else:
-                status_text = self.font.render("相手の手を待っています...", True, BLACK)
+                status_text = render_text(self.font, "相手の手を待っています...", True, BLACK)
                 self.screen.blit(status_text, (550, 140))
         elif self.game_status == "ended":
             if self.winner == -1:
-                status_text = self.font.render("ゲーム終了 - 引き分け", True, BLACK)
+                status_text = render_text(self.font, "ゲーム終了 - 引き分け", True, BLACK)
             elif self.winner == 0:
-                status_text = self.font.render("ゲーム終了 - 黒の勝ち", True, BLACK)
+                status_text = render_text(self.font, "ゲーム終了 - 黒の勝ち", True, BLACK)
             else:
-                status_text = self.font.render("ゲーム終了 - 白の勝ち", True, BLACK)
+                status_text = render_text(self.font, "ゲーム終了 - 白の勝ち", True, BLACK)
             self.screen.blit(status_text, (550, 140))
 
         # 接続状態
         conn_status = "接続中" if self.connected else "切断"
         conn_color = BLUE if self.connected else RED
-        conn_text = self.font.render(f"サーバー: {conn_status}", True, conn_color)
+        conn_text = render_text(self.font, f"サーバー: {conn_status}", True, conn_color)
         self.screen.blit(conn_text, (550, 200))
 
         # プレイヤー接続状況の表示
         if self.connected:
             # 1行目
-            connection_label = self.font.render("プレイヤー接続状況:", True, BLACK)
+            connection_label = render_text(self.font, "プレイヤー接続状況:", True, BLACK)
             self.screen.blit(connection_label, (550, 230))
             # 2行目
             status_str = "2人目を待っています" if self.game_status == 'waiting' else "2人接続済み"
             status_color = BLUE if self.game_status == 'waiting' else GREEN
-            connection_status = self.font.render(status_str, True, status_color)
+            connection_status = render_text(self.font, status_str, True, status_color)
             self.screen.blit(connection_status, (550, 260))
 
     def draw_message(self):
         """メッセージの描画"""
         if self.message and self.message_timer > 0:
-            message_text = self.font.render(self.message, True, BLUE)
+            message_text = render_text(self.font, self.message, True, BLUE)
             self.screen.blit(message_text, (50, 550))
 
     def draw_error(self):
         """エラーメッセージの描画"""
         if self.error and self.error_timer > 0:
-            error_text = self.font.render(self.error, True, RED)
+            error_text = render_text(self.font, self.error, True, RED)
             self.screen.blit(error_text, (50, 520))
 
-    def set_message(self, text):
-        """メッセージを設定"""
-        self.message = text
-        self.message_timer = 180  # 約6秒間表示
-
-    def set_error(self, text):
-        """エラーメッセージを設定"""
-        self.error = text
-        self.error_timer = 180  # 約6秒間表示
-
-    def count_stones(self):
-        """黒と白の石の数をカウント"""
-        black = sum(row.count(1) for row in self.board)
-        white = sum(row.count(2) for row in self.board)
-        return black, white
-
-    def send_move(self, row, col):
-        """手を送信"""
-        if not self.connected:
-            self.set_error("サーバーに接続されていません")
+    def draw_metrics(self):
+        """処理時間の描画"""
+        if not self.show_metrics:
             return
-
-        # サーバーコードから期待されるJSONフォーマット
-        message = {"row": row, "col": col}
-
-        try:
-            # JSONデータを送信（スペースなしに）
-            json_str = json.dumps(message, separators=(',', ':'))  # スペースを省く
-            self.debug_print(f"送信データ: {json_str}")
-            self.socket.send(json_str.encode())
-        except Exception as e:
-            self.set_error(f"送信エラー: {str(e)}")
-            self.debug_print(f"送信エラー: {str(e)}")
-            self.handle_disconnection()
+        font = get_font(None, 20, sysfont=False)
+        for i, line in enumerate(self.metrics_lines()):
+            line_text = render_text(font, line, True, BLACK)
+            self.screen.blit(line_text, (550, 320 + i * 20))
 
     def cleanup(self):
-        """リソースの解放"""
-        if self.socket and self.connected:
-            try:
-                self.socket.close()
-            except:
-                pass
+        """リソースの解放（指定されていれば処理時間を JSON で書き出す）"""
+        if self.search_executor is not None:
+            # 探索中の手は送らない（自動プレイヤーを閉じる前に探索の終了を待つ）
+            self.search_executor.shutdown(wait=True, cancel_futures=True)
+        self.close()
         pygame.quit()
+        if self.metrics_path:
+            try:
+                self.metrics.dump(self.metrics_path)
+            except OSError as e:
+                print(f"処理時間を書き出せません: {e}")
 
 
 def main():
     """メイン関数"""
-    args = sys.argv
-    # サーバーIPをコマンドライン引数から取得
     # コマンドライン引数でサーバーIPを指定できるようにする
-    server_ip = args[1] if len(args) > 1 else "127.0.0.1"
-    if len(sys.argv) > 1:
-        server_ip = sys.argv[1]
+    parser = argparse.ArgumentParser()
+    parser.add_argument("server_ip", nargs="?", default="127.0.0.1", help="サーバーIP")
+    parser.add_argument("--ai", action="store_true", help="AIが自動で手を打つ")
+    parser.add_argument("--time", type=float, default=1.0, help="AIの1手あたりの思考時間（秒）")
+    parser.add_argument("--book", help="AIが使う定石ファイル")
+    parser.add_argument("--engine", choices=ENGINES, default="alphabeta", help="AIの種類")
+    parser.add_argument("--rave", action="store_true", help="MCTSでRAVEを使う")
+    parser.add_argument("--no-binary", dest="binary", action="store_false",
+                        help="盤面をバイナリフレームで受け取らない（JSONのみ）")
+    parser.add_argument("--no-delta", dest="delta", action="store_false",
+                        help="着手だけでなく毎回盤面全体を受け取る")
+    parser.add_argument("--optimistic", action="store_true",
+                        help="自分の手をサーバーの返事を待たずに盤面へ反映する")
+    parser.add_argument("--no-hints", dest="hints", action="store_false",
+                        help="打てるマスを表示しない（H キーでも切り替えられる）")
+    parser.add_argument("--record", metavar="DIR", help="対局を棋譜ストアに保存する")
+    parser.add_argument("--name", default="", help="棋譜に記録する自分の名前")
+    parser.add_argument("--show-metrics", action="store_true",
+                        help="処理時間を画面に表示する（F3 キーでも切り替えられる）")
+    parser.add_argument("--metrics", metavar="FILE", help="終了時に処理時間を JSON で書き出す")
+    args = parser.parse_args()
+    server_ip = args.server_ip
 
     print(f"リバーシクライアント - サーバーIP: {server_ip} ポート: {SERVER_PORT}")
 
-    client = ReversiClient()
+    auto_player = None
+    if args.ai:
+        book = OpeningBook(args.book) if args.book else None
+        auto_player = create_player(args.engine, time_limit=args.time, book=book,
+                                    rave=args.rave)
+    client = ReversiClient(auto_player, binary_frames=args.binary, delta_updates=args.delta,
+                           optimistic_moves=args.optimistic, show_hints=args.hints,
+                           show_metrics=args.show_metrics, metrics_path=args.metrics)
+    if args.record:
+        client.game_writer = GameWriter(args.record)
+        client.player_name = args.name
 
     # サーバー接続
     if not client.connect_to_server(server_ip, SERVER_PORT):
@@ -0,0 +1,563 @@
+import socket
+import json
+import time
+
+from async_net import CLOSED, ERROR, AsyncConnection
+from bitboard import INITIAL_BLACK, INITIAL_WHITE, flips, iter_squares, legal_moves
+from board_state import BoardState, LegalMoveCache
+from framing import FrameDecoder, board_hash
+from gamestore import FLAG_TRUNCATED
+from metrics import Metrics
+
+# サーバー設定
+SERVER_PORT = 10000
+BUFFER_SIZE = 4096
+
+BOARD_SIZE = 8
+
+# デバッグモード
+DEBUG = False
+
+
+class BaseReversiClient:
+    """
+    サーバーとの通信とゲーム状態の管理を行うクライアントの基底クラス。
+
+    画面を持たないので pygame に依存しない。表示を行うクライアントは
+    このクラスを継承して描画と入力処理を追加する。
+
+    Args:
+        auto_player: 自動で手を選ぶプレイヤー（choose_move(board, turn, empty) を持つもの）。
+                     None の場合は手を自動では打たない
+        binary_frames (bool): サーバーが対応していれば盤面をバイナリフレームで受け取る
+        delta_updates (bool): サーバーが対応していれば盤面の代わりに着手だけを受け取り、
+                              手元で盤面を進める（binary_frames が True のときのみ）
+        optimistic_moves (bool): 自分の手を送信と同時に仮の盤面として反映し、
+                                 サーバーからの盤面が届いたら確定または取り消す
+    """
+
+    def __init__(self, auto_player=None, binary_frames=True, delta_updates=True,
+                 optimistic_moves=False):
+        # ネットワーク関連
+        self.socket = None
+        self.connected = False
+        self.receive_thread = None
+        # 非同期通信を使う場合の接続（async_net.AsyncConnection）
+        self.transport = None
+        self.binary_frames = binary_frames
+        self.delta_updates = delta_updates
+
+        # ゲーム状態
+        self.player_number = -1  # -1: 未割り当て/観戦者, 0: 黒, 1: 白
+        self.is_spectator = True
+        self.board = [[0 for _ in range(BOARD_SIZE)]
+                      for _ in range(BOARD_SIZE)]
+        self.current_turn = 0  # 0: 黒, 1: 白
+        self.game_status = "not_started"  # not_started, waiting, playing, ended
+        self.winner = -1  # -1: 未決着, 0: 黒勝ち, 1: 白勝ち
+        # 盤面の石数やハッシュ（board を書き換えたら合わせて更新する）
+        self.state = BoardState()
+        self.move_cache = LegalMoveCache()
+        self.final_score = None  # game_over で届いた (黒, 白) の石数
+
+        # 棋譜の記録
+        self.moves = []  # この対局の着手（ビット番号）
+        self.moves_complete = False  # 初期局面から欠けずに着手を追えているか
+        self.game_writer = None  # 終局した対局を書き込む gamestore.GameWriter
+        self.player_name = ""  # 棋譜に記録する自分の名前
+
+        # 差分更新の状態
+        self.seq = None  # 最後に適用した着手の通し番号（None: 基準の盤面なし）
+        self.snapshot_requested = False
+        self.last_move = None  # 直前の手 (row, col)
+        self.last_flipped = []  # 直前の手で返った石の (row, col)
+
+        # 仮に反映した自分の手
+        self.optimistic_moves = optimistic_moves
+        self.provisional = None  # (手, 反映前の状態) / None: 仮の手なし
+
+        # メッセージとエラー表示
+        self.message = ""
+        self.message_timer = 0
+        self.error = ""
+        self.error_timer = 0
+
+        # 実行状態
+        self.running = True
+
+        # デバッグログ
+        self.debug_log = []
+
+        # 処理時間の計測（net.parse: メッセージの解析, net.move_rtt: 手を送ってから盤面が届くまで）
+        self.metrics = Metrics()
+        self.received_at = None  # まだ画面に反映していない最初のメッセージの受信時刻
+        self.move_sent_at = None  # 盤面が届くのを待っている手を送った時刻
+
+        # 自動プレイヤー
+        self.auto_player = auto_player
+        # 最後に自動で手を打った局面（同じ局面で二重に打たないため）
+        self.auto_move_position = None
+
+    def debug_print(self, message):
+        """デバッグメッセージを出力"""
+        if DEBUG:
+            print(f"[DEBUG] {message}")
+            self.debug_log.append(message)
+            if len(self.debug_log) > 10:  # 最大10行保持
+                self.debug_log.pop(0)
+
+    def connect_to_server(self, ip, port):
+        """サーバーに接続"""
+        try:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.socket.connect((ip, port))
+            self.connected = True
+            self.set_message("サーバーに接続しました")
+            self.debug_print(f"サーバー接続成功: {ip}:{port}")
+            return True
+        except Exception as e:
+            self.set_error(f"接続エラー: {str(e)}")
+            self.debug_print(f"接続エラー: {str(e)}")
+            return False
+
+    def receive_loop(self):
+        """メッセージ受信ループ（別スレッド）"""
+        decoder = FrameDecoder()
+        while self.connected and self.running:
+            try:
+                data = self.socket.recv(BUFFER_SIZE)
+                if not data:
+                    self.handle_disconnection()
+                    break
+
+                self.debug_print(f"受信データ: {data.decode(errors='replace')}")
+
+                # 連結して届いたメッセージを1つずつ処理
+                received = time.perf_counter()
+                messages = decoder.feed(data)
+                if messages:
+                    parse_time = (time.perf_counter() - received) / len(messages)
+                    for _ in messages:
+                        self.metrics.add("net.parse", parse_time)
+                for message in messages:
+                    self.debug_print(f"処理メッセージ: {json.dumps(message)}")
+                    self.process_message(message)
+
+            except Exception as e:
+                self.set_error(f"受信エラー: {str(e)}")
+                self.debug_print(f"受信エラー: {str(e)}")
+                self.handle_disconnection()
+                break
+
+    def start_transport(self, network_loop=None, on_event=None):
+        """
+        受信スレッドの代わりに asyncio のイベントループで通信する。
+
+        受信したメッセージは poll_network() を呼んだスレッドで処理される。
+
+        Args:
+            network_loop (async_net.NetworkLoop): 使うループ（省略時は共有のループ）
+            on_event: 受信や切断のたびにイベントループのスレッドから呼ぶ関数
+        """
+        self.transport = AsyncConnection(self.socket, network_loop, on_event)
+
+    def poll_network(self):
+        """イベントループが受信したメッセージをこのスレッドで処理する"""
+        if self.transport is None:
+            return
+        for kind, payload, received, parse_time in self.transport.poll_timed():
+            if kind == CLOSED:
+                self.handle_disconnection()
+            elif kind == ERROR:
+                self.set_error(payload)
+                self.debug_print(payload)
+            else:
+                self.metrics.add("net.parse", parse_time)
+                if self.received_at is None:
+                    self.received_at = received
+                self.process_message(payload)
+
+    def process_message(self, message):
+        """受信したメッセージを処理"""
+        # サーバーの盤面は仮の手を打つ前の盤面に対して届くので、先に元に戻す
+        if self.provisional is not None and "type" not in message:
+            self.rollback_provisional(message)
+        if "type" in message:
+            self.handle_type_message(message)
+        elif "delta" in message:
+            self.handle_delta_message(message)
+            self.board_updated()
+        elif "board" in message:
+            self.handle_board_message(message)
+            self.board_updated()
+        elif "error" in message:
+            self.handle_error_message(message)
+            # 手が受理されなかった場合は盤面が届かない
+            self.move_sent_at = None
+        else:
+            self.debug_print(f"不明なメッセージフォーマット: {json.dumps(message)}")
+
+    def board_updated(self):
+        """盤面が届いたとき、送った手の往復時間を記録する"""
+        if self.move_sent_at is not None:
+            self.metrics.add("net.move_rtt", time.perf_counter() - self.move_sent_at)
+            self.move_sent_at = None
+
+    def handle_type_message(self, message):
+        """タイプメッセージの処理"""
+        msg_type = message["type"]
+        self.debug_print(f"タイプメッセージ: {msg_type}")
+
+        if msg_type == "player_assigned":
+            self.player_number = message["player_number"]
+            self.is_spectator = False
+            player_str = "黒（先手）" if self.player_number == 0 else "白（後手）"
+            self.set_message(f"あなたはプレイヤー {player_str} です")
+            self.game_status = "waiting"
+            self.debug_print(f"プレイヤー割り当て: {player_str}")
+            self.negotiate_frames(message)
+
+        elif msg_type == "spectator_assigned":
+            self.is_spectator = True
+            self.player_number = -1
+            self.set_message("あなたは観戦者です")
+            self.game_status = "waiting"
+            self.debug_print("観戦者として割り当てられました")
+            self.negotiate_frames(message)
+
+        elif msg_type == "game_start":
+            self.game_status = "playing"
+            self.auto_move_position = None
+            self.final_score = None
+            self.set_message("ゲームが開始されました")
+            self.debug_print("ゲーム開始")
+
+        elif msg_type == "game_over":
+            self.game_status = "ended"
+            self.winner = message["winner"]
+            self.debug_print(f"ゲーム終了: 勝者={self.winner}")
+            # 最後の手は受理されているので仮の手は確定する
+            self.provisional = None
+            # サーバーは最後の盤面より先に game_over を送るので、終局時の石数はこちらを使う
+            if "black_score" in message:
+                self.final_score = (message["black_score"], message["white_score"])
+                self.record_game()
+
+            # 次のゲームのためにwaiting状態に戻す
+            self.game_status = "waiting"
+
+    def negotiate_frames(self, message):
+        """割り当てメッセージでサーバーが対応を示していれば着手フレームかバイナリフレームを要求"""
+        if not self.binary_frames:
+            return
+        if self.delta_updates and message.get("delta"):
+            self.send_message({"delta": 1})
+        elif message.get("binary"):
+            self.send_message({"binary": 1})
+
+    def handle_board_message(self, message):
+        """盤面メッセージの処理"""
+        self.board = message["board"]
+        self.current_turn = message["current_turn"]
+        self.debug_print(f"盤面更新: 現在の手番={self.current_turn}")
+
+        # バイナリフレームならビットボードと直前の手、スナップショットなら通し番号も分かる
+        before = self.state.black | self.state.white
+        if "black" in message:
+            self.state.set_bits(message["black"], message["white"])
+        else:
+            self.state.set_board(self.board)
+        self.track_move(before, self.state.black | self.state.white)
+        self.last_move = message.get("move")
+        self.last_flipped = []
+        if "seq" in message:
+            self.seq = message["seq"]
+            self.snapshot_requested = False
+
+        if message["winner"] != -1:
+            self.winner = message["winner"]
+            self.game_status = "ended"
+            self.debug_print(f"ゲーム終了: 勝者={self.winner}")
+        else:
+            self.final_score = None
+
+    def handle_delta_message(self, message):
+        """着手フレームの処理（手元のルールで盤面を進める）"""
+        seq = message["seq"]
+        if self.seq is None or seq != self.seq + 1:
+            self.request_snapshot(f"通し番号の抜け: {self.seq} -> {seq}")
+            return
+
+        row, col = message["move"]
+        color = message["color"]
+        sq = row * BOARD_SIZE + col
+        black, white = self.state.black, self.state.white
+        own, opp = (black, white) if color == 1 else (white, black)
+        flipped = flips(own, opp, sq)
+        own |= flipped | (1 << sq)
+        opp ^= flipped
+        black, white = (own, opp) if color == 1 else (opp, own)
+        if not flipped or board_hash(black, white) != message["hash"]:
+            self.request_snapshot(f"盤面の不一致: seq={seq}")
+            return
+
+        # 変わったマスだけ書き換える
+        self.board[row][col] = color
+        self.last_flipped = [divmod(f, BOARD_SIZE) for f in iter_squares(flipped)]
+        for r, c in self.last_flipped:
+            self.board[r][c] = color
+        self.state.play(color, sq, flipped)
+        self.moves.append(sq)
+        self.seq = seq
+        self.last_move = (row, col)
+        self.current_turn = message["current_turn"]
+        self.debug_print(f"着手適用: seq={seq} row={row} col={col} 返した石={len(self.last_flipped)}")
+
+        if message["winner"] != -1:
+            self.winner = message["winner"]
+            self.game_status = "ended"
+            self.debug_print(f"ゲーム終了: 勝者={self.winner}")
+
+    def track_move(self, before, after):
+        """盤面全体が届いたとき、前の盤面から増えた1石を着手として記録する"""
+        if after == INITIAL_BLACK | INITIAL_WHITE:
+            self.moves = []
+            self.moves_complete = True
+            return
+        placed = after & ~before
+        if not placed and after == before:
+            return
+        if placed.bit_count() != 1 or before & ~after:
+            # 途中から見始めたか、盤面が飛んだので棋譜は残せない
+            self.moves_complete = False
+            return
+        self.moves.append(placed.bit_length() - 1)
+
+    def complete_last_move(self):
+        """
+        終局の石数から、盤面が届かなかった最後の手を補う。
+
+        サーバーは最後の手の盤面を送る前に game_over を送るので、
+        その石数になる手が手番側の合法手に1つだけあればそれを最後の手とする。
+
+        Returns:
+            bool: 着手が終局まで揃った場合は True
+        """
+        if self.final_score == self.state.counts():
+            return True
+        black, white = self.state.black, self.state.white
+        own, opp = (black, white) if self.current_turn == 0 else (white, black)
+        candidates = []
+        for sq in iter_squares(legal_moves(own, opp)):
+            gain = flips(own, opp, sq).bit_count()
+            counts = (own.bit_count() + gain + 1, opp.bit_count() - gain)
+            if self.current_turn == 1:
+                counts = counts[::-1]
+            if counts == self.final_score:
+                candidates.append(sq)
+        if len(candidates) != 1:
+            return False
+        self.moves.append(candidates[0])
+        return True
+
+    def record_game(self):
+        """終局した対局を棋譜ストアに追記する（初期局面から見ていた対局のみ）"""
+        if self.game_writer is None or not self.moves_complete:
+            return
+        self.moves_complete = False
+        flags = 0 if self.complete_last_move() else FLAG_TRUNCATED
+        names = ["", ""]
+        if self.player_number in (0, 1):
+            names[self.player_number] = self.player_name
+        try:
+            game_id = self.game_writer.append(self.moves, names[0], names[1], *self.final_score,
+                                              self.winner, flags=flags)
+        except (OSError, ValueError) as e:
+            self.set_error(f"棋譜の保存エラー: {str(e)}")
+            return
+        self.debug_print(f"棋譜を保存: 対局番号={game_id} 手数={len(self.moves)}")
+
+    def request_snapshot(self, reason):
+        """手元の盤面が信用できないので盤面全体を要求する（届くまで着手は捨てる）"""
+        self.debug_print(f"スナップショット要求: {reason}")
+        self.seq = None
+        if not self.snapshot_requested:
+            self.snapshot_requested = True
+            self.send_message({"snapshot": 1})
+
+    def handle_error_message(self, message):
+        """エラーメッセージの処理"""
+        error_text = message["error"]
+        self.set_error(error_text)
+        self.debug_print(f"エラーメッセージ: {error_text}")
+        # 送った手が受理されなかったので、自動プレイヤーは同じ局面で探索し直す
+        self.auto_move_position = None
+
+    def handle_disconnection(self):
+        """切断処理"""
+        if self.connected:
+            self.connected = False
+            self.set_error("サーバーから切断されました")
+            self.debug_print("サーバーから切断されました")
+
+    def auto_move_target(self):
+        """
+        自動プレイヤーが手を探索すべき局面を返す。
+
+        Returns:
+            tuple: (盤面, 手番)。自動プレイヤーの手番でないか、その局面で打った後なら None
+        """
+        if (self.auto_player is None or self.game_status != "playing" or
+                self.is_spectator or self.current_turn != self.player_number):
+            return None
+
+        # 盤面更新を待っている間に同じ局面で再度打たないようにする
+        position = (tuple(map(tuple, self.board)), self.current_turn)
+        if position == self.auto_move_position:
+            return None
+        return position
+
+    def play_auto_move(self):
+        """自動プレイヤーの手番なら手を探索して送信"""
+        position = self.auto_move_target()
+        if position is None:
+            return
+
+        # 盤面は 0: 空き, 1: 黒, 2: 白
+        move = self.auto_player.choose_move(self.board, self.player_number + 1, 0)
+        self.send_auto_move(position, move)
+
+    def send_auto_move(self, position, move):
+        """自動プレイヤーが局面 position で選んだ手を送信"""
+        if move is None:
+            self.debug_print("自動プレイヤー: 置ける場所がありません")
+            return
+
+        row, col = move
+        self.debug_print(f"自動プレイヤーの手: row={row}, col={col}")
+        self.auto_move_position = position
+        self.send_move(row, col)
+
+    def set_message(self, text):
+        """メッセージを設定"""
+        self.message = text
+        self.message_timer = 180  # 約6秒間表示
+
+    def set_error(self, text):
+        """エラーメッセージを設定"""
+        self.error = text
+        self.error_timer = 180  # 約6秒間表示
+
+    def count_stones(self):
+        """黒と白の石の数（盤面の更新時に数えてあるものを返す）"""
+        if self.final_score is not None:
+            return self.final_score
+        return self.state.counts()
+
+    def check_move(self, row, col):
+        """
+        手元の盤面で手番側の着手 (row, col) を調べる。
+
+        Returns:
+            int: 返る石のビットマスク（0 なら置けない）。盤面が信用できないときは None
+        """
+        if self.snapshot_requested or self.provisional is not None:
+            return None
+        if not (0 <= row < BOARD_SIZE and 0 <= col < BOARD_SIZE):
+            return 0
+        sq = row * BOARD_SIZE + col
+        if not self.legal_moves() >> sq & 1:
+            return 0
+        black, white = self.state.black, self.state.white
+        if self.current_turn == 0:
+            return flips(black, white, sq)
+        return flips(white, black, sq)
+
+    def legal_moves(self):
+        """手番側の合法手のビットマスク（局面ごとに一度だけ求めて覚えておく）"""
+        return self.move_cache.get(self.state, self.current_turn)
+
+    def send_move(self, row, col):
+        """手を送信（手元の盤面で置けないと分かる手は送らない）"""
+        if not self.connected:
+            self.set_error("サーバーに接続されていません")
+            return
+
+        flipped = self.check_move(row, col) if self.game_status == "playing" else None
+        if flipped == 0:
+            # 自動プレイヤーの手なら、次の更新で探索し直す
+            self.auto_move_position = None
+            self.set_error("その場所には置けません")
+            self.debug_print(f"置けない手なので送信しません: row={row}, col={col}")
+            return
+
+        # サーバーコードから期待されるJSONフォーマット
+        self.move_sent_at = time.perf_counter()
+        self.send_message({"row": row, "col": col})
+        if flipped and self.optimistic_moves:
+            self.apply_provisional(row, col, flipped)
+
+    def apply_provisional(self, row, col, flipped):
+        """送信した手をサーバーの返事を待たずに盤面へ反映する（相手の手番として表示）"""
+        color = self.current_turn + 1
+        saved = ([r[:] for r in self.board], self.state.copy(), self.current_turn,
+                 self.last_move, self.last_flipped, len(self.moves))
+        self.provisional = ((row, col), saved)
+
+        self.board[row][col] = color
+        self.last_flipped = [divmod(f, BOARD_SIZE) for f in iter_squares(flipped)]
+        for r, c in self.last_flipped:
+            self.board[r][c] = color
+        self.state.play(color, row * BOARD_SIZE + col, flipped)
+        self.moves.append(row * BOARD_SIZE + col)
+        self.last_move = (row, col)
+        self.current_turn = 1 - self.current_turn
+        self.debug_print(f"仮の着手: row={row}, col={col} 返した石={len(self.last_flipped)}")
+
+    def rollback_provisional(self, message):
+        """
+        仮に反映した手を取り消して送信前の盤面に戻す。
+
+        続けてサーバーの盤面や着手をそのまま適用すれば、手が受理されていれば
+        同じ盤面になり（確定）、拒否されていればエラーが表示される（取り消し）。
+        """
+        move, saved = self.provisional
+        self.provisional = None
+        (self.board, self.state, self.current_turn, self.last_move, self.last_flipped,
+         moves) = saved
+        del self.moves[moves:]
+        if "error" in message:
+            self.auto_move_position = None
+            self.debug_print(f"仮の着手を取り消し: {move}")
+        elif message.get("move") is not None and tuple(message["move"]) == move:
+            self.debug_print(f"仮の着手を確定: {move}")
+
+    def send_message(self, message):
+        """JSONメッセージを送信"""
+        try:
+            # JSONデータを送信（スペースなしに）
+            json_str = json.dumps(message, separators=(',', ':'))  # スペースを省く
+            self.debug_print(f"送信データ: {json_str}")
+            if self.transport is not None:
+                self.transport.send(json_str.encode())
+            else:
+                self.socket.send(json_str.encode())
+        except Exception as e:
+            self.set_error(f"送信エラー: {str(e)}")
+            self.debug_print(f"送信エラー: {str(e)}")
+            self.handle_disconnection()
+
+    def close(self):
+        """ソケットと自動プレイヤーの解放"""
+        if self.auto_player is not None:
+            self.auto_player.close()
+        if self.game_writer is not None:
+            self.game_writer.close()
+        if self.transport is not None:
+            # ソケットはイベントループ側で閉じる
+            self.transport.close()
+        elif self.socket and self.connected:
+            try:
+                self.socket.close()
+            except:
+                pass
@@ -0,0 +1,406 @@
+"""
+終盤の完全読み
+
+残りの空きマスが少ない局面で、双方が最善を尽くしたときの最終石数差と最善手を求める。
+空きマスが多いうちは速攻（相手の着手可能数が少ない手から）と置換表、
+少なくなったら偶数理論（空きマスが奇数個の領域を優先）による並べ替えだけで探索し、
+置換表にある子局面の値だけで β を超える手があれば子を探索せずに打ち切り、
+最後の2マスと1マスは手の生成をせずに直接石数を計算する。
+
+石数差は空きマスを数えない（サーバーの勝敗判定と同じ）。
+
+純粋な Python なので、読み切れる空きマス数は思考時間で決まる
+（目安は SOLVE_SECONDS。14 で 1 秒弱, 16 で 5 秒ほど。20 は数分かかり実用にならない）。
+"""
+
+import sys
+import time
+
+from bitboard import (
+    OTHELLO_COL,
+    board_to_bits,
+    flips,
+    legal_moves,
+)
+
+# この数以下の空きマスでは速攻の並べ替えと置換表を使わない
+SHALLOW_EMPTIES = 7
+# 置換表のエントリ数の上限（超えたら消去する）
+TT_LIMIT = 1 << 20
+# 制限時間を確かめる間隔（ノード数）
+CHECK_INTERVAL = 4096
+
+# 空きマス数ごとの完全読みのおおよその時間（秒, 中盤から進めた局面の平均）
+SOLVE_SECONDS = {
+    10: 0.04,
+    11: 0.05,
+    12: 0.15,
+    13: 0.25,
+    14: 0.8,
+    15: 1.3,
+    16: 5.5,
+}
+
+# 空きマスを調べる順番（隅 → 辺 → 中央 → X打ち）
+SQUARE_PRIORITY = (
+    (0, 6, 2, 3, 3, 2, 6, 0),
+    (6, 7, 5, 5, 5, 5, 7, 6),
+    (2, 5, 4, 4, 4, 4, 5, 2),
+    (3, 5, 4, 1, 1, 4, 5, 3),
+    (3, 5, 4, 1, 1, 4, 5, 3),
+    (2, 5, 4, 4, 4, 4, 5, 2),
+    (6, 7, 5, 5, 5, 5, 7, 6),
+    (0, 6, 2, 3, 3, 2, 6, 0),
+)
+SQUARE_ORDER = tuple(sorted(range(64), key=lambda sq: SQUARE_PRIORITY[sq >> 3][sq & 7]))
+
+# 各マスが属する 4x4 の象限
+QUADRANT = tuple(((sq >> 5) << 1) | ((sq & 7) >> 2) for sq in range(64))
+
+
+class SolveTimeout(Exception):
+    """完全読みの制限時間を超えた"""
+
+
+def empties_for_time(seconds):
+    """
+    思考時間 seconds でおおむね読み切れる空きマス数（SOLVE_SECONDS の範囲内）
+
+    Args:
+        seconds (float): 完全読みに使える時間（秒）
+    """
+    empties = min(SOLVE_SECONDS)
+    for n, cost in sorted(SOLVE_SECONDS.items()):
+        if cost <= seconds:
+            empties = n
+    return empties
+
+
+class EndgameSolver:
+    """
+    終盤の完全読みを行う。
+
+    Args:
+        shallow_empties (int): 並べ替えを偶数理論だけにする空きマス数
+    """
+
+    def __init__(self, shallow_empties=SHALLOW_EMPTIES):
+        self.shallow_empties = shallow_empties
+        self.tt = {}
+        self.nodes = 0
+        self.deadline = None
+        self.next_check = 0
+
+    def solve(self, own, opp, alpha=-64, beta=64, deadline=None):
+        """
+        手番側から見た最終石数差と最善手を求める。
+
+        alpha, beta を指定すると、その範囲外の値は境界値として返る
+        （勝ち負けだけを知りたい場合は alpha=-1, beta=1 とすると速い）。
+
+        Args:
+            deadline (float): time.perf_counter() の値で表した制限時刻（None なら無制限）
+
+        Returns:
+            tuple: (石数差, 最善手のビット番号)。手番側が打てない場合の最善手は None
+
+        Raises:
+            SolveTimeout: deadline までに読み切れなかった
+        """
+        self.nodes = 0
+        self.deadline = deadline
+        self.next_check = CHECK_INTERVAL
+        if len(self.tt) > TT_LIMIT:
+            self.tt.clear()
+
+        empties = [sq for sq in SQUARE_ORDER if not ((own | opp) >> sq) & 1]
+        moves = legal_moves(own, opp)
+        if not moves:
+            if not legal_moves(opp, own):
+                return own.bit_count() - opp.bit_count(), None
+            return -self._search(opp, own, -beta, -alpha, empties, self._parity(empties)), None
+
+        parity = self._parity(empties)
+        best_move = None
+        best_score = -65
+        for sq, f, child_moves in self._order(own, opp, moves, None, parity):
+            score = self._search_child(own, opp, sq, f, child_moves, alpha, beta, best_score,
+                                       empties, parity, best_move is None)
+            if score > best_score:
+                best_score = score
+                best_move = sq
+                if score >= beta:
+                    break
+        return best_score, best_move
+
+    def solve_board(self, board, turn, empty):
+        """
+        board[row][col] 形式の盤面を完全読みする。
+
+        Returns:
+            tuple: (石数差, (row, col))。打てない場合の最善手は None
+        """
+        own, opp = board_to_bits(board, turn, empty)
+        score, move = self.solve(own, opp)
+        return score, (divmod(move, OTHELLO_COL) if move is not None else None)
+
+    @staticmethod
+    def _parity(empties):
+        """空きマスが奇数個の象限を表す4ビットのマスク"""
+        parity = 0
+        for sq in empties:
+            parity ^= 1 << QUADRANT[sq]
+        return parity
+
+    def _search(self, own, opp, alpha, beta, empties, parity, moves=None):
+        """
+        空きマス数に応じて探索方法を切り替える。
+
+        moves は分かっていれば手番側の合法手（並べ替えで求めたものを使い回す）。
+        """
+        n = len(empties)
+        if n == 1:
+            self.nodes += 1
+            return self._last1(own, opp, empties[0])
+        if n <= self.shallow_empties:
+            return self._search_shallow(own, opp, alpha, beta, empties, parity, False)
+        return self._search_deep(own, opp, alpha, beta, empties, parity, moves)
+
+    def _search_child(self, own, opp, sq, f, moves, alpha, beta, best, empties, parity, first):
+        """
+        sq に打った後の局面を PVS で探索する。
+
+        最初の手以外はまず幅0の窓で調べ、現在の最善を超えたときだけ再探索する。
+        moves は打った後の相手の合法手（分からなければ None）。
+        """
+        child_own = opp ^ f
+        child_opp = own | f | (1 << sq)
+        rest = [e for e in empties if e != sq]
+        child_parity = parity ^ (1 << QUADRANT[sq])
+        alpha = max(alpha, best)
+        if first:
+            return -self._search(child_own, child_opp, -beta, -alpha, rest, child_parity, moves)
+        score = -self._search(child_own, child_opp, -alpha - 1, -alpha, rest, child_parity,
+                              moves)
+        if alpha < score < beta:
+            score = -self._search(child_own, child_opp, -beta, -score, rest, child_parity,
+                                  moves)
+        return score
+
+    def _last1(self, own, opp, sq):
+        """残り1マス: 手の生成をせずに最終石数差を計算する"""
+        diff = 2 * own.bit_count() - 63
+        f = flips(own, opp, sq)
+        if f:
+            return diff + 2 * f.bit_count() + 1
+        f = flips(opp, own, sq)
+        if f:
+            return diff - 2 * f.bit_count() - 1
+        # どちらも打てない場合、空きマスは数えない
+        return diff
+
+    def _last2(self, own, opp, alpha, beta, a, b):
+        """残り2マス: 2マスを順に試し、残りの1マスは _last1 で計算する"""
+        self.nodes += 1
+        best = -65
+        f = flips(own, opp, a)
+        if f:
+            best = -self._last1(opp ^ f, own | f | (1 << a), b)
+            if best >= beta:
+                return best
+        f = flips(own, opp, b)
+        if f:
+            score = -self._last1(opp ^ f, own | f | (1 << b), a)
+            if score > best:
+                best = score
+        if best > -65:
+            self.nodes += 1
+            return best
+        # 手番側は打てないので相手が打つ
+        best = 65
+        f = flips(opp, own, a)
+        if f:
+            best = self._last1(own ^ f, opp | f | (1 << a), b)
+            if best <= alpha:
+                return best
+        f = flips(opp, own, b)
+        if f:
+            score = self._last1(own ^ f, opp | f | (1 << b), a)
+            if score < best:
+                best = score
+        if best < 65:
+            self.nodes += 1
+            return best
+        # どちらも打てない
+        return own.bit_count() - opp.bit_count()
+
+    def _search_shallow(self, own, opp, alpha, beta, empties, parity, passed):
+        """
+        空きマスが少ない局面の探索。
+
+        合法手の生成も並べ替えもせず、奇数個の空きマスを持つ象限のマスから
+        順に（各象限内は隅優先の順で）置けるかどうかを試す。
+        """
+        self.nodes += 1
+        n = len(empties)
+        best = -65
+        moved = False
+        for odd in (True, False):
+            for i in range(n):
+                sq = empties[i]
+                if bool(parity & (1 << QUADRANT[sq])) != odd:
+                    continue
+                f = flips(own, opp, sq)
+                if not f:
+                    continue
+                moved = True
+                child_own = opp ^ f
+                child_opp = own | f | (1 << sq)
+                rest = empties[:i] + empties[i + 1:]
+                if n == 2:
+                    score = -self._last1(child_own, child_opp, rest[0])
+                    self.nodes += 1
+                elif n == 3:
+                    score = -self._last2(child_own, child_opp, -beta, -max(alpha, best),
+                                         rest[0], rest[1])
+                else:
+                    score = -self._search_shallow(child_own, child_opp, -beta, -max(alpha, best),
+                                                  rest, parity ^ (1 << QUADRANT[sq]), False)
+                if score > best:
+                    best = score
+                    if score >= beta:
+                        return best
+
+        if moved:
+            return best
+        if passed:
+            # 両者とも打てない
+            return own.bit_count() - opp.bit_count()
+        return -self._search_shallow(opp, own, -beta, -alpha, empties, parity, True)
+
+    def _search_deep(self, own, opp, alpha, beta, empties, parity, moves=None):
+        """空きマスが多い局面の探索（置換表 + 速攻）"""
+        self.nodes += 1
+        if self.nodes >= self.next_check:
+            self.next_check = self.nodes + CHECK_INTERVAL
+            if self.deadline is not None and time.perf_counter() >= self.deadline:
+                raise SolveTimeout()
+        key = (own, opp)
+        entry = self.tt.get(key)
+        tt_move = None
+        if entry is not None:
+            lower, upper, tt_move = entry
+            if lower >= beta:
+                return lower
+            if upper <= alpha:
+                return upper
+            if lower == upper:
+                return lower
+            alpha = max(alpha, lower)
+            beta = min(beta, upper)
+
+        if moves is None:
+            moves = legal_moves(own, opp)
+        if not moves:
+            if not legal_moves(opp, own):
+                return own.bit_count() - opp.bit_count()
+            return -self._search(opp, own, -beta, -alpha, empties, parity)
+
+        ordered = self._order(own, opp, moves, tt_move, parity)
+        if len(empties) > self.shallow_empties + 1:
+            # 置換表にある子の上限だけで β を超える手があれば探索せずに返す
+            tt = self.tt
+            for sq, f, _ in ordered:
+                child = tt.get((opp ^ f, own | f | (1 << sq)))
+                if child is not None and -child[1] >= beta:
+                    return -child[1]
+
+        original_alpha = alpha
+        best = -65
+        best_move = None
+        for sq, f, child_moves in ordered:
+            score = self._search_child(own, opp, sq, f, child_moves, alpha, beta, best,
+                                       empties, parity, best_move is None)
+            if score > best:
+                best = score
+                best_move = sq
+                if score >= beta:
+                    break
+
+        # 置換表には [下限, 上限] を保存する
+        lower, upper = -64, 64
+        if entry is not None:
+            lower, upper = entry[0], entry[1]
+        if best <= original_alpha:
+            upper = min(upper, best)
+        elif best >= beta:
+            lower = max(lower, best)
+        else:
+            lower = upper = best
+        self.tt[key] = (lower, upper, best_move)
+        return best
+
+    @staticmethod
+    def _order(own, opp, moves, first, parity=0):
+        """
+        速攻で手を並べ、(ビット番号, ひっくり返る石, 打った後の相手の合法手) のリストを返す。
+
+        相手の着手可能数が少ない手ほど先に調べ、同数なら奇数象限・隅を優先する。
+        相手の合法手は子の探索でそのまま使う（first の手は求めないので None）。
+        """
+        keyed = []
+        while moves:
+            low = moves & -moves
+            sq = low.bit_length() - 1
+            moves ^= low
+            f = flips(own, opp, sq)
+            if sq == first:
+                key = -1
+                reply = None
+            else:
+                reply = legal_moves(opp ^ f, own | f | low)
+                key = (reply.bit_count() * 64
+                       - (16 if parity & (1 << QUADRANT[sq]) else 0)
+                       + SQUARE_PRIORITY[sq >> 3][sq & 7])
+            keyed.append((key, sq, f, reply))
+        keyed.sort(key=lambda item: item[0])
+        return [(sq, f, reply) for _, sq, f, reply in keyed]
+
+
+def parse_board(text):
+    """
+    64文字の盤面文字列（'X' または 'B': 黒, 'O' または 'W': 白, それ以外: 空き）を
+    (黒, 白) のビットボードに変換する。
+    """
+    black = white = 0
+    for sq, ch in enumerate(text[:64]):
+        if ch in "XxBb*":
+            black |= 1 << sq
+        elif ch in "OoWw":
+            white |= 1 << sq
+    return black, white
+
+
+def main():
+    """盤面文字列と手番（B または W）を受け取り、完全読みの結果を表示"""
+    if len(sys.argv) < 2:
+        print("usage: python endgame.py <64文字の盤面> [B|W]")
+        return
+
+    black, white = parse_board(sys.argv[1])
+    turn = sys.argv[2].upper() if len(sys.argv) > 2 else "B"
+    own, opp = (black, white) if turn == "B" else (white, black)
+
+    solver = EndgameSolver()
+    start = time.perf_counter()
+    score, move = solver.solve(own, opp)
+    elapsed = time.perf_counter() - start
+
+    move_str = "pass" if move is None else "(%d, %d)" % divmod(move, OTHELLO_COL)
+    print(f"empties: {64 - (own | opp).bit_count()}")
+    print(f"best move: {move_str}  score: {score:+d}")
+    print(f"nodes: {solver.nodes}  time: {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
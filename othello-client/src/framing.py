@@ -0,0 +1,403 @@
+"""
+サーバーから届く連結 JSON メッセージの分割
+
+サーバーはメッセージを区切り文字なしで続けて送るので、受信データを
+先頭から走査して括弧の深さが 0 に戻った位置でメッセージを切り出す。
+走査はバイト列のまま行い、一度見たバイトは二度と見ないので、
+受信の区切り方によらず処理量は受信したバイト数に比例する。
+UTF-8 の多バイト文字は '{' '}' '"' '\\' と同じバイトを含まないため、
+文字の途中で受信が分かれても切り出したメッセージ単位で正しくデコードできる。
+
+サーバーが対応していれば、盤面は JSON の代わりにバイナリフレームで受け取れる
+（割り当てメッセージの "binary": 1 を見て {"binary": 1} を送ると切り替わる）。
+バイナリフレームは '{' の代わりにマーカー 0xB0 で始まり、長さで区切る。
+
+さらに {"delta": 1} を送ると、盤面の代わりに着手だけを受け取り、
+手元のルールで盤面を進める（通し番号の抜けやハッシュの不一致があれば
+{"snapshot": 1} で盤面全体を要求する）。
+
+バイナリフレーム（ビッグエンディアン, 石のビット番号は row * 8 + col）:
+    共通の先頭: マーカー 0xB0(u8), ペイロード長(u8), 種類(u8)
+    盤面 (1, 22バイト):
+        黒の石(u64), 白の石(u64), 手番(i8), 勝者(i8), 直前の手(u8, なしは 0xFF)
+    着手 (2, 15バイト):
+        通し番号(u32), 手(u8), 打った石(u8, 1: 黒, 2: 白),
+        次の手番(i8), 勝者(i8), 着手後の盤面のハッシュ(u32)
+    スナップショット (3, 26バイト):
+        通し番号(u32), 以降は盤面フレームと同じ
+
+使い方（ベンチマーク）:
+    python framing.py --messages 20000 --chunk 512
+"""
+
+import argparse
+import json
+import re
+import struct
+import time
+
+from bitboard import FULL, OTHELLO_COL, board_to_bits
+
+# バイナリフレームの先頭バイト
+BINARY_MARKER = 0xB0
+# バイナリフレームの種類
+FRAME_BOARD = 1
+FRAME_MOVE = 2
+FRAME_SNAPSHOT = 3
+BOARD_FRAME = struct.Struct("!BBBQQbbB")
+MOVE_FRAME = struct.Struct("!BBBIBBbbI")
+SNAPSHOT_FRAME = struct.Struct("!BBBIQQbbB")
+NO_MOVE = 0xFF
+
+# メッセージの外でメッセージの始まりになるバイト
+_START = re.compile(rb'[{\xb0]')
+# 走査で意味を持つバイト
+_SPECIAL = re.compile(rb'[{}"\\]')
+_OPEN = ord("{")
+_CLOSE = ord("}")
+_QUOTE = ord('"')
+
+
+def _build_row_cells():
+    """(黒の1行 << 8 | 白の1行) -> その行のマス（0: 空き, 1: 黒, 2: 白）"""
+    table = {}
+    for black in range(256):
+        for white in range(256):
+            if black & white:
+                continue
+            table[(black << 8) | white] = tuple(
+                1 if black >> col & 1 else 2 if white >> col & 1 else 0
+                for col in range(OTHELLO_COL))
+    return table
+
+
+# 盤面フレームを board[row][col] に展開するための表（3^8 通り）
+_ROW_CELLS = _build_row_cells()
+
+
+def board_hash(black, white):
+    """着手フレームの検証に使う盤面の32ビットハッシュ（サーバーと同じ計算）"""
+    return ((black * 0x9E3779B97F4A7C15 ^ white * 0xC2B2AE3D27D4EB4F) & FULL) >> 32
+
+
+def encode_board_frame(black, white, current_turn, winner, move=None):
+    """
+    盤面をバイナリフレームにする。
+
+    Args:
+        black (int): 黒の石のビットボード
+        white (int): 白の石のビットボード
+        current_turn (int): 手番（0: 黒, 1: 白）
+        winner (int): 勝者（-1: 未決着, 0: 黒, 1: 白）
+        move (tuple): 直前の手 (row, col)。なければ None
+
+    Returns:
+        bytes: フレーム（マーカーと長さを含む）
+    """
+    sq = NO_MOVE if move is None else move[0] * OTHELLO_COL + move[1]
+    return BOARD_FRAME.pack(BINARY_MARKER, BOARD_FRAME.size - 2, FRAME_BOARD,
+                            black, white, current_turn, winner, sq)
+
+
+def encode_snapshot_frame(seq, black, white, current_turn, winner, move=None):
+    """通し番号付きの盤面をバイナリフレームにする（引数は encode_board_frame と同じ）"""
+    sq = NO_MOVE if move is None else move[0] * OTHELLO_COL + move[1]
+    return SNAPSHOT_FRAME.pack(BINARY_MARKER, SNAPSHOT_FRAME.size - 2, FRAME_SNAPSHOT,
+                               seq, black, white, current_turn, winner, sq)
+
+
+def encode_move_frame(seq, move, color, current_turn, winner, hash_value):
+    """
+    着手をバイナリフレームにする。
+
+    Args:
+        seq (int): 着手後の通し番号
+        move (tuple): 手 (row, col)
+        color (int): 打った石（1: 黒, 2: 白）
+        current_turn (int): 着手後の手番
+        winner (int): 勝者
+        hash_value (int): 着手後の盤面の board_hash
+    """
+    return MOVE_FRAME.pack(BINARY_MARKER, MOVE_FRAME.size - 2, FRAME_MOVE, seq,
+                           move[0] * OTHELLO_COL + move[1], color, current_turn, winner,
+                           hash_value)
+
+
+def _board_message(black, white, turn, winner, sq):
+    """盤面を JSON の盤面メッセージと同じ形の辞書にする"""
+    if black & white:
+        raise ValueError("黒と白の石が重なっています")
+    rows = _ROW_CELLS
+    return {
+        "board": [list(rows[(black >> shift & 0xFF) << 8 | (white >> shift & 0xFF)])
+                  for shift in range(0, 64, 8)],
+        "current_turn": turn,
+        "winner": winner,
+        "move": None if sq == NO_MOVE else divmod(sq, OTHELLO_COL),
+        "black": black,
+        "white": white,
+    }
+
+
+def decode_frame(frame):
+    """
+    バイナリフレームを辞書にする。
+
+    盤面とスナップショットは JSON の盤面メッセージと同じ形
+    （board は 0: 空き, 1: 黒, 2: 白。black / white にビットボード、
+    スナップショットは seq も入れる）。
+    着手は "delta" を持つ辞書（seq, move, color, current_turn, winner, hash）。
+
+    Raises:
+        ValueError: 未知の種類や長さの合わないフレームの場合
+    """
+    kind = frame[2] if len(frame) > 2 else None
+    if kind == FRAME_BOARD and len(frame) == BOARD_FRAME.size:
+        _, _, _, black, white, turn, winner, sq = BOARD_FRAME.unpack(frame)
+        return _board_message(black, white, turn, winner, sq)
+    if kind == FRAME_SNAPSHOT and len(frame) == SNAPSHOT_FRAME.size:
+        _, _, _, seq, black, white, turn, winner, sq = SNAPSHOT_FRAME.unpack(frame)
+        message = _board_message(black, white, turn, winner, sq)
+        message["seq"] = seq
+        return message
+    if kind == FRAME_MOVE and len(frame) == MOVE_FRAME.size:
+        _, _, _, seq, sq, color, turn, winner, hash_value = MOVE_FRAME.unpack(frame)
+        if sq >= 64 or color not in (1, 2):
+            raise ValueError("着手フレームが不正です")
+        return {
+            "delta": True,
+            "seq": seq,
+            "move": divmod(sq, OTHELLO_COL),
+            "color": color,
+            "current_turn": turn,
+            "winner": winner,
+            "hash": hash_value,
+        }
+    raise ValueError("未知のバイナリフレームです")
+
+
+class FrameDecoder:
+    """
+    受信したバイト列から JSON オブジェクトとバイナリフレームを1つずつ取り出す。
+
+    不正なメッセージや未知の種類のフレームは読み飛ばし、invalid に数を記録する。
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        # 次に走査する位置
+        self.scan = 0
+        # 読み込み中のメッセージの開始位置（メッセージの外なら -1）
+        self.start = -1
+        self.depth = 0
+        self.in_string = False
+        # 読み込み中のメッセージがバイナリフレームか
+        self.binary = False
+        self.invalid = 0
+
+    def feed(self, data):
+        """
+        受信データを追加し、完成したメッセージを返す。
+
+        Args:
+            data (bytes): 受信したデータ
+
+        Returns:
+            list: 完成したメッセージ（dict）のリスト
+        """
+        buffer = self.buffer
+        buffer += data
+        messages = []
+        pos = self.scan
+        depth = self.depth
+        in_string = self.in_string
+        binary = self.binary
+        start = self.start
+
+        while True:
+            if start < 0:
+                # メッセージの外では '{' と 0xB0 以外（空白など）を読み飛ばす
+                match = _START.search(buffer, pos)
+                if match is None:
+                    pos = len(buffer)
+                    break
+                start = match.start()
+                binary = buffer[start] == BINARY_MARKER
+                pos = start + 1
+                depth = 1
+                in_string = False
+
+            if binary:
+                # 長さのバイトまで届いていれば終わりの位置が分かる
+                if len(buffer) < start + 2:
+                    break
+                end = start + 2 + buffer[start + 1]
+                if len(buffer) < end:
+                    break
+                try:
+                    messages.append(decode_frame(buffer[start:end]))
+                except ValueError:
+                    self.invalid += 1
+                start = -1
+                pos = end
+                continue
+
+            match = _SPECIAL.search(buffer, pos)
+            if match is None:
+                # エスケープの途中なら次のバイトを読み飛ばす位置を保つ
+                pos = max(pos, len(buffer))
+                break
+            i = match.start()
+            byte = buffer[i]
+            pos = i + 1
+            if in_string:
+                if byte == _QUOTE:
+                    in_string = False
+                elif byte != _OPEN and byte != _CLOSE:
+                    # バックスラッシュは次の1バイトと組で読み飛ばす
+                    pos = i + 2
+            elif byte == _QUOTE:
+                in_string = True
+            elif byte == _OPEN:
+                depth += 1
+            elif byte == _CLOSE:
+                depth -= 1
+                if depth == 0:
+                    try:
+                        messages.append(json.loads(buffer[start:pos]))
+                    except ValueError:
+                        self.invalid += 1
+                    start = -1
+
+        # 取り出し終えた部分を捨てる
+        keep = start if start >= 0 else min(pos, len(buffer))
+        if keep:
+            del buffer[:keep]
+            pos -= keep
+            if start >= 0:
+                start = 0
+        self.scan = pos
+        self.depth = depth
+        self.in_string = in_string
+        self.binary = binary
+        self.start = start
+        return messages
+
+    def pending(self):
+        """まだ完成していないメッセージのバイト数"""
+        return len(self.buffer) if self.start >= 0 else 0
+
+
+def legacy_split(buffer):
+    """
+    以前の受信ループと同じ分割（比較用）。
+
+    バッファ全体の json.loads を試し、失敗したら '}{' の位置で切る。
+    """
+    messages = []
+    while buffer:
+        try:
+            messages.append(json.loads(buffer))
+            buffer = ""
+            break
+        except json.JSONDecodeError:
+            try:
+                pos = buffer.find("}{")
+                if pos != -1:
+                    messages.append(json.loads(buffer[:pos+1]))
+                    buffer = buffer[pos+1:]
+                else:
+                    break
+            except Exception:
+                break
+    return messages, buffer
+
+
+def _sample_stream(count, mode="json"):
+    """サーバーが送るものと同じ形のメッセージを連結したバイト列"""
+    board = [[0] * 8 for _ in range(8)]
+    board[3][3] = board[4][4] = 2
+    board[3][4] = board[4][3] = 1
+    parts = []
+    frames = 0
+    for i in range(count):
+        if i % 50 == 0:
+            message = {"type": "game_start", "message": "ゲームを開始します"}
+            parts.append(json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode())
+            frames += 1
+        row, col = i % 8, (i // 8) % 8
+        board[row][col] = i % 3
+        if mode == "delta":
+            black, white = board_to_bits(board, 1, 0)
+            parts.append(encode_move_frame(i + 1, (row, col), 1 + i % 2, (i + 1) % 2, -1,
+                                           board_hash(black, white)))
+        elif mode == "binary":
+            black, white = board_to_bits(board, 1, 0)
+            parts.append(encode_board_frame(black, white, i % 2, -1, (row, col)))
+        else:
+            message = {"board": board, "current_turn": i % 2, "winner": -1}
+            parts.append(json.dumps(message, separators=(",", ":")).encode())
+        frames += 1
+    return b"".join(parts), frames
+
+
+def _measure(chunks, size, split):
+    """chunks を順に split に渡して処理時間を測る"""
+    start = time.perf_counter()
+    received = 0
+    for part in chunks:
+        received += split(part)
+    elapsed = time.perf_counter() - start
+    return {
+        "seconds": round(elapsed, 4),
+        "bytes": size,
+        "received": received,
+        "mb_per_sec": round(size / elapsed / 1e6, 2),
+        "us_per_message": round(elapsed / max(received, 1) * 1e6, 2),
+    }
+
+
+def benchmark(count, chunk):
+    """
+    以前の分割、FrameDecoder（JSON / バイナリ盤面 / 着手フレーム）を比べる。
+
+    Returns:
+        dict: 方式ごとの処理時間とスループット
+    """
+    result = {"chunk": chunk}
+    for name, mode in (("legacy", "json"), ("frame_decoder", "json"),
+                       ("frame_decoder_binary", "binary"), ("frame_decoder_delta", "delta")):
+        data, expected = _sample_stream(count, mode)
+        chunks = [data[i:i + chunk] for i in range(0, len(data), chunk)]
+        result["messages"] = expected
+
+        if name == "legacy":
+            buffer = ""
+
+            def split(part):
+                nonlocal buffer
+                # 以前の実装は recv ごとに decode していた
+                buffer += part.decode(errors="replace")
+                messages, buffer = legacy_split(buffer)
+                return len(messages)
+        else:
+            decoder = FrameDecoder()
+
+            def split(part):
+                return len(decoder.feed(part))
+
+        result[name] = _measure(chunks, len(data), split)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="メッセージ分割のスループットを測る")
+    parser.add_argument("-n", "--messages", type=int, default=20000, help="メッセージ数")
+    parser.add_argument("-c", "--chunk", type=int, default=4096,
+                        help="1回の受信のバイト数")
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.messages, args.chunk), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
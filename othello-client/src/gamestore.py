@@ -0,0 +1,409 @@
+"""
+対局の記録（棋譜ストア）
+
+1局を「ヘッダ, 対局者名, 1手1バイトの着手, 最終石数」の可変長レコードにして、
+セグメントファイルに追記していく。セグメントごとにレコードの位置の索引を持つので、
+読み込み側は mmap して対局番号から直接1局を取り出せる（ファイル全体は読まない）。
+1局はおよそ80バイトなので、数千万局でも数GBに収まる。
+
+ディレクトリの構成:
+    games-00000.dat, games-00000.idx, games-00001.dat, ...
+    対局番号 n はセグメント n // 1セグメントの対局数 の n % 1セグメントの対局数 番目
+
+ファイル形式（リトルエンディアン）:
+    .dat ヘッダ : マジック 'OTGR', バージョン(u16), 予約(u16), セグメント番号(u32)
+    .dat レコード: 長さ(u16), フラグ(u8), 手数(u8), 黒の石数(u8), 白の石数(u8),
+                   勝者(i8), 対局日時(u32, UNIX時間),
+                   黒の名前の長さ(u8), 名前(UTF-8), 白の名前の長さ(u8), 名前(UTF-8),
+                   着手(u8 × 手数, ビット番号。パスは記録しない)
+    .idx ヘッダ : マジック 'OTGI', バージョン(u16), 予約(u16), 1セグメントの対局数(u32)
+    .idx エントリ: .dat 内のレコードの位置(u32)
+
+書き込みはレコードを .dat に書いてから .idx に位置を追記するので、
+途中で止まっても索引にあるレコードは常に完全な状態になる。
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+
+from bitboard import final_position, parse_moves, square_name
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+DATA_MAGIC = b"OTGR"
+INDEX_MAGIC = b"OTGI"
+VERSION = 1
+SEGMENT_HEADER = struct.Struct("<4sHHI")
+RECORD = struct.Struct("<HBBBBbI")
+OFFSET = struct.Struct("<I")
+
+# 1セグメントの対局数の既定値（1セグメントはおよそ80MB）
+DEFAULT_SEGMENT_GAMES = 1 << 20
+# 対局者名の最大バイト数
+MAX_NAME_BYTES = 255
+
+# フラグ
+FLAG_TRUNCATED = 0x01  # 最後の手が分からず着手が終局まで揃っていない
+
+LOCK_NAME = "games.lock"
+
+
+def segment_paths(directory, segment):
+    """セグメントの (.dat, .idx) のパス"""
+    base = os.path.join(directory, f"games-{segment:05d}")
+    return base + ".dat", base + ".idx"
+
+
+def _name_bytes(name):
+    """対局者名を MAX_NAME_BYTES 以内の UTF-8 にする（文字の途中では切らない）"""
+    data = (name or "").encode("utf-8")
+    while len(data) > MAX_NAME_BYTES:
+        name = name[:-1]
+        data = name.encode("utf-8")
+    return data
+
+
+def encode_record(moves, black_name, white_name, black_score, white_score, winner,
+                  played_at, flags=0):
+    """1局分のレコードを作る"""
+    if len(moves) > 60 or any(not 0 <= sq < 64 for sq in moves):
+        raise ValueError("invalid moves")
+    black = _name_bytes(black_name)
+    white = _name_bytes(white_name)
+    length = RECORD.size + 2 + len(black) + len(white) + len(moves)
+    return b"".join((
+        RECORD.pack(length, flags, len(moves), black_score, white_score, winner, played_at),
+        bytes((len(black),)), black, bytes((len(white),)), white, bytes(moves),
+    ))
+
+
+def decode_record(data, offset, game_id=None):
+    """
+    data の offset から1局分のレコードを読む。
+
+    Returns:
+        dict: 対局者名, 着手（ビット番号のリスト）, 石数, 勝者, 対局日時, フラグ
+    """
+    length, flags, count, black_score, white_score, winner, played_at = \
+        RECORD.unpack_from(data, offset)
+    pos = offset + RECORD.size
+    size = data[pos]
+    black = bytes(data[pos + 1:pos + 1 + size]).decode("utf-8", errors="replace")
+    pos += 1 + size
+    size = data[pos]
+    white = bytes(data[pos + 1:pos + 1 + size]).decode("utf-8", errors="replace")
+    pos += 1 + size
+    if pos + count != offset + length:
+        raise ValueError(f"壊れたレコード: offset={offset}")
+    return {
+        "id": game_id,
+        "black": black,
+        "white": white,
+        "moves": list(data[pos:pos + count]),
+        "black_score": black_score,
+        "white_score": white_score,
+        "winner": winner,
+        "played_at": played_at,
+        "flags": flags,
+    }
+
+
+class GameWriter:
+    """
+    棋譜ストアに対局を追記する。
+
+    同じディレクトリに複数のプロセスから書いてもよい（ロックできる環境では追記を排他する）。
+
+    Args:
+        directory (str): 棋譜ストアのディレクトリ（なければ作る）
+        segment_games (int): 1セグメントの対局数（既存のストアではその値を使う）
+    """
+
+    def __init__(self, directory, segment_games=DEFAULT_SEGMENT_GAMES):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.lock = open(os.path.join(directory, LOCK_NAME), "ab")
+        first_index = segment_paths(directory, 0)[1]
+        if os.path.exists(first_index) and os.path.getsize(first_index) >= SEGMENT_HEADER.size:
+            with open(first_index, "rb") as f:
+                segment_games = _read_header(f.read(SEGMENT_HEADER.size), INDEX_MAGIC, first_index)
+        self.segment_games = segment_games
+
+        # 書き込み中のセグメント（追記のたびに開き直さない）
+        self.segment = 0
+        while os.path.exists(segment_paths(directory, self.segment + 1)[1]):
+            self.segment += 1
+        self.data = None
+        self.index = None
+
+    def close(self):
+        """ファイルを閉じる"""
+        self._close_segment()
+        self.lock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _open_segment(self):
+        """書き込み中のセグメントのファイルを開く（なければヘッダを書く）"""
+        data_path, index_path = segment_paths(self.directory, self.segment)
+        self.data = open(data_path, "ab", buffering=0)
+        if os.fstat(self.data.fileno()).st_size == 0:
+            self.data.write(SEGMENT_HEADER.pack(DATA_MAGIC, VERSION, 0, self.segment))
+        self.index = open(index_path, "ab", buffering=0)
+
+    def _close_segment(self):
+        for f in (self.data, self.index):
+            if f is not None:
+                f.close()
+        self.data = self.index = None
+
+    def append(self, moves, black_name="", white_name="", black_score=None, white_score=None,
+               winner=None, played_at=None, flags=0):
+        """
+        1局を追記する。
+
+        Args:
+            moves (list): 着手（ビット番号のリスト）
+            black_score, white_score (int): 最終石数（省略時は着手を再生して数える）
+            winner (int): 0: 黒勝ち, 1: 白勝ち, -1: 引き分け（省略時は石数から決める）
+            played_at (int): 対局日時（UNIX時間、省略時は現在時刻）
+            flags (int): FLAG_TRUNCATED など
+
+        Returns:
+            int: 対局番号
+        """
+        if black_score is None or white_score is None:
+            black, white = final_position(moves)
+            black_score, white_score = black.bit_count(), white.bit_count()
+        if winner is None:
+            winner = 0 if black_score > white_score else 1 if white_score > black_score else -1
+        if played_at is None:
+            played_at = int(time.time())
+        record = encode_record(moves, black_name, white_name, black_score, white_score,
+                               winner, played_at, flags)
+
+        if fcntl is not None:
+            fcntl.flock(self.lock, fcntl.LOCK_EX)
+        try:
+            # 他のプロセスが書き足していることがあるので、件数は毎回ファイルの大きさから求める
+            while True:
+                if self.index is None:
+                    self._open_segment()
+                size = os.fstat(self.index.fileno()).st_size
+                count = max(0, (size - SEGMENT_HEADER.size) // OFFSET.size)
+                if count < self.segment_games:
+                    break
+                self._close_segment()
+                self.segment += 1
+
+            expected = SEGMENT_HEADER.size + count * OFFSET.size
+            if size != expected:
+                # 書き込み途中で止まった索引の端数を捨てる（ヘッダが欠けていれば作り直す）
+                self.index.truncate(expected if size >= SEGMENT_HEADER.size else 0)
+            if size < SEGMENT_HEADER.size:
+                self.index.write(SEGMENT_HEADER.pack(INDEX_MAGIC, VERSION, 0, self.segment_games))
+
+            offset = os.fstat(self.data.fileno()).st_size
+            self.data.write(record)
+            self.index.write(OFFSET.pack(offset))
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self.lock, fcntl.LOCK_UN)
+        return self.segment * self.segment_games + count
+
+
+def _read_header(data, magic, path):
+    """セグメントのヘッダを確かめて最後の値を返す"""
+    if len(data) < SEGMENT_HEADER.size:
+        raise ValueError(f"{path}: 棋譜ストアではありません")
+    file_magic, version, _, value = SEGMENT_HEADER.unpack_from(data, 0)
+    if file_magic != magic or version != VERSION:
+        raise ValueError(f"{path}: 棋譜ストアではありません")
+    return value
+
+
+class GameStore:
+    """
+    棋譜ストアを mmap して対局番号で引く。
+
+    開いた時点の対局だけが見える（その後に追記された対局は開き直すと見える）。
+
+    Args:
+        directory (str): 棋譜ストアのディレクトリ
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.segments = []  # (.dat の mmap, .idx の mmap)。まだ開いていなければ None
+        self.counts = []  # セグメントごとの対局数
+        self.files = []
+        self.segment_games = DEFAULT_SEGMENT_GAMES
+        segment = 0
+        while True:
+            index_path = segment_paths(directory, segment)[1]
+            if not os.path.exists(index_path):
+                break
+            size = os.path.getsize(index_path)
+            if segment == 0:
+                with open(index_path, "rb") as f:
+                    self.segment_games = _read_header(f.read(SEGMENT_HEADER.size),
+                                                      INDEX_MAGIC, index_path)
+            self.counts.append(max(0, (size - SEGMENT_HEADER.size) // OFFSET.size))
+            self.segments.append(None)
+            segment += 1
+
+    def close(self):
+        """mmap とファイルを閉じる"""
+        for entry in self.segments:
+            if entry is not None:
+                entry[0].close()
+                entry[1].close()
+        for f in self.files:
+            f.close()
+        self.segments = [None] * len(self.segments)
+        self.files = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        if not self.counts:
+            return 0
+        return (len(self.counts) - 1) * self.segment_games + self.counts[-1]
+
+    def _open_segment(self, segment):
+        """セグメントの (.dat, .idx) を mmap する（初めて使うときだけ）"""
+        entry = self.segments[segment]
+        if entry is None:
+            maps = []
+            for path, magic in zip(segment_paths(self.directory, segment),
+                                   (DATA_MAGIC, INDEX_MAGIC)):
+                f = open(path, "rb")
+                self.files.append(f)
+                m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                _read_header(m, magic, path)
+                maps.append(m)
+            entry = self.segments[segment] = tuple(maps)
+        return entry
+
+    def locate(self, game_id):
+        """
+        対局番号 game_id のレコードの場所（読むのは decode_record に任せる）。
+
+        Returns:
+            tuple: (.dat の mmap, レコードの位置)
+        """
+        segment, index = divmod(game_id, self.segment_games)
+        if not (game_id >= 0 and segment < len(self.counts) and index < self.counts[segment]):
+            raise IndexError(f"対局番号が範囲外です: {game_id}")
+        data, offsets = self._open_segment(segment)
+        offset, = OFFSET.unpack_from(offsets, SEGMENT_HEADER.size + index * OFFSET.size)
+        return data, offset
+
+    def segment_ids(self, segment):
+        """セグメントに入っている対局番号の range"""
+        start = segment * self.segment_games
+        return range(start, start + self.counts[segment])
+
+    def __getitem__(self, game_id):
+        """対局番号 game_id の対局（decode_record の辞書）"""
+        if game_id < 0:
+            game_id += len(self)
+        return decode_record(*self.locate(game_id), game_id)
+
+    def __iter__(self):
+        return self.iter_games()
+
+    def iter_games(self, start=0, stop=None):
+        """対局番号 start から stop の手前までの対局を順に返す"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        for game_id in range(start, stop):
+            yield self[game_id]
+
+
+def format_game(game):
+    """対局を1行で表示する"""
+    moves = "".join(square_name(sq) for sq in game["moves"])
+    played = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(game["played_at"]))
+    truncated = " (途中まで)" if game["flags"] & FLAG_TRUNCATED else ""
+    return (f"#{game['id']} {played} 黒:{game['black'] or '-'} {game['black_score']} - "
+            f"{game['white_score']} 白:{game['white'] or '-'} 勝者={game['winner']}{truncated}\n"
+            f"{moves}")
+
+
+def import_records(writer, lines):
+    """
+    棋譜文字列（1行1局, 例: 'f5d6c3...'）か arena.py の結果（1行1局の JSON）を追記する。
+
+    Returns:
+        tuple: (追記した対局数, 読み飛ばした行数)
+    """
+    added = skipped = 0
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            if line.startswith("{"):
+                result = json.loads(line)
+                writer.append(parse_moves(result["moves"]), result.get("black", ""),
+                              result.get("white", ""))
+            else:
+                writer.append(parse_moves(line.split()[0]))
+            added += 1
+        except (ValueError, KeyError):
+            skipped += 1
+    return added, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="棋譜ストアの作成と参照")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("import", help="棋譜ファイルや arena.py の結果を追記する")
+    imp.add_argument("records", nargs="+", help="棋譜ファイル（'-' で標準入力）")
+    imp.add_argument("-o", "--output", required=True, help="棋譜ストアのディレクトリ")
+
+    show = sub.add_parser("show", help="対局を表示する")
+    show.add_argument("store", help="棋譜ストアのディレクトリ")
+    show.add_argument("ids", nargs="*", type=int, help="対局番号（省略時は最後の10局）")
+
+    args = parser.parse_args()
+
+    if args.command == "import":
+        with GameWriter(args.output) as writer:
+            added = skipped = 0
+            for path in args.records:
+                if path == "-":
+                    a, s = import_records(writer, sys.stdin)
+                else:
+                    with open(path, encoding="utf-8") as f:
+                        a, s = import_records(writer, f)
+                added += a
+                skipped += s
+        print(f"games: {added}  skipped: {skipped}")
+
+    elif args.command == "show":
+        with GameStore(args.store) as store:
+            ids = args.ids or range(max(0, len(store) - 10), len(store))
+            for game_id in ids:
+                print(format_game(store[game_id]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+"""
+サーバーの負荷試験ツール（asyncio）
+
+ReversiClient と同じ JSON プロトコルで多数の接続を開き、
+プレイヤー2人をボットとして対局させながら、観戦者を含む全接続の受信を計測する。
+
+計測する項目:
+    connect   : 接続してから player_assigned / spectator_assigned を受け取るまで
+    move_rtt  : 手を送ってから、その手を反映した盤面を自分が受け取るまで
+    broadcast : 手が送られてから、その手を反映した盤面を他の接続が受け取るまで
+    game      : 対局開始から game_over を受け取るまで
+
+使い方:
+    python loadgen.py --spectators 200 --games 3
+"""
+
+import argparse
+import asyncio
+import ipaddress
+import json
+import random
+import socket
+import time
+
+from ai import GreedyPlayer, RandomPlayer
+from client_base import BUFFER_SIZE, SERVER_PORT
+from bitboard import bits_to_board, flips
+from framing import FrameDecoder, board_hash
+
+
+def percentile(sorted_values, p):
+    """ソート済みのリストの p パーセンタイル（最近傍法）"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Stats:
+    """計測結果の集計"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.counters = {}
+        self.messages = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+
+    def add_latency(self, name, seconds):
+        self.latencies.setdefault(name, []).append(seconds)
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def report(self):
+        """集計結果を辞書で返す"""
+        elapsed = time.perf_counter() - self.started
+        result = {
+            "elapsed": round(elapsed, 3),
+            "messages": self.messages,
+            "bytes": self.bytes,
+            "messages_per_sec": round(self.messages / elapsed, 1) if elapsed else 0.0,
+            "bytes_per_sec": round(self.bytes / elapsed, 1) if elapsed else 0.0,
+            "counters": dict(sorted(self.counters.items())),
+            "latency_ms": {},
+        }
+        for name, values in sorted(self.latencies.items()):
+            values.sort()
+            result["latency_ms"][name] = {
+                "count": len(values),
+                "p50": round(percentile(values, 50) * 1000, 3),
+                "p90": round(percentile(values, 90) * 1000, 3),
+                "p99": round(percentile(values, 99) * 1000, 3),
+                "max": round(values[-1] * 1000, 3),
+            }
+        return result
+
+
+class GameState:
+    """1対局分の共有状態（どの接続が最後に手を送ったか）"""
+
+    def __init__(self):
+        self.move_seq = 0
+        self.move_sent_at = 0.0
+        self.mover = None
+        self.over = asyncio.Event()
+        self.started_at = None
+
+
+class LoadClient:
+    """負荷試験用の1接続"""
+
+    def __init__(self, index, game, stats, player, timeout, frames="json"):
+        self.index = index
+        self.game = game
+        self.stats = stats
+        self.player = player
+        self.timeout = timeout
+        self.frames = frames
+        # 着手フレームを受け取る場合の (黒, 白) のビットボード
+        self.stones = None
+        self.reader = None
+        self.writer = None
+        self.role = None
+        self.player_number = -1
+        self.playing = False
+        self.seen_seq = 0
+        self.connect_started = 0.0
+        self.assigned = asyncio.Event()
+
+    async def connect(self, host, port):
+        """接続する（失敗した場合は False）"""
+        self.connect_started = time.perf_counter()
+        try:
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(host, port), self.timeout)
+        except (OSError, asyncio.TimeoutError):
+            self.stats.count("connect_failed")
+            return False
+        return True
+
+    async def run(self):
+        """game_over または切断まで受信を続ける"""
+        decoder = FrameDecoder()
+        try:
+            while not self.game.over.is_set():
+                data = await self.reader.read(BUFFER_SIZE)
+                if not data:
+                    if not self.game.over.is_set():
+                        self.stats.count("unexpected_disconnect")
+                    return
+                received_at = time.perf_counter()
+                self.stats.bytes += len(data)
+                for message in decoder.feed(data):
+                    self.stats.messages += 1
+                    await self.handle(message, received_at)
+        except (OSError, asyncio.IncompleteReadError):
+            self.stats.count("receive_error")
+        finally:
+            self.assigned.set()
+
+    async def handle(self, message, received_at):
+        """1メッセージを処理"""
+        msg_type = message.get("type")
+        if msg_type == "player_assigned":
+            self.role = "player"
+            self.player_number = message["player_number"]
+            self.stats.add_latency("connect", received_at - self.connect_started)
+            await self.request_frames(message)
+            self.assigned.set()
+        elif msg_type == "spectator_assigned":
+            self.role = "spectator"
+            self.stats.add_latency("connect", received_at - self.connect_started)
+            await self.request_frames(message)
+            self.assigned.set()
+        elif msg_type == "game_start":
+            self.playing = True
+            if self.game.started_at is None:
+                self.game.started_at = received_at
+        elif msg_type == "game_over":
+            self.stats.count("game_over")
+            if self.game.started_at is not None and not self.game.over.is_set():
+                self.stats.add_latency("game", received_at - self.game.started_at)
+            self.game.over.set()
+        elif "board" in message or "delta" in message:
+            if self.game.move_seq > self.seen_seq:
+                self.seen_seq = self.game.move_seq
+                latency = received_at - self.game.move_sent_at
+                self.stats.add_latency(
+                    "move_rtt" if self.game.mover is self else "broadcast", latency)
+            if "delta" in message:
+                board = self.apply_delta(message)
+            else:
+                board = message["board"]
+                if "black" in message:
+                    self.stones = (message["black"], message["white"])
+            if (board is not None and self.playing and self.role == "player"
+                    and message["current_turn"] == self.player_number):
+                await self.send_move(board)
+        elif "error" in message:
+            self.stats.count("server_error")
+        else:
+            self.stats.count("unknown_message")
+
+    async def request_frames(self, message):
+        """サーバーが対応していれば盤面をバイナリフレームか着手フレームで受け取る"""
+        if self.frames != "json" and message.get(self.frames):
+            self.stats.count(self.frames)
+            await self.send({self.frames: 1})
+
+    def apply_delta(self, message):
+        """
+        着手フレームを手元の盤面に適用する。
+
+        Returns:
+            list: 着手後の board[row][col]（観戦者と不一致時は None）
+        """
+        if self.stones is None:
+            self.stats.count("delta_without_snapshot")
+            return None
+        row, col = message["move"]
+        sq = row * 8 + col
+        black, white = self.stones
+        own, opp = (black, white) if message["color"] == 1 else (white, black)
+        f = flips(own, opp, sq)
+        own, opp = own | f | (1 << sq), opp ^ f
+        self.stones = (own, opp) if message["color"] == 1 else (opp, own)
+        if board_hash(*self.stones) != message["hash"]:
+            self.stats.count("delta_mismatch")
+        if self.role != "player":
+            return None
+        return bits_to_board(*self.stones, 0, 1, 2)
+
+    async def send(self, message):
+        """JSONメッセージを送信"""
+        self.writer.write(json.dumps(message, separators=(",", ":")).encode())
+        try:
+            await self.writer.drain()
+        except OSError:
+            self.stats.count("send_error")
+
+    async def send_move(self, board):
+        """ボットに手を選ばせて送信"""
+        move = self.player.choose_move(board, self.player_number + 1, 0)
+        if move is None:
+            return
+        row, col = move
+        self.game.move_seq += 1
+        self.game.mover = self
+        self.game.move_sent_at = time.perf_counter()
+        await self.send({"row": row, "col": col})
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+
+
+async def run_game(args, stats, rng):
+    """プレイヤー2人と観戦者で1局行う"""
+    game = GameState()
+    clients = []
+    tasks = []
+
+    def make_client():
+        if args.bot == "greedy":
+            player = GreedyPlayer(rng.getrandbits(32))
+        else:
+            player = RandomPlayer(rng.getrandbits(32))
+        client = LoadClient(len(clients), game, stats, player, args.timeout, args.frames)
+        clients.append(client)
+        return client
+
+    # プレイヤーは順番に接続して割り当てを確定させる
+    for _ in range(2):
+        client = make_client()
+        if await client.connect(args.host, args.port):
+            tasks.append(asyncio.create_task(client.run()))
+            try:
+                await asyncio.wait_for(client.assigned.wait(), args.timeout)
+            except asyncio.TimeoutError:
+                stats.count("assign_timeout")
+
+    # 観戦者はまとめて接続する
+    spectators = [make_client() for _ in range(args.spectators)]
+    results = await asyncio.gather(*(c.connect(args.host, args.port) for c in spectators))
+    for client, ok in zip(spectators, results):
+        if ok:
+            tasks.append(asyncio.create_task(client.run()))
+
+    try:
+        await asyncio.wait_for(game.over.wait(), args.game_timeout)
+    except asyncio.TimeoutError:
+        stats.count("game_timeout")
+        game.over.set()
+
+    # game_over を受け取った接続から順に閉じる
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await asyncio.gather(*(c.close() for c in clients))
+    stats.count("games")
+
+
+async def run(args):
+    stats = Stats()
+    rng = random.Random(args.seed)
+    for game_no in range(args.games):
+        await run_game(args, stats, rng)
+        if game_no + 1 < args.games:
+            # サーバーは game_over 送信後にしばらく停止するので待つ
+            await asyncio.sleep(args.pause)
+    return stats.report()
+
+
+def is_localhost(host):
+    """host がループバックアドレスか"""
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="サーバーの負荷試験（localhost 専用）")
+    parser.add_argument("--host", default="127.0.0.1", help="サーバーのアドレス（ループバックのみ）")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help="サーバーのポート")
+    parser.add_argument("-s", "--spectators", type=int, default=50, help="1局あたりの観戦者数")
+    parser.add_argument("-g", "--games", type=int, default=1, help="対局数")
+    parser.add_argument("--bot", choices=("random", "greedy"), default="random",
+                        help="プレイヤーのボット")
+    parser.add_argument("--timeout", type=float, default=10.0, help="接続のタイムアウト（秒）")
+    parser.add_argument("--game-timeout", type=float, default=120.0,
+                        help="1局のタイムアウト（秒）")
+    parser.add_argument("--pause", type=float, default=11.0,
+                        help="対局の間に待つ時間（秒）")
+    parser.add_argument("--frames", choices=("json", "binary", "delta"), default="json",
+                        help="盤面の受け取り方（サーバーが対応している場合）")
+    parser.add_argument("--seed", type=int, help="乱数シード")
+    parser.add_argument("--json", help="結果を JSON で書き出すファイル")
+    args = parser.parse_args()
+
+    if not is_localhost(args.host):
+        parser.error("負荷試験は localhost に対してのみ実行できます")
+
+    report = asyncio.run(run(args))
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+モンテカルロ木探索（UCT, 任意で RAVE）による自動プレイヤー
+
+ルート並列化: 各ワーカープロセスが独立に木を作り、
+ルート直下の手ごとの訪問回数と勝ち数を合算して手を決める。
+盤面は bitboard モジュールの (own, opp) 形式で扱う。
+"""
+
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bitboard import (
+    OTHELLO_COL,
+    board_to_bits,
+    flips,
+    legal_moves,
+)
+
+# パスを表す手
+PASS_MOVE = -1
+# UCT の探索係数
+EXPLORATION = 1.4
+# RAVE の重みの減衰（この訪問回数前後で通常の勝率と同じ重みになる）
+RAVE_EQUIVALENCE = 300
+# 時間切れを確認する間隔（プレイアウト回数）
+CHECK_INTERVAL = 16
+
+
+def _win_value(diff):
+    """石数差を勝ち=1, 引き分け=0.5, 負け=0 に変換"""
+    if diff > 0:
+        return 1.0
+    if diff < 0:
+        return 0.0
+    return 0.5
+
+
+def playout(own, opp, rng, played=None):
+    """
+    ランダムに終局まで打ち進める。
+
+    Args:
+        own (int): 手番側の石
+        opp (int): 相手側の石
+        rng (random.Random): 乱数生成器
+        played (list): 指定すると打った手（パスは PASS_MOVE）を追加する
+
+    Returns:
+        int: 開始局面の手番側から見た最終石数差
+    """
+    sign = 1
+    passed = False
+    while True:
+        moves = legal_moves(own, opp)
+        if not moves:
+            if passed:
+                break
+            passed = True
+            own, opp = opp, own
+            sign = -sign
+            if played is not None:
+                played.append(PASS_MOVE)
+            continue
+        passed = False
+
+        # k 番目に立っているビットを選ぶ
+        for _ in range(rng.randrange(moves.bit_count())):
+            moves &= moves - 1
+        low = moves & -moves
+        sq = low.bit_length() - 1
+        f = flips(own, opp, sq)
+        own, opp = opp ^ f, own | f | low
+        sign = -sign
+        if played is not None:
+            played.append(sq)
+
+    return sign * (own.bit_count() - opp.bit_count())
+
+
+class Node:
+    """探索木のノード（wins はこのノードへ打った側から見た勝ち数）"""
+
+    __slots__ = ("own", "opp", "move", "parent", "children", "untried",
+                 "visits", "wins", "amaf_visits", "amaf_wins", "terminal")
+
+    def __init__(self, own, opp, move=None, parent=None):
+        self.own = own
+        self.opp = opp
+        self.move = move
+        self.parent = parent
+        self.children = []
+        self.visits = 0
+        self.wins = 0.0
+        self.amaf_visits = 0
+        self.amaf_wins = 0.0
+
+        moves = legal_moves(own, opp)
+        self.terminal = False
+        if moves:
+            self.untried = []
+            while moves:
+                low = moves & -moves
+                self.untried.append(low.bit_length() - 1)
+                moves ^= low
+        elif legal_moves(opp, own):
+            self.untried = [PASS_MOVE]
+        else:
+            self.untried = []
+            self.terminal = True
+
+    def expand(self, move):
+        """手 move を打った子ノードを追加"""
+        self.untried.remove(move)
+        if move == PASS_MOVE:
+            child = Node(self.opp, self.own, move, self)
+        else:
+            f = flips(self.own, self.opp, move)
+            child = Node(self.opp ^ f, self.own | f | (1 << move), move, self)
+        self.children.append(child)
+        return child
+
+    def select_child(self, exploration, rave):
+        """UCT（RAVE 有効時は AMAF の勝率と混ぜた値）が最大の子ノードを選ぶ"""
+        log_n = math.log(self.visits)
+        best = None
+        best_value = -1.0
+        for child in self.children:
+            q = child.wins / child.visits
+            if rave and child.amaf_visits:
+                beta = math.sqrt(RAVE_EQUIVALENCE / (3 * self.visits + RAVE_EQUIVALENCE))
+                q = (1 - beta) * q + beta * (child.amaf_wins / child.amaf_visits)
+            value = q + exploration * math.sqrt(log_n / child.visits)
+            if value > best_value:
+                best_value = value
+                best = child
+        return best
+
+
+def search_tree(own, opp, time_limit, seed=None, rave=False, exploration=EXPLORATION,
+                max_playouts=None):
+    """
+    1本の木で探索し、ルート直下の手ごとの統計を返す。
+
+    Returns:
+        dict: {手: (訪問回数, 勝ち数)}（勝ち数は手番側から見た値）
+    """
+    rng = random.Random(seed)
+    root = Node(own, opp)
+    deadline = time.perf_counter() + time_limit
+    playouts = 0
+
+    while True:
+        if max_playouts is not None and playouts >= max_playouts:
+            break
+        if not playouts % CHECK_INTERVAL and time.perf_counter() >= deadline:
+            break
+        playouts += 1
+
+        # 選択
+        node = root
+        path = [root]
+        while not node.untried and node.children:
+            node = node.select_child(exploration, rave)
+            path.append(node)
+
+        # 展開
+        if node.untried:
+            node = node.expand(rng.choice(node.untried))
+            path.append(node)
+
+        # シミュレーション
+        played = [n.move for n in path[1:]] if rave else None
+        if node.terminal:
+            diff = node.own.bit_count() - node.opp.bit_count()
+        else:
+            diff = playout(node.own, node.opp, rng, played)
+
+        # 逆伝播（葉の手番側から見て奇数段上なら勝敗が逆になる）
+        leaf_value = _win_value(diff)
+        last = len(path) - 1
+        for i, n in enumerate(path):
+            # path[i] の手番側にとっての価値
+            value = leaf_value if (last - i) % 2 == 0 else 1.0 - leaf_value
+            n.visits += 1
+            n.wins += 1.0 - value
+            if rave and n.children:
+                # path[i] の手番側がこの後に打った手は、その子の手として評価する
+                later = set(played[i::2])
+                for child in n.children:
+                    if child.move in later:
+                        child.amaf_visits += 1
+                        child.amaf_wins += value
+
+    return {child.move: (child.visits, child.wins) for child in root.children}
+
+
+def merge_stats(results):
+    """複数の木のルート統計を合算"""
+    merged = {}
+    for stats in results:
+        for move, (visits, wins) in stats.items():
+            total = merged.get(move, (0, 0.0))
+            merged[move] = (total[0] + visits, total[1] + wins)
+    return merged
+
+
+class MCTSPlayer:
+    """
+    モンテカルロ木探索で手を選ぶ自動プレイヤー。
+
+    Args:
+        time_limit (float): 1手あたりの思考時間（秒）
+        workers (int): ルート並列化するプロセス数（1ならプロセスを使わない, None か 0 ならCPU数）
+        rave (bool): RAVE を使うか
+        exploration (float): UCT の探索係数
+    """
+
+    def __init__(self, time_limit=1.0, workers=None, rave=False, exploration=EXPLORATION):
+        self.time_limit = time_limit
+        self.workers = workers or os.cpu_count() or 1
+        self.rave = rave
+        self.exploration = exploration
+        self.executor = None
+        self.rng = random.Random()
+        # 直前の探索結果 (プレイアウト回数, 最善手の勝率, 経過時間)
+        self.last_info = None
+
+    def new_game(self, seed=None):
+        """対局の始めに呼ぶ。乱数を seed で設定し直す（探索木は手ごとに作るので残らない）"""
+        self.rng.seed(seed)
+        self.last_info = None
+
+    def close(self):
+        """ワーカープロセスを終了する"""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def search(self, own, opp):
+        """
+        手番側の手を選ぶ。
+
+        Returns:
+            tuple: (手のビット番号, 勝率)。合法手がなければ (None, 0.0)
+        """
+        moves = legal_moves(own, opp)
+        if not moves:
+            return None, 0.0
+        if moves & (moves - 1) == 0:
+            return moves.bit_length() - 1, 0.0
+
+        start = time.perf_counter()
+        seeds = [self.rng.getrandbits(64) for _ in range(self.workers)]
+        if self.workers == 1:
+            results = [search_tree(own, opp, self.time_limit, seeds[0], self.rave,
+                                   self.exploration)]
+        else:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            futures = [
+                self.executor.submit(search_tree, own, opp, self.time_limit, seed,
+                                     self.rave, self.exploration)
+                for seed in seeds
+            ]
+            results = [future.result() for future in futures]
+
+        stats = merge_stats(results)
+        move, (visits, wins) = max(stats.items(), key=lambda item: item[1][0])
+        playouts = sum(v for v, _ in stats.values())
+        self.last_info = (playouts, wins / visits, time.perf_counter() - start)
+        return move, wins / visits
+
+    def choose_move(self, board, turn, empty):
+        """
+        board[row][col] 形式の盤面で手を選ぶ。
+
+        Returns:
+            tuple: (row, col)。置ける場所がなければ None
+        """
+        own, opp = board_to_bits(board, turn, empty)
+        move, _ = self.search(own, opp)
+        if move is None:
+            return None
+        return divmod(move, OTHELLO_COL)
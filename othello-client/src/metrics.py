@@ -0,0 +1,129 @@
+"""
+クライアントの処理時間の計測
+
+フレームごとの処理（入力, 受信の処理, 状態更新, 描画）の時間, 受信してから
+画面に反映するまでの時間, メッセージの解析時間, 手を送ってから盤面が届くまでの時間を
+固定サイズのヒストグラムに記録する。
+
+ヒストグラムは 1 マイクロ秒から約 17 秒までを、2倍ごとに BUCKETS_PER_DOUBLING 個の
+対数の区間に分けて数える。記録は区間の数を1つ増やすだけなので、
+長時間動かしても使うメモリは変わらない。パーセンタイルは区間の境界から求める近似値。
+"""
+
+import json
+import math
+import time
+
+# 2倍ごとの区間の数（区間の幅は約 19%）
+BUCKETS_PER_DOUBLING = 4
+# 最初の区間の下限（秒）
+MIN_SECONDS = 1e-6
+# 区間の数（最後の区間はそれより長いものをすべて数える）
+BUCKET_COUNT = 24 * BUCKETS_PER_DOUBLING + 1
+
+
+def bucket_index(seconds):
+    """時間が入る区間の番号"""
+    if seconds <= MIN_SECONDS:
+        return 0
+    index = int(math.log2(seconds / MIN_SECONDS) * BUCKETS_PER_DOUBLING) + 1
+    return min(index, BUCKET_COUNT - 1)
+
+
+def bucket_upper(index):
+    """区間の上限（秒）"""
+    return MIN_SECONDS * 2 ** (index / BUCKETS_PER_DOUBLING)
+
+
+class Histogram:
+    """処理時間のヒストグラム（件数, 合計, 最小, 最大と区間ごとの件数）"""
+
+    def __init__(self):
+        self.buckets = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, seconds):
+        """1件記録する"""
+        self.buckets[bucket_index(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        """
+        p パーセンタイル（その件数に達した区間の上限。最大値を超えない）
+
+        Args:
+            p (float): 0 から 100
+        """
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(self.count * p / 100))
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return min(bucket_upper(index), self.max)
+        return self.max
+
+    def summary(self):
+        """ミリ秒単位の要約"""
+        count = self.count
+        return {
+            "count": count,
+            "mean_ms": round(self.total / count * 1e3, 4) if count else 0.0,
+            "min_ms": round((self.min or 0.0) * 1e3, 4),
+            "p50_ms": round(self.percentile(50) * 1e3, 4),
+            "p95_ms": round(self.percentile(95) * 1e3, 4),
+            "p99_ms": round(self.percentile(99) * 1e3, 4),
+            "max_ms": round(self.max * 1e3, 4),
+        }
+
+    def to_dict(self):
+        """要約と、件数のある区間の (上限のミリ秒, 件数)"""
+        result = self.summary()
+        result["buckets"] = [[round(bucket_upper(index) * 1e3, 6), count]
+                             for index, count in enumerate(self.buckets) if count]
+        return result
+
+
+class Metrics:
+    """名前ごとのヒストグラム（最初に記録したときに作る）"""
+
+    def __init__(self):
+        self.histograms = {}
+        self.started = time.time()
+
+    def add(self, name, seconds):
+        """name のヒストグラムに1件記録する"""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.add(seconds)
+
+    def get(self, name):
+        """name のヒストグラム（まだ記録がなければ None）"""
+        return self.histograms.get(name)
+
+    def to_dict(self):
+        """すべてのヒストグラムを辞書にする"""
+        return {
+            "started": self.started,
+            "duration": round(time.time() - self.started, 3),
+            "histograms": {name: histogram.to_dict()
+                           for name, histogram in sorted(self.histograms.items())},
+        }
+
+    def dump(self, path):
+        """JSON でファイルに書き出す"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+            f.write("\n")
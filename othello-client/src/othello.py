@@ -3,6 +3,10 @@ import struct
 import pygame
 import sys
 
+import bitboard
+from ai import ENGINES, create_player
+from book import OpeningBook
+
 OTHELLO_ROW = 8
 OTHELLO_COL = 8
 PORT = 10000 
@@ -81,24 +85,10 @@ def flip_stone(turn, row, col, d_row, d_col, board):
         t_col += d_col
 
 def flip(turn, row, col, board):
-    board[row][col] = turn
-    for d_row in (-1, 0, 1):
-        for d_col in (-1, 0, 1):
-            if d_row == 0 and d_col == 0:
-                continue
-            if count_flip_stone(turn, row, col, d_row, d_col, board) > 0:
-                flip_stone(turn, row, col, d_row, d_col, board)
+    bitboard.flip(turn, row, col, board, NO_STONE)
 
 def check_position(turn, row, col, board):
-    if board[row][col] != NO_STONE:
-        return 0
-    count = 0
-    for d_row in (-1, 0, 1):
-        for d_col in (-1, 0, 1):
-            if d_row == 0 and d_col == 0:
-                continue
-            count += count_flip_stone(turn, row, col, d_row, d_col, board)
-    return count
+    return bitboard.check_position(turn, row, col, board, NO_STONE)
 
 def make_connection(addr):
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -166,6 +156,11 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('-s', required=True, help='Server address')
     parser.add_argument('-n', required=True, help='User name')
+    parser.add_argument('-a', action='store_true', help='Play automatically with the AI')
+    parser.add_argument('-t', type=float, default=1.0, help='AI thinking time per move (sec)')
+    parser.add_argument('-b', help='Opening book file used by the AI')
+    parser.add_argument('-e', choices=ENGINES, default='alphabeta', help='AI engine')
+    parser.add_argument('--rave', action='store_true', help='Use RAVE in the MCTS engine')
     args = parser.parse_args()
 
     srv_addr = args.s
@@ -178,6 +173,11 @@ def main():
     print(f"server address: {srv_addr}")
     print(f"user name: {user_name}")
 
+    player = None
+    if args.a:
+        book = OpeningBook(args.b) if args.b else None
+        player = create_player(args.e, time_limit=args.t, book=book, rave=args.rave)
+
     sock = make_connection(srv_addr)
     mycolor = initialize_game(sock, user_name)
     board = initialize_board()
@@ -197,8 +197,14 @@ def main():
             continue
 
         print(f"My turn \"{mycolor}\"")
-        row = int(input("input row(0-7): "))
-        col = int(input("input col(0-7): "))
+        move = None
+        if player is not None:
+            move = player.choose_move(board, turn, NO_STONE)
+        if move is not None:
+            row, col = move
+        else:
+            row = int(input("input row(0-7): "))
+            col = int(input("input col(0-7): "))
         print(f"(row, col)=({row},{col})")
 
         if check_position(turn, row, col, board) == 0:
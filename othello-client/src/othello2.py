@@ -3,6 +3,9 @@ import struct
 import pygame
 import sys
 
+import bitboard
+from text_cache import get_font, render_text
+
 OTHELLO_ROW = 8
 OTHELLO_COL = 8
 PORT = 10000 
@@ -65,7 +68,7 @@ class Msg:
         return m
     
 def set_username(screen):
-    font = pygame.font.SysFont("meiryo", 32)
+    font = get_font("meiryo", 32)
     input_box = pygame.Rect(200, 300, 400, 50)  # 入力ボックスの位置とサイズ
     color_inactive = pygame.Color('black')
     color_active = pygame.Color('dodgerblue2')
@@ -100,12 +103,12 @@ def set_username(screen):
 
         # 画面を更新
         screen.fill((128, 200, 128))  # 背景色
-        txt_surface = font.render(text, True, pygame.Color('black'))
+        txt_surface = render_text(font, text, True, pygame.Color('black'))
         screen.blit(txt_surface, (input_box.x + 10, input_box.y + 10))
         pygame.draw.rect(screen, color, input_box, 2)
 
         # メッセージを表示
-        message = font.render("あなたの名前を入力してください。", True, pygame.Color('black'))
+        message = render_text(font, "あなたの名前を入力してください。", True, pygame.Color('black'))
         screen.blit(message, (200, 250))
 
         pygame.display.flip()
@@ -169,10 +172,10 @@ def draw_board(screen, board):
             pygame.draw.circle(screen, color, center, cell_size // 2 - 5)
 
     # 右側の空間に文字列を描画
-    font = pygame.font.SysFont("meiryo", 16)
-    text = font.render("Your Turn", True, (0, 0, 0))
+    font = get_font("meiryo", 16)
+    text = render_text(font, "Your Turn", True, (0, 0, 0))
     screen.blit(text, (660, 20))  # 盤の右側に表示
-    text2 = font.render("score: 黒 2 - 白 2", True, (0, 0, 0))
+    text2 = render_text(font, "score: 黒 2 - 白 2", True, (0, 0, 0))
     screen.blit(text2, (660, 60))
 
 
@@ -196,11 +199,7 @@ def upgrade_board(board, cells):
     return board
 
 def place_stone(board, row, col, current_turn):
-    if can_place_stone(board, row, col, current_turn):
-        board[row][col] = current_turn
-        flip_stones(board, row, col, current_turn)
-        return True
-    return False
+    return bitboard.place_stone(board, row, col, current_turn, 'EMPTY')
 
 def can_place_stone(board, row, col, current_turn):
     """
@@ -215,24 +214,7 @@ def can_place_stone(board, row, col, current_turn):
     Returns:
         bool: 石を置ける場合はTrue、それ以外はFalse
     """
-    if board[row][col] != "EMPTY":
-        return False
-
-    opponent = "W" if current_turn == "B" else "B"
-
-    for dr, dc in DIRECTIONS:
-        r, c = row + dr, col + dc
-        found_opponent = False
-
-        while 0 <= r < OTHELLO_ROW and 0 <= c < OTHELLO_COL and board[r][c] == opponent:
-            found_opponent = True
-            r += dr
-            c += dc
-
-        if found_opponent and 0 <= r < OTHELLO_ROW and 0 <= c < OTHELLO_COL and board[r][c] == current_turn:
-            return True
-
-    return False
+    return bitboard.can_place_stone(board, row, col, current_turn, 'EMPTY')
 
 def flip_stones(board, row, col, current_turn):
     """
@@ -247,25 +229,7 @@ def flip_stones(board, row, col, current_turn):
     Returns:
         bool: 少なくとも1つの石をひっくり返した場合はTrue、それ以外はFalse
     """
-    opponent = "W" if current_turn == "B" else "B"
-    flipped = False
-
-    for dr, dc in DIRECTIONS:
-        stones_to_flip = []
-        r, c = row + dr, col + dc
-
-        while 0 <= r < OTHELLO_ROW and 0 <= c < OTHELLO_COL and board[r][c] == opponent:
-            stones_to_flip.append((r, c))
-            r += dr
-            c += dc
-
-        if 0 <= r < OTHELLO_ROW and 0 <= c < OTHELLO_COL and board[r][c] == current_turn:
-            for fr, fc in stones_to_flip:
-                board[fr][fc] = current_turn
-            if stones_to_flip:
-                flipped = True
-
-    return flipped
+    return bitboard.flip_stones(board, row, col, current_turn, 'EMPTY')
 
 
 def main():
@@ -286,7 +250,9 @@ def main():
     current_turn = "BLACK"
     running = True
     while running:
-        for event in pygame.event.get():
+        # イベントが来るまで眠り、盤が変わり得るときだけ描き直す
+        redraw = False
+        for event in [pygame.event.wait()] + pygame.event.get():
             if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:  # 左クリック
                 x, y = event.pos
                 cell_size = 640 // 8
@@ -297,11 +263,15 @@ def main():
                 if place_stone(board, row, col, current_turn):
                     current_turn = "WHITE" if current_turn == "BLACK" else "BLACK"
                 print("石を置く")
+                redraw = True
+            if event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+                redraw = True
             if event.type == pygame.QUIT:
                 running = False
+        if redraw and running:
             #upgrade_board(board, test_cell)
             draw_board(screen, board)
-            pygame.display.update() 
+            pygame.display.update()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,325 @@
+"""
+着手生成の perft（正しさの確認と速度の計測）
+
+初期局面から深さ N までの末端の局面数を数え、既知の値と比べる。
+ルールの実装ごとに同じ手順で数えるので、実装どうしの食い違いと速度の差が分かる。
+
+数え方（既知の値と同じ規則）:
+    - パスも1手と数える（パスした局面から深さを1つ減らして続ける）
+    - 両者とも打てない局面（終局）はその時点で1局面と数える
+
+実装:
+    bitboard : bitboard.legal_moves / flips
+    scan     : 盤面を8方向に1マスずつたどる実装（bitboard を使わない照合用）
+    othello  : othello.py の check_position / flip（空きマス ' '）
+    othello2 : othello2.py の can_place_stone / place_stone（空きマス 'EMPTY'）
+    othello と othello2 は bitboard への変換を通すので、bitboard と独立に確かめられるのは scan。
+    othello.py と othello2.py の初期配置は左右反転した形だが、perft の値は対称なので変わらない。
+
+使い方:
+    python perft.py --depth 6
+    python perft.py --depth 9 --backend bitboard --divide
+"""
+
+import argparse
+import importlib
+import json
+import sys
+import time
+
+from bitboard import (
+    DIRECTIONS,
+    INITIAL_BLACK,
+    INITIAL_WHITE,
+    OTHELLO_COL,
+    OTHELLO_ROW,
+    bits_to_board,
+    flips,
+    iter_squares,
+    legal_moves,
+    square_name,
+)
+
+# 初期局面からの末端の局面数（パスを1手と数え、終局はその時点で1局面）
+REFERENCE = {
+    1: 4,
+    2: 12,
+    3: 56,
+    4: 244,
+    5: 1396,
+    6: 8200,
+    7: 55092,
+    8: 390216,
+    9: 3005288,
+    10: 24571284,
+    11: 212258800,
+}
+
+DEFAULT_DEPTH = 6
+
+
+class BitboardBackend:
+    """bitboard モジュール。局面は (手番側の石, 相手側の石)"""
+
+    name = "bitboard"
+
+    def initial(self):
+        return INITIAL_BLACK, INITIAL_WHITE
+
+    def moves(self, position):
+        own, opp = position
+        return list(iter_squares(legal_moves(own, opp)))
+
+    def play(self, position, move):
+        own, opp = position
+        f = flips(own, opp, move)
+        return opp ^ f, own | f | (1 << move)
+
+    def pass_turn(self, position):
+        own, opp = position
+        return opp, own
+
+    def move_name(self, move):
+        return square_name(move)
+
+
+class ScanBackend:
+    """
+    board[row][col] の盤面を8方向に1マスずつたどる実装。局面は (盤面, 手番の石)
+
+    othello.py にもともとあった count_flip_stone / flip_stone と同じ走査で、
+    bitboard を使わないので bitboard の照合に使う。
+    """
+
+    name = "scan"
+    empty = " "
+    black = "B"
+    white = "W"
+
+    def initial(self):
+        return bits_to_board(INITIAL_BLACK, INITIAL_WHITE, self.empty, self.black,
+                             self.white), self.black
+
+    def count_flips(self, board, turn, row, col, d_row, d_col):
+        """(row, col) から (d_row, d_col) の向きに返せる石の数"""
+        t_row, t_col = row + d_row, col + d_col
+        count = 0
+        while 0 <= t_row < OTHELLO_ROW and 0 <= t_col < OTHELLO_COL:
+            cell = board[t_row][t_col]
+            if cell == self.empty:
+                return 0
+            if cell == turn:
+                return count
+            count += 1
+            t_row += d_row
+            t_col += d_col
+        return 0
+
+    def moves(self, position):
+        board, turn = position
+        return [(row, col) for row in range(OTHELLO_ROW) for col in range(OTHELLO_COL)
+                if board[row][col] == self.empty
+                and any(self.count_flips(board, turn, row, col, d_row, d_col)
+                        for d_row, d_col in DIRECTIONS)]
+
+    def play(self, position, move):
+        board, turn = position
+        board = [row[:] for row in board]
+        row, col = move
+        for d_row, d_col in DIRECTIONS:
+            for i in range(1, self.count_flips(board, turn, row, col, d_row, d_col) + 1):
+                board[row + d_row * i][col + d_col * i] = turn
+        board[row][col] = turn
+        return board, self.white if turn == self.black else self.black
+
+    def pass_turn(self, position):
+        board, turn = position
+        return board, self.white if turn == self.black else self.black
+
+    def move_name(self, move):
+        row, col = move
+        return square_name(row * OTHELLO_COL + col)
+
+
+class ListBackend:
+    """
+    board[row][col] 形式の盤面を使う実装。局面は (盤面, 手番の石)
+
+    Args:
+        module_name (str): 実装のモジュール名（pygame を読み込むので使うときに import する）
+    """
+
+    def __init__(self, module_name):
+        self.name = module_name
+        self.module = importlib.import_module(module_name)
+        self.black = self.module.BLACK
+        self.white = self.module.WHITE
+
+    def initial(self):
+        return self.module.initialize_board(), self.black
+
+    def pass_turn(self, position):
+        board, turn = position
+        return board, self.white if turn == self.black else self.black
+
+    def move_name(self, move):
+        row, col = move
+        return square_name(row * OTHELLO_COL + col)
+
+
+class OthelloBackend(ListBackend):
+    """othello.py の check_position / flip"""
+
+    def __init__(self):
+        super().__init__("othello")
+
+    def moves(self, position):
+        board, turn = position
+        check_position = self.module.check_position
+        return [(row, col) for row in range(OTHELLO_ROW) for col in range(OTHELLO_COL)
+                if check_position(turn, row, col, board) > 0]
+
+    def play(self, position, move):
+        board, turn = position
+        board = [row[:] for row in board]
+        self.module.flip(turn, move[0], move[1], board)
+        return board, self.white if turn == self.black else self.black
+
+
+class Othello2Backend(ListBackend):
+    """othello2.py の can_place_stone / place_stone"""
+
+    def __init__(self):
+        super().__init__("othello2")
+
+    def moves(self, position):
+        board, turn = position
+        can_place_stone = self.module.can_place_stone
+        return [(row, col) for row in range(OTHELLO_ROW) for col in range(OTHELLO_COL)
+                if can_place_stone(board, row, col, turn)]
+
+    def play(self, position, move):
+        board, turn = position
+        board = [row[:] for row in board]
+        self.module.place_stone(board, move[0], move[1], turn)
+        return board, self.white if turn == self.black else self.black
+
+
+BACKENDS = {
+    "bitboard": BitboardBackend,
+    "scan": ScanBackend,
+    "othello": OthelloBackend,
+    "othello2": Othello2Backend,
+}
+
+
+def perft(backend, position, depth, passed=False):
+    """
+    position から深さ depth の末端の局面数を数える。
+
+    Args:
+        backend: 実装（moves, play, pass_turn を持つもの）
+        position: 実装ごとの局面
+        depth (int): 深さ（1以上）
+        passed (bool): 直前の手がパスだったか
+    """
+    moves = backend.moves(position)
+    if not moves:
+        if passed or depth == 1:
+            return 1
+        return perft(backend, backend.pass_turn(position), depth - 1, True)
+    if depth == 1:
+        return len(moves)
+    total = 0
+    for move in moves:
+        total += perft(backend, backend.play(position, move), depth - 1)
+    return total
+
+
+def divide(backend, depth):
+    """初期局面の手ごとの perft を (手の表記, 局面数) のリストで返す"""
+    position = backend.initial()
+    if depth == 1:
+        return [(backend.move_name(move), 1) for move in backend.moves(position)]
+    return [(backend.move_name(move), perft(backend, backend.play(position, move), depth - 1))
+            for move in backend.moves(position)]
+
+
+def run(backend, max_depth, min_depth=1):
+    """
+    深さ min_depth から max_depth まで数えて結果を返す。
+
+    Returns:
+        list: 深さごとの結果の辞書（nodes, expected, ok, seconds, nodes_per_second）
+    """
+    results = []
+    for depth in range(min_depth, max_depth + 1):
+        start = time.perf_counter()
+        nodes = perft(backend, backend.initial(), depth)
+        elapsed = time.perf_counter() - start
+        expected = REFERENCE.get(depth)
+        results.append({
+            "backend": backend.name,
+            "depth": depth,
+            "nodes": nodes,
+            "expected": expected,
+            "ok": expected is None or nodes == expected,
+            "seconds": round(elapsed, 4),
+            "nodes_per_second": round(nodes / elapsed) if elapsed > 0 else None,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="着手生成の perft（既知の値との照合と速度の計測）")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH, help="最大の深さ")
+    parser.add_argument("--min-depth", type=int, default=1, help="最小の深さ")
+    parser.add_argument("--backend", choices=["all", *BACKENDS], default="all",
+                        help="調べる実装")
+    parser.add_argument("--divide", action="store_true",
+                        help="最大の深さについて初手ごとの局面数も表示する")
+    parser.add_argument("--json", action="store_true", help="結果を JSON で出力する")
+    args = parser.parse_args()
+    if args.depth < 1 or args.min_depth < 1:
+        parser.error("深さは1以上にしてください")
+
+    names = list(BACKENDS) if args.backend == "all" else [args.backend]
+    results = []
+    divides = {}
+    for name in names:
+        backend = BACKENDS[name]()
+        for result in run(backend, args.depth, args.min_depth):
+            results.append(result)
+            if not args.json:
+                expected = "-" if result["expected"] is None else f"{result['expected']:,}"
+                status = "ok" if result["ok"] else "MISMATCH"
+                print(f"{name:9s} depth {result['depth']:2d}  nodes {result['nodes']:>12,}  "
+                      f"expected {expected:>12}  {status:8s}  {result['seconds']:8.3f}s  "
+                      f"{result['nodes_per_second'] or 0:>12,} nodes/s", flush=True)
+        if args.divide:
+            divides[name] = divide(backend, args.depth)
+            if not args.json:
+                for move, nodes in divides[name]:
+                    print(f"  {move}: {nodes}")
+
+    # 実装どうしの食い違い（既知の値がない深さも含める）
+    disagreements = []
+    for depth in range(args.min_depth, args.depth + 1):
+        counts = {r["backend"]: r["nodes"] for r in results if r["depth"] == depth}
+        if len(set(counts.values())) > 1:
+            disagreements.append({"depth": depth, "nodes": counts})
+
+    if args.json:
+        json.dump({"results": results, "divide": divides, "disagreements": disagreements},
+                  sys.stdout, indent=2)
+        print()
+    else:
+        for entry in disagreements:
+            print(f"depth {entry['depth']}: 実装によって局面数が違います {entry['nodes']}")
+
+    if disagreements or not all(r["ok"] for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+"""
+対称な局面をまとめた局面索引
+
+盤面の8通りの対称変換（回転と反転）のうち最小になるものを代表局面とし、
+代表局面から「出現した対局数と、手番側から見た勝ち・負け・引き分けの数」を引く。
+対称な局面を1つにまとめるので、同じ序盤の局面は最大で8分の1の件数になる。
+
+索引はオープンアドレス法のハッシュ表をそのままファイルにしたもので、
+mmap して1回の探索で局面を引く。件数が増えたら2倍の大きさの表に作り直す。
+
+ファイル形式（リトルエンディアン）:
+    ヘッダ  : マジック 'OTPI', バージョン(u16), 予約(u16), スロット数(u64), 局面数(u64)
+    スロット: 代表局面の own(u64), opp(u64), 対局数(u32), 勝ち(u32), 負け(u32), 引き分け(u32)
+    own と opp がともに 0 のスロットは空き（実際の局面では必ず石がある）
+
+使い方:
+    python position_index.py build games/ -o positions.idx --plies 20
+    python position_index.py query positions.idx f5d6
+"""
+
+import argparse
+import mmap
+import os
+import struct
+
+from analyze import GameStats, decode_games, plan_shards, read_shard, replay_games
+from bitboard import (
+    FULL,
+    INITIAL_BLACK,
+    INITIAL_WHITE,
+    board_to_bits,
+    canonical,
+    iter_squares,
+    legal_moves,
+    make_move,
+    parse_moves,
+    replay,
+    square_name,
+)
+
+MAGIC = b"OTPI"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQQ")
+SLOT = struct.Struct("<QQIIII")
+KEY = struct.Struct("<QQ")
+
+# 新しく作る索引のスロット数（2のべき乗）
+DEFAULT_CAPACITY = 1 << 16
+# これを超えたら表を作り直す使用率
+MAX_LOAD = 0.7
+# 索引に入れる各対局の手数の既定値
+DEFAULT_PLIES = 20
+
+# 手番側から見た結果
+WIN = 1
+LOSS = -1
+DRAW = 0
+
+
+def canonical_key(own, opp):
+    """(own, opp) の代表局面（対称変換で最小になるもの）"""
+    c_own, c_opp, _ = canonical(own, opp)
+    return c_own, c_opp
+
+
+def board_key(board, turn, empty):
+    """
+    board[row][col] 形式の盤面の代表局面。
+
+    othello.py や othello2.py の initialize_board, flip, flip_stones で作った盤面をそのまま渡せる。
+
+    Args:
+        board (list): 盤面
+        turn: 手番側の石の値（例: 'B'）
+        empty: 空きマスの値（othello.py は ' ', othello2.py は 'EMPTY'）
+    """
+    return canonical_key(*board_to_bits(board, turn, empty))
+
+
+def side_to_move(own, opp):
+    """
+    手番側に合法手がなく相手にはあれば、パスした後の局面にする（replay と同じ扱い）。
+
+    Returns:
+        tuple: (own, opp, パスしたか)
+    """
+    if not legal_moves(own, opp) and legal_moves(opp, own):
+        return opp, own, True
+    return own, opp, False
+
+
+def _slot_hash(own, opp):
+    """代表局面からスロットの番号を決めるハッシュ（積の上位ビットは全マスの影響を受ける）"""
+    return (((own * 0x9E3779B97F4A7C15) ^ (opp * 0xC2B2AE3D27D4EB4F)) & FULL) >> 24
+
+
+class PositionIndex:
+    """
+    mmap した局面索引。
+
+    Args:
+        path (str): 索引ファイルのパス（writable なら、なければ作る）
+        writable (bool): 局面を追加するか
+        capacity (int): 新しく作るときのスロット数（2のべき乗）
+    """
+
+    def __init__(self, path, writable=False, capacity=DEFAULT_CAPACITY):
+        self.path = path
+        self.writable = writable
+        if writable and not os.path.exists(path):
+            _create(path, capacity)
+        self.file = None
+        self.map = None
+        self._open()
+
+    def _open(self):
+        self.file = open(self.path, "r+b" if self.writable else "rb")
+        try:
+            access = mmap.ACCESS_WRITE if self.writable else mmap.ACCESS_READ
+            self.map = mmap.mmap(self.file.fileno(), 0, access=access)
+        except ValueError:
+            self.file.close()
+            raise ValueError(f"{self.path}: 局面索引ではありません")
+        magic, version, _, self.capacity, self.count = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{self.path}: 局面索引ではありません")
+        if HEADER.size + self.capacity * SLOT.size > len(self.map):
+            self.close()
+            raise ValueError(f"{self.path}: ファイルが壊れています")
+        self.mask = self.capacity - 1
+
+    def close(self):
+        """局面数を書き戻してファイルを閉じる"""
+        if self.map is not None:
+            if self.writable:
+                HEADER.pack_into(self.map, 0, MAGIC, VERSION, 0, self.capacity, self.count)
+                self.map.flush()
+            self.map.close()
+            self.map = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def _find(self, own, opp):
+        """
+        代表局面のスロットの位置を探す。
+
+        Returns:
+            tuple: (位置, 見つかったか)。見つからなければ位置は入れるべき空きスロット
+        """
+        data = self.map
+        mask = self.mask
+        index = _slot_hash(own, opp) & mask
+        while True:
+            offset = HEADER.size + index * SLOT.size
+            s_own, s_opp = KEY.unpack_from(data, offset)
+            if s_own == own and s_opp == opp:
+                return offset, True
+            if s_own == 0 and s_opp == 0:
+                return offset, False
+            index = (index + 1) & mask
+
+    def lookup(self, own, opp):
+        """
+        局面（手番側から見た own, opp）の記録を返す。
+
+        Returns:
+            dict: games, wins, losses, draws（手番側から見た結果）。なければ None
+        """
+        offset, found = self._find(*canonical_key(own, opp))
+        if not found:
+            return None
+        _, _, games, wins, losses, draws = SLOT.unpack_from(self.map, offset)
+        return {"games": games, "wins": wins, "losses": losses, "draws": draws}
+
+    def lookup_board(self, board, turn, empty):
+        """board[row][col] 形式の盤面で lookup する"""
+        return self.lookup(*board_to_bits(board, turn, empty))
+
+    def add(self, own, opp, result):
+        """
+        局面の出現を1回記録する。
+
+        Args:
+            own, opp (int): 手番側から見た局面
+            result (int): 手番側から見たその対局の結果（WIN, LOSS, DRAW）
+        """
+        if not self.writable:
+            raise ValueError("読み込み専用で開いた索引です")
+        key = canonical_key(own, opp)
+        offset, found = self._find(*key)
+        if found:
+            _, _, games, wins, losses, draws = SLOT.unpack_from(self.map, offset)
+        else:
+            if self.count + 1 > self.capacity * MAX_LOAD:
+                self._grow()
+                offset, _ = self._find(*key)
+            games = wins = losses = draws = 0
+            self.count += 1
+        games += 1
+        if result == WIN:
+            wins += 1
+        elif result == LOSS:
+            losses += 1
+        else:
+            draws += 1
+        SLOT.pack_into(self.map, offset, key[0], key[1], games, wins, losses, draws)
+
+    def _grow(self):
+        """2倍のスロット数の表に入れ直して置き換える"""
+        tmp_path = self.path + ".tmp"
+        _create(tmp_path, self.capacity * 2)
+        with PositionIndex(tmp_path, writable=True) as bigger:
+            data = self.map
+            for index in range(self.capacity):
+                offset = HEADER.size + index * SLOT.size
+                slot = SLOT.unpack_from(data, offset)
+                if slot[0] or slot[1]:
+                    new_offset, _ = bigger._find(slot[0], slot[1])
+                    SLOT.pack_into(bigger.map, new_offset, *slot)
+            bigger.count = self.count
+        self.close()
+        os.replace(tmp_path, self.path)
+        self._open()
+
+    def items(self):
+        """記録されている (代表局面の own, opp, 対局数, 勝ち, 負け, 引き分け) を順に返す"""
+        data = self.map
+        for index in range(self.capacity):
+            slot = SLOT.unpack_from(data, HEADER.size + index * SLOT.size)
+            if slot[0] or slot[1]:
+                yield slot
+
+
+def _create(path, capacity):
+    """空の索引ファイルを作る"""
+    if capacity & (capacity - 1):
+        raise ValueError("スロット数は2のべき乗にしてください")
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, capacity, 0))
+        f.truncate(HEADER.size + capacity * SLOT.size)
+
+
+def index_game(index, moves, margin, plies=DEFAULT_PLIES):
+    """
+    対局の先頭 plies 手の局面（着手前）を索引に加える。
+
+    Args:
+        index (PositionIndex): 書き込む索引
+        moves (list): 着手（ビット番号のリスト）
+        margin (int): 黒から見た最終石数差
+        plies (int): 加える手数
+
+    Returns:
+        int: 加えた局面数
+    """
+    added = 0
+    for own, opp, _, black_to_move in replay(moves[:plies]):
+        side_margin = margin if black_to_move else -margin
+        index.add(own, opp, WIN if side_margin > 0 else LOSS if side_margin < 0 else DRAW)
+        added += 1
+    return added
+
+
+def build(index, paths, plies=DEFAULT_PLIES):
+    """
+    棋譜ストアや棋譜ファイルの対局を索引に加える（analyze.py と同じ読み込みの流れを使う）。
+
+    Returns:
+        tuple: (対局数, 加えた局面数, 再生できなかった対局数)
+    """
+    stats = GameStats()
+    games = positions = 0
+    for shard in plan_shards(paths):
+        for game in replay_games(decode_games(read_shard(shard)), stats):
+            positions += index_game(index, game["moves"],
+                                    game["black_score"] - game["white_score"], plies)
+            games += 1
+    return games, positions, stats.invalid
+
+
+def format_entry(entry):
+    """記録を1行で表示する"""
+    if entry is None:
+        return "games: 0"
+    games = entry["games"]
+    return (f"games: {games}  win: {entry['wins'] / games:.1%}  "
+            f"loss: {entry['losses'] / games:.1%}  draw: {entry['draws'] / games:.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="対称な局面をまとめた局面索引の作成と検索")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = sub.add_parser("build", help="棋譜ストアや棋譜ファイルから索引を作る（追記）")
+    build_parser.add_argument("inputs", nargs="+", help="棋譜ストアのディレクトリか棋譜ファイル")
+    build_parser.add_argument("-o", "--output", required=True, help="索引ファイル")
+    build_parser.add_argument("--plies", type=int, default=DEFAULT_PLIES, help="各対局から加える手数")
+
+    query = sub.add_parser("query", help="初期局面から着手を進めた局面と、その合法手の先の局面を表示")
+    query.add_argument("index", help="索引ファイル")
+    query.add_argument("moves", nargs="?", default="", help="着手（例: f5d6）")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        with PositionIndex(args.output, writable=True) as index:
+            before = len(index)
+            games, positions, invalid = build(index, args.inputs, args.plies)
+            print(f"games: {games}  invalid: {invalid}  positions: {positions}  "
+                  f"new unique: {len(index) - before}  total unique: {len(index)}")
+
+    elif args.command == "query":
+        own, opp = INITIAL_BLACK, INITIAL_WHITE
+        try:
+            for p_own, p_opp, sq, _ in replay(parse_moves(args.moves)):
+                own, opp = make_move(p_own, p_opp, sq)
+        except ValueError as e:
+            parser.error(str(e))
+        # 索引の局面は打つ側から見たものなので、パスなら相手の手番として引く
+        own, opp, passed = side_to_move(own, opp)
+        with PositionIndex(args.index) as index:
+            print(f"position: {format_entry(index.lookup(own, opp))}{'  (pass)' if passed else ''}")
+            for sq in iter_squares(legal_moves(own, opp)):
+                child_own, child_opp, child_passed = side_to_move(*make_move(own, opp, sq))
+                entry = index.lookup(child_own, child_opp)
+                # 着手後が相手の手番なら、勝ち負けを入れ替えて手番側から見た値にする
+                if entry is not None and not child_passed:
+                    entry = dict(entry, wins=entry["losses"], losses=entry["wins"])
+                print(f"  {square_name(sq)}  {format_entry(entry)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+文字列の描画結果とフォントのキャッシュ
+
+font.render はフォントのラスタライズを毎回行うので重い。
+同じフォント, 文字列, 色の組み合わせで描いたサーフェスを上限付きの LRU で使い回す。
+返すサーフェスは共有されるので、呼び出し側で書き換えないこと。
+"""
+
+from collections import OrderedDict
+
+import pygame
+
+# キャッシュするサーフェスの数の既定値
+DEFAULT_MAX_ENTRIES = 256
+
+
+class TextCache:
+    """
+    font.render の結果の LRU キャッシュ。
+
+    Args:
+        max_entries (int): 保持するサーフェスの最大数
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, antialias, color, background=None):
+        """
+        font.render(text, antialias, color, background) と同じサーフェスを返す。
+
+        Args:
+            font (pygame.font.Font): フォント
+            text (str): 文字列
+            antialias (bool): アンチエイリアスを使うか
+            color: 文字の色（タプル, pygame.Color, 色の名前）
+            background: 背景色（省略時は透明）
+        """
+        key = (font, text, antialias, _color_key(color),
+               None if background is None else _color_key(background))
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, antialias, color, background)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def stats(self):
+        """ヒット数, ミス数, 保持数"""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.surfaces)}
+
+    def clear(self):
+        """保持しているサーフェスを捨てる（フォントを作り直したときなど）"""
+        self.surfaces.clear()
+
+
+def _color_key(color):
+    """色をキーに使える形にする（pygame.Color はハッシュできない）"""
+    if isinstance(color, tuple):
+        return color
+    return tuple(pygame.Color(color))
+
+
+# プロセス内で共有するキャッシュ
+default_cache = TextCache()
+
+# (名前, サイズ, SysFont か) -> フォント
+_fonts = {}
+
+
+def render_text(font, text, antialias, color, background=None):
+    """共有のキャッシュを使って文字列を描く"""
+    return default_cache.render(font, text, antialias, color, background)
+
+
+def get_font(name, size, sysfont=True):
+    """
+    フォントを作って使い回す（SysFont はフォントの検索を伴うので毎回作らない）。
+
+    Args:
+        name (str): SysFont ならフォント名, そうでなければファイルのパス（None で既定のフォント）
+        size (int): サイズ
+        sysfont (bool): pygame.font.SysFont で作るか
+    """
+    key = (name, size, sysfont)
+    font = _fonts.get(key)
+    if font is None:
+        font = pygame.font.SysFont(name, size) if sysfont else pygame.font.Font(name, size)
+        _fonts[key] = font
+    return font
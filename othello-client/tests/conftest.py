@@ -0,0 +1,7 @@
+import os
+import sys
+
+# src 以下のモジュールを import できるようにする（pygame は画面なしで使う）
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,29 @@
+import arena
+
+
+def test_same_spec_gets_one_player_per_colour():
+    arena._players.clear()
+    black = arena._get_player("greedy", 0, 1)
+    white = arena._get_player("greedy", 1, 1)
+    assert black is not white
+    assert arena._get_player("greedy", 0, 2) is black
+
+
+def test_game_depends_only_on_its_seed():
+    arena._players.clear()
+    first = arena.play_game(0, "greedy", "greedy", [], 5)
+    arena.play_game(1, "greedy", "random", [], 6)
+    again = arena.play_game(2, "greedy", "greedy", [], 5)
+    assert first["moves"] == again["moves"]
+
+
+def test_reused_player_starts_each_game_with_empty_tables():
+    arena._players.clear()
+    arena.play_game(0, "alphabeta:0.01", "random", [], 1)
+    player = arena._players[("alphabeta:0.01", 0)]
+    assert any(player.tt.entries) and player.last_info is not None
+    assert arena._get_player("alphabeta:0.01", 0, 2) is player
+    assert not any(player.tt.entries)
+    assert player.tt.generation == 0
+    assert not player.solver.tt
+    assert player.last_info is None
@@ -0,0 +1,96 @@
+import random
+
+import othello
+import othello2
+from bitboard import GAME_OVER, PASS, PLAYING, find_moves, iter_moves
+
+DIRECTIONS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+
+def reference_count(turn, row, col, board):
+    """othello.py の元の実装と同じく8方向を走査して返せる石の数を数える"""
+    if board[row][col] != othello.NO_STONE:
+        return 0
+    return sum(othello.count_flip_stone(turn, row, col, d_row, d_col, board)
+               for d_row, d_col in DIRECTIONS)
+
+
+def reference_flip(turn, row, col, board):
+    """othello.py の元の flip（返せる方向だけ返す）"""
+    for d_row, d_col in DIRECTIONS:
+        if othello.count_flip_stone(turn, row, col, d_row, d_col, board):
+            othello.flip_stone(turn, row, col, d_row, d_col, board)
+    board[row][col] = turn
+
+
+def reference_moves(turn, board):
+    return [(r, c) for r in range(8) for c in range(8) if reference_count(turn, r, c, board) > 0]
+
+
+def to_othello2(board):
+    return [["EMPTY" if cell == othello.NO_STONE else cell for cell in row] for row in board]
+
+
+def random_games(count, seed=1):
+    """乱数で打った対局の (bitboard で進めた盤面, 元の走査で進めた盤面, 手番) を着手ごとに返す"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        board = othello.initialize_board()
+        reference = [row[:] for row in board]
+        turn = othello.BLACK
+        passed = False
+        while True:
+            yield board, reference, turn
+            moves = reference_moves(turn, reference)
+            if moves:
+                row, col = rng.choice(moves)
+                othello.flip(turn, row, col, board)
+                reference_flip(turn, row, col, reference)
+                passed = False
+            elif passed:
+                break
+            else:
+                passed = True
+            turn = othello.WHITE if turn == othello.BLACK else othello.BLACK
+
+
+def test_othello_adapter_matches_reference_scan():
+    for board, reference, turn in random_games(20):
+        assert board == reference
+        for row in range(8):
+            for col in range(8):
+                expected = reference_count(turn, row, col, reference)
+                assert othello.check_position(turn, row, col, board) == expected
+
+
+def test_othello2_adapter_matches_reference_scan():
+    rng = random.Random(2)
+    for _, reference, turn in random_games(10, seed=3):
+        board = to_othello2(reference)
+        for row in range(8):
+            for col in range(8):
+                legal = reference_count(turn, row, col, reference) > 0
+                assert othello2.can_place_stone(board, row, col, turn) == legal
+        moves = reference_moves(turn, reference)
+        if moves:
+            row, col = rng.choice(moves)
+            assert othello2.place_stone(board, row, col, turn)
+            reference_flip(turn, row, col, reference)
+            assert board == to_othello2(reference)
+        else:
+            assert not othello2.place_stone(board, 0, 0, turn)
+
+
+def test_find_moves_matches_reference_scan():
+    seen = set()
+    for board, reference, turn in random_games(20, seed=4):
+        moves, status = find_moves(board, turn, othello.NO_STONE)
+        expected = reference_moves(turn, reference)
+        assert list(iter_moves(moves)) == expected
+        if expected:
+            assert status == PLAYING
+        else:
+            other = othello.WHITE if turn == othello.BLACK else othello.BLACK
+            assert status == (PASS if reference_moves(other, reference) else GAME_OVER)
+        seen.add(status)
+    assert seen == {PLAYING, PASS, GAME_OVER}
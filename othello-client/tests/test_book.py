@@ -0,0 +1,39 @@
+from bitboard import (
+    INITIAL_BLACK,
+    INITIAL_WHITE,
+    SYMMETRY_SQUARES,
+    make_move,
+    parse_square,
+)
+from book import BookBuilder, OpeningBook, position_key
+
+
+def build_book(tmp_path, results):
+    """f5 の後の局面で、白の手ごとに (対局数, 平均石数差) を記録した定石ファイルを作る"""
+    own, opp = make_move(INITIAL_BLACK, INITIAL_WHITE, parse_square("f5"))
+    key, sym = position_key(own, opp)
+    builder = BookBuilder()
+    for name, (games, score) in results.items():
+        builder.stats[(key, SYMMETRY_SQUARES[sym][parse_square(name)])] = [games, games * score]
+    path = str(tmp_path / "book.bin")
+    builder.write(path)
+    return OpeningBook(path), own, opp
+
+
+def test_single_game_does_not_decide_the_move(tmp_path):
+    book, own, opp = build_book(tmp_path, {"d6": (1, 40), "f4": (10, 10)})
+    with book:
+        assert book.best_move(own, opp) == parse_square("f4")
+
+
+def test_fewer_games_are_discounted(tmp_path):
+    book, own, opp = build_book(tmp_path, {"d6": (6, 22), "f6": (100, 18)})
+    with book:
+        assert book.best_move(own, opp) == parse_square("f6")
+        assert book.best_move(own, opp, min_games=200) is None
+
+
+def test_unknown_position_has_no_move(tmp_path):
+    book, _, _ = build_book(tmp_path, {"d6": (10, 5)})
+    with book:
+        assert book.best_move(INITIAL_BLACK, INITIAL_WHITE) is None
@@ -0,0 +1,78 @@
+import threading
+import time
+
+from client import ReversiClient
+from test_client_base import RecordingSocket, initial_board
+
+
+class BlockingPlayer:
+    """release されるまで手を返さないプレイヤー"""
+
+    def __init__(self, move):
+        self.move = move
+        self.release = threading.Event()
+        self.calls = 0
+
+    def choose_move(self, board, turn, empty):
+        self.calls += 1
+        self.release.wait(5)
+        return self.move
+
+    def close(self):
+        pass
+
+
+def make_client(player):
+    client = ReversiClient(auto_player=player, binary_frames=False)
+    client.socket = RecordingSocket()
+    client.connected = True
+    client.process_message({"type": "player_assigned", "player_number": 0})
+    client.process_message({"type": "game_start"})
+    client.process_message({"board": initial_board(), "current_turn": 0, "winner": -1})
+    return client
+
+
+def wait_search(client):
+    _, future = client.auto_search
+    future.result(5)
+
+
+def test_search_runs_without_blocking_update():
+    player = BlockingPlayer((2, 3))
+    client = make_client(player)
+    try:
+        start = time.perf_counter()
+        client.play_auto_move()
+        client.play_auto_move()
+        assert time.perf_counter() - start < 1
+        assert client.socket.sent == []
+
+        player.release.set()
+        wait_search(client)
+        client.play_auto_move()
+        assert client.socket.sent == [{"row": 2, "col": 3}]
+        assert player.calls == 1
+
+        # 送った局面では探索し直さない
+        client.play_auto_move()
+        assert client.auto_search is None
+    finally:
+        client.cleanup()
+
+
+def test_move_for_a_stale_position_is_discarded():
+    player = BlockingPlayer((2, 3))
+    client = make_client(player)
+    try:
+        client.play_auto_move()
+        # 探索中に相手の手番の盤面が届いた
+        board = initial_board()
+        board[2][3] = board[3][3] = 1
+        client.process_message({"board": board, "current_turn": 1, "winner": -1})
+        player.release.set()
+        wait_search(client)
+        client.play_auto_move()
+        assert client.socket.sent == []
+        assert client.auto_search is None
+    finally:
+        client.cleanup()
@@ -0,0 +1,127 @@
+import json
+
+from bitboard import INITIAL_BLACK, INITIAL_WHITE
+from client_base import BaseReversiClient
+from framing import board_hash, decode_frame, encode_move_frame, encode_snapshot_frame
+
+
+class FixedPlayer:
+    """決まった手を返し、呼ばれた回数を数えるプレイヤー"""
+
+    def __init__(self, move):
+        self.move = move
+        self.calls = 0
+
+    def choose_move(self, board, turn, empty):
+        self.calls += 1
+        return self.move
+
+
+class RecordingSocket:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, data):
+        self.sent.append(json.loads(data))
+
+
+def initial_board():
+    board = [[0] * 8 for _ in range(8)]
+    board[3][3] = board[4][4] = 2
+    board[3][4] = board[4][3] = 1
+    return board
+
+
+def make_client(move):
+    client = BaseReversiClient(auto_player=FixedPlayer(move), binary_frames=False)
+    client.socket = RecordingSocket()
+    client.connected = True
+    client.process_message({"type": "player_assigned", "player_number": 0})
+    client.process_message({"type": "game_start"})
+    client.process_message({"board": initial_board(), "current_turn": 0, "winner": -1})
+    return client
+
+
+def test_auto_move_is_sent_once_per_position():
+    client = make_client((2, 3))
+    client.play_auto_move()
+    client.play_auto_move()
+    assert client.auto_player.calls == 1
+    assert client.socket.sent == [{"row": 2, "col": 3}]
+
+
+def test_server_error_lets_the_bot_search_again():
+    client = make_client((2, 3))
+    client.play_auto_move()
+    client.process_message({"error": "Not your turn"})
+    assert client.auto_move_position is None
+    client.play_auto_move()
+    assert client.auto_player.calls == 2
+    assert client.socket.sent == [{"row": 2, "col": 3}, {"row": 2, "col": 3}]
+
+
+def test_error_after_provisional_move_rolls_back_and_searches_again():
+    client = make_client((2, 3))
+    client.optimistic_moves = True
+    client.play_auto_move()
+    assert client.current_turn == 1
+    client.process_message({"error": "Invalid move"})
+    assert client.current_turn == 0
+    assert client.board == initial_board()
+    client.play_auto_move()
+    assert client.auto_player.calls == 2
+
+
+def test_locally_rejected_move_is_not_remembered():
+    client = make_client((0, 0))
+    client.play_auto_move()
+    assert client.socket.sent == []
+    assert client.auto_move_position is None
+    client.play_auto_move()
+    assert client.auto_player.calls == 2
+
+
+def delta(seq, move=(2, 3), hash_value=None):
+    """黒が d3 に打った着手フレームの辞書"""
+    if hash_value is None:
+        hash_value = board_hash(INITIAL_BLACK | 1 << 19 | 1 << 27, INITIAL_WHITE & ~(1 << 27))
+    return decode_frame(encode_move_frame(seq, move, 1, 1, -1, hash_value))
+
+
+def snapshot(seq):
+    return decode_frame(encode_snapshot_frame(seq, INITIAL_BLACK, INITIAL_WHITE, 0, -1))
+
+
+def test_delta_is_applied_in_sequence():
+    client = make_client((2, 3))
+    client.process_message(snapshot(5))
+    client.process_message(delta(6))
+    assert client.seq == 6
+    assert client.current_turn == 1
+    assert client.board[2][3] == client.board[3][3] == 1
+    assert client.socket.sent == []
+
+
+def test_sequence_gap_requests_one_snapshot_and_resyncs():
+    client = make_client((2, 3))
+    client.process_message(snapshot(5))
+    client.process_message(delta(7))
+    client.process_message(delta(8))
+    assert client.socket.sent == [{"snapshot": 1}]
+    assert client.board == initial_board()
+    assert client.current_turn == 0
+
+    client.process_message(snapshot(7))
+    assert client.snapshot_requested is False
+    client.process_message(delta(8))
+    assert client.seq == 8
+    assert client.board[2][3] == 1
+
+
+def test_hash_mismatch_requests_snapshot():
+    client = make_client((2, 3))
+    client.process_message(snapshot(5))
+    client.process_message(delta(6, hash_value=0))
+    assert client.socket.sent == [{"snapshot": 1}]
+    assert client.seq is None
+    assert client.board == initial_board()
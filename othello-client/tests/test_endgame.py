@@ -0,0 +1,73 @@
+import random
+import time
+
+import pytest
+
+from bitboard import INITIAL_BLACK, INITIAL_WHITE, flips, iter_squares, legal_moves
+from endgame import EndgameSolver, SolveTimeout, empties_for_time
+
+
+def play_random(empties, seed):
+    """初期局面から空きマスが empties 個になるまで乱数で打った局面（手番側の合法手あり）"""
+    rng = random.Random(seed)
+    while True:
+        own, opp = INITIAL_BLACK, INITIAL_WHITE
+        while 64 - (own | opp).bit_count() > empties:
+            moves = legal_moves(own, opp)
+            if not moves:
+                own, opp = opp, own
+                moves = legal_moves(own, opp)
+                if not moves:
+                    break
+            sq = rng.choice(list(iter_squares(moves)))
+            f = flips(own, opp, sq)
+            own, opp = opp ^ f, own | f | (1 << sq)
+        if 64 - (own | opp).bit_count() == empties and legal_moves(own, opp):
+            return own, opp
+
+
+def brute_force(own, opp, passed=False):
+    """枝刈りなしの negamax による最終石数差"""
+    moves = legal_moves(own, opp)
+    if not moves:
+        if passed:
+            return own.bit_count() - opp.bit_count()
+        return -brute_force(opp, own, True)
+    best = -65
+    for sq in iter_squares(moves):
+        f = flips(own, opp, sq)
+        best = max(best, -brute_force(opp ^ f, own | f | (1 << sq)))
+    return best
+
+
+@pytest.mark.parametrize("empties", [1, 2, 3, 5, 7, 8, 9])
+def test_solver_matches_brute_force(empties):
+    solver = EndgameSolver()
+    for seed in range(6):
+        own, opp = play_random(empties, seed)
+        score, move = solver.solve(own, opp)
+        assert score == brute_force(own, opp)
+        f = flips(own, opp, move)
+        assert f
+        assert -brute_force(opp ^ f, own | f | (1 << move)) == score
+
+
+@pytest.mark.parametrize("empties", [3, 4])
+def test_last_squares_match_brute_force(empties):
+    # 残り2マスの処理（パスと、どちらも打てない場合を含む）を多くの局面で確かめる
+    solver = EndgameSolver()
+    for seed in range(300):
+        own, opp = play_random(empties, seed)
+        assert solver.solve(own, opp)[0] == brute_force(own, opp)
+
+
+def test_solver_raises_after_deadline():
+    own, opp = play_random(18, 0)
+    with pytest.raises(SolveTimeout):
+        EndgameSolver().solve(own, opp, deadline=time.perf_counter())
+
+
+def test_empties_for_time_grows_with_budget():
+    assert empties_for_time(0.0) == 10
+    assert empties_for_time(1.0) == 14
+    assert empties_for_time(60.0) == 16
@@ -0,0 +1,104 @@
+import json
+
+import pytest
+
+from bitboard import INITIAL_BLACK, INITIAL_WHITE
+from framing import (
+    FrameDecoder,
+    board_hash,
+    decode_frame,
+    encode_board_frame,
+    encode_move_frame,
+    encode_snapshot_frame,
+)
+
+# 黒が d3 (2, 3) に打った後の盤面
+BLACK_AFTER = INITIAL_BLACK | 1 << 19 | 1 << 27
+WHITE_AFTER = INITIAL_WHITE & ~(1 << 27)
+
+
+def test_board_frame_round_trip():
+    message = decode_frame(encode_board_frame(BLACK_AFTER, WHITE_AFTER, 1, -1, (2, 3)))
+    assert message["black"] == BLACK_AFTER
+    assert message["white"] == WHITE_AFTER
+    assert message["current_turn"] == 1
+    assert message["winner"] == -1
+    assert tuple(message["move"]) == (2, 3)
+    assert message["board"][2][3] == 1
+    assert message["board"][3][3] == 1
+    assert message["board"][4][4] == 2
+    assert sum(row.count(0) for row in message["board"]) == 59
+    assert decode_frame(encode_board_frame(INITIAL_BLACK, INITIAL_WHITE, 0, -1))["move"] is None
+
+
+def test_snapshot_and_move_frames_round_trip():
+    snapshot = decode_frame(encode_snapshot_frame(41, INITIAL_BLACK, INITIAL_WHITE, 0, -1))
+    assert snapshot["seq"] == 41
+    assert snapshot["black"] == INITIAL_BLACK and snapshot["white"] == INITIAL_WHITE
+
+    hash_value = board_hash(BLACK_AFTER, WHITE_AFTER)
+    delta = decode_frame(encode_move_frame(42, (2, 3), 1, 1, -1, hash_value))
+    assert delta == {"delta": True, "seq": 42, "move": (2, 3), "color": 1,
+                     "current_turn": 1, "winner": -1, "hash": hash_value}
+
+
+def test_invalid_frames_are_rejected():
+    frame = encode_board_frame(INITIAL_BLACK, INITIAL_WHITE, 0, -1)
+    with pytest.raises(ValueError):
+        decode_frame(frame[:-1])
+    with pytest.raises(ValueError):
+        decode_frame(encode_board_frame(INITIAL_BLACK, INITIAL_BLACK, 0, -1))
+    bad_kind = bytearray(frame)
+    bad_kind[2] = 9
+    with pytest.raises(ValueError):
+        decode_frame(bytes(bad_kind))
+
+
+def stream():
+    """JSON とバイナリフレームが混ざった受信データと、取り出されるはずのメッセージ"""
+    messages = [
+        {"type": "player_assigned", "player_number": 0, "binary": 1, "delta": 1},
+        {"type": "chat", "text": "括弧 {} と \"引用符\" \\ を含む"},
+    ]
+    data = b"".join(json.dumps(m, ensure_ascii=False).encode("utf-8") for m in messages)
+    data += b"\n"
+    data += encode_snapshot_frame(1, INITIAL_BLACK, INITIAL_WHITE, 0, -1)
+    data += encode_move_frame(2, (2, 3), 1, 1, -1, board_hash(BLACK_AFTER, WHITE_AFTER))
+    data += json.dumps({"type": "game_over", "winner": 0}).encode("utf-8")
+    return data, messages
+
+
+def check_messages(decoded, messages):
+    assert len(decoded) == 5
+    assert decoded[:2] == messages
+    assert decoded[2]["seq"] == 1
+    assert decoded[3]["delta"] and decoded[3]["seq"] == 2
+    assert decoded[4] == {"type": "game_over", "winner": 0}
+
+
+def test_decoder_reads_concatenated_messages():
+    data, messages = stream()
+    decoder = FrameDecoder()
+    check_messages(decoder.feed(data), messages)
+    assert decoder.pending() == 0
+    assert decoder.invalid == 0
+
+
+@pytest.mark.parametrize("chunk", [1, 2, 3, 7, 16])
+def test_decoder_reads_split_messages(chunk):
+    data, messages = stream()
+    decoder = FrameDecoder()
+    decoded = []
+    for i in range(0, len(data), chunk):
+        decoded += decoder.feed(data[i:i + chunk])
+    check_messages(decoded, messages)
+    assert decoder.pending() == 0
+
+
+def test_decoder_skips_invalid_messages():
+    decoder = FrameDecoder()
+    bad_frame = bytearray(encode_board_frame(INITIAL_BLACK, INITIAL_WHITE, 0, -1))
+    bad_frame[2] = 9
+    decoded = decoder.feed(b'{"a": }' + bytes(bad_frame) + b'{"b": 1}')
+    assert decoded == [{"b": 1}]
+    assert decoder.invalid == 2
@@ -0,0 +1,53 @@
+import os
+
+from bitboard import parse_moves
+from gamestore import OFFSET, SEGMENT_HEADER, GameStore, GameWriter, segment_paths
+
+GAMES = [
+    parse_moves("f5d6c3d3c4"),
+    parse_moves("f5f6e6f4"),
+    parse_moves("c4e3f6e6f5"),
+]
+
+
+def write_games(directory, games, segment_games=2):
+    with GameWriter(directory, segment_games=segment_games) as writer:
+        return [writer.append(moves, "black", "white", 10, 5, played_at=0) for moves in games]
+
+
+def test_round_trip_across_segments(tmp_path):
+    assert write_games(tmp_path, GAMES) == [0, 1, 2]
+    with GameStore(tmp_path) as store:
+        assert len(store) == 3
+        assert [game["moves"] for game in store] == GAMES
+        assert store[-1]["id"] == 2
+        assert store[2]["black"] == "black"
+
+
+def test_torn_index_entry_is_ignored_and_repaired(tmp_path):
+    write_games(tmp_path, GAMES)
+    # 索引への追記の途中で止まった状態（位置の一部だけが書かれている）
+    index_path = segment_paths(tmp_path, 1)[1]
+    with open(index_path, "ab") as f:
+        f.write(b"\x07\x00")
+    with GameStore(tmp_path) as store:
+        assert len(store) == 3
+        assert store[2]["moves"] == GAMES[2]
+
+    assert write_games(tmp_path, GAMES[:1]) == [3]
+    assert os.path.getsize(index_path) == SEGMENT_HEADER.size + 2 * OFFSET.size
+    with GameStore(tmp_path) as store:
+        assert len(store) == 4
+        assert [game["moves"] for game in store] == GAMES + GAMES[:1]
+
+
+def test_torn_index_header_is_rewritten(tmp_path):
+    write_games(tmp_path, GAMES[:2])
+    # 新しいセグメントの索引ヘッダを書いている途中で止まった
+    index_path = segment_paths(tmp_path, 1)[1]
+    with open(index_path, "wb") as f:
+        f.write(b"OTG")
+    assert write_games(tmp_path, GAMES[2:]) == [2]
+    with GameStore(tmp_path) as store:
+        assert len(store) == 3
+        assert store[2]["moves"] == GAMES[2]
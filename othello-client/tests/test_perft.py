@@ -0,0 +1,41 @@
+import random
+
+import pytest
+
+from bitboard import board_to_bits
+from perft import BACKENDS, REFERENCE, BitboardBackend, ScanBackend, divide, perft
+
+
+@pytest.mark.parametrize("name", sorted(BACKENDS))
+def test_perft_matches_reference(name):
+    backend = BACKENDS[name]()
+    for depth in range(1, 6):
+        assert perft(backend, backend.initial(), depth) == REFERENCE[depth]
+
+
+def test_bitboard_divide_matches_scan():
+    assert divide(BitboardBackend(), 5) == divide(ScanBackend(), 5)
+
+
+def test_bitboard_matches_scan_along_random_games():
+    bits, scan = BitboardBackend(), ScanBackend()
+    rng = random.Random(1)
+    for _ in range(30):
+        b_pos, s_pos = bits.initial(), scan.initial()
+        passed = False
+        while True:
+            board, turn = s_pos
+            assert b_pos == board_to_bits(board, turn, scan.empty)
+            b_moves = [bits.move_name(move) for move in bits.moves(b_pos)]
+            s_moves = scan.moves(s_pos)
+            assert b_moves == [scan.move_name(move) for move in s_moves]
+            if not s_moves:
+                if passed:
+                    break
+                b_pos, s_pos = bits.pass_turn(b_pos), scan.pass_turn(s_pos)
+                passed = True
+                continue
+            passed = False
+            index = rng.randrange(len(s_moves))
+            b_pos = bits.play(b_pos, bits.moves(b_pos)[index])
+            s_pos = scan.play(s_pos, s_moves[index])
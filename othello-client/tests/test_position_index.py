@@ -0,0 +1,109 @@
+import random
+import sys
+
+import position_index
+from bitboard import (
+    INITIAL_BLACK,
+    INITIAL_WHITE,
+    final_position,
+    flips,
+    iter_squares,
+    legal_moves,
+    square_name,
+    transform,
+)
+from position_index import DRAW, LOSS, WIN, PositionIndex, canonical_key, index_game
+
+
+def random_positions(count, seed=1):
+    """乱数で打った対局の局面 (own, opp)"""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        own, opp = INITIAL_BLACK, INITIAL_WHITE
+        for _ in range(rng.randrange(1, 30)):
+            moves = legal_moves(own, opp)
+            if not moves:
+                break
+            sq = rng.choice(list(iter_squares(moves)))
+            f = flips(own, opp, sq)
+            own, opp = opp ^ f, own | f | (1 << sq)
+            positions.append((own, opp))
+    return positions[:count]
+
+
+def test_grow_keeps_every_position(tmp_path):
+    path = str(tmp_path / "positions.idx")
+    rng = random.Random(2)
+    expected = {}
+    with PositionIndex(path, writable=True, capacity=8) as index:
+        for own, opp in random_positions(600):
+            result = rng.choice((WIN, LOSS, DRAW))
+            index.add(own, opp, result)
+            counts = expected.setdefault(canonical_key(own, opp), [0, 0, 0, 0])
+            counts[0] += 1
+            counts[{WIN: 1, LOSS: 2, DRAW: 3}[result]] += 1
+        assert index.capacity > 8
+        assert len(index) == len(expected)
+
+    with PositionIndex(path) as index:
+        assert len(index) == len(expected)
+        assert {(own, opp): list(counts) for own, opp, *counts in index.items()} == expected
+        for (own, opp), (games, wins, losses, draws) in expected.items():
+            assert index.lookup(own, opp) == {"games": games, "wins": wins,
+                                              "losses": losses, "draws": draws}
+
+
+def test_symmetric_positions_share_an_entry(tmp_path):
+    path = str(tmp_path / "positions.idx")
+    own, opp = random_positions(1, seed=3)[0]
+    with PositionIndex(path, writable=True) as index:
+        for sym in range(8):
+            index.add(transform(own, sym), transform(opp, sym), WIN)
+        assert len(index) == 1
+        for sym in range(8):
+            assert index.lookup(transform(own, sym), transform(opp, sym))["wins"] == 8
+        assert index.lookup(opp, own) is None
+
+
+def game_with_pass(seed=0):
+    """途中でパスがある対局の (着手, 最初のパスの直前までの手数, 黒から見た石数差)"""
+    rng = random.Random(seed)
+    while True:
+        own, opp = INITIAL_BLACK, INITIAL_WHITE
+        moves = []
+        pass_at = None
+        while True:
+            legal = legal_moves(own, opp)
+            if not legal:
+                if not legal_moves(opp, own):
+                    break
+                if pass_at is None:
+                    pass_at = len(moves)
+                own, opp = opp, own
+                continue
+            sq = rng.choice(list(iter_squares(legal)))
+            moves.append(sq)
+            f = flips(own, opp, sq)
+            own, opp = opp ^ f, own | f | (1 << sq)
+        if pass_at is not None:
+            black, white = final_position(moves)
+            return moves, pass_at, black.bit_count() - white.bit_count()
+        seed += 1
+        rng = random.Random(seed)
+
+
+def test_query_after_a_pass_looks_up_the_side_to_move(tmp_path, monkeypatch, capsys):
+    moves, pass_at, margin = game_with_pass()
+    path = str(tmp_path / "positions.idx")
+    with PositionIndex(path, writable=True) as index:
+        index_game(index, moves, margin, plies=60)
+
+    text = "".join(square_name(sq) for sq in moves[:pass_at])
+    monkeypatch.setattr(sys, "argv", ["position_index.py", "query", path, text])
+    position_index.main()
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].startswith("position: games: 1") and lines[0].endswith("(pass)")
+    # パスした側が実際に打った手が、索引にある子の局面として表示される
+    played = [line for line in lines[1:] if line.split()[0] == square_name(moves[pass_at])]
+    assert played and "games: 1" in played[0]
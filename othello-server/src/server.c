@@ -19,6 +19,19 @@
 #define SERVER_PORT 10000
 #define DEBUG 1  // デバッグモード (1: 有効, 0: 無効)
 
+/* バイナリフレーム: マーカー, ペイロード長, 種類, 以降は種類ごと
+ *   盤面          : 黒(u64), 白(u64), 手番, 勝者, 直前の手
+ *   着手          : 通し番号(u32), 手, 打った石, 次の手番, 勝者, 盤面ハッシュ(u32)
+ *   スナップショット: 通し番号(u32), 以降は盤面と同じ */
+#define BINARY_MARKER       0xB0
+#define FRAME_BOARD         1
+#define FRAME_MOVE          2
+#define FRAME_SNAPSHOT      3
+#define BOARD_FRAME_SIZE    22
+#define MOVE_FRAME_SIZE     15
+#define SNAPSHOT_FRAME_SIZE 26
+#define NO_MOVE             0xFF
+
 /* ---- 型定義 ---- */
 typedef enum { EMPTY, BLACK, WHITE } Cell;
 
@@ -26,12 +39,16 @@ typedef struct {
     Cell cells[BOARD_SIZE][BOARD_SIZE];
     int  current_turn;   /* 0: BLACK, 1: WHITE */
     int  winner;         /* -1: none, 0: BLACK, 1: WHITE */
+    int  last_move;      /* 直前の手 (row*8+col), -1: none */
+    unsigned int seq;    /* 対局開始からの着手数 */
 } GameState;
 
 typedef struct {
     int  socket;
     int  is_player;
     int  player_number;  /* 0: BLACK, 1: WHITE, -1: spectator */
+    int  binary;         /* 1: 盤面をバイナリフレームで送る */
+    int  delta;          /* 1: 盤面の代わりに着手フレームを送る */
 } Client;
 
 typedef struct {
@@ -153,7 +170,7 @@ static void init_game_state(GameState *s){
         for(int j=0;j<BOARD_SIZE;j++) s->cells[i][j]=EMPTY;
     s->cells[3][3]=WHITE; s->cells[3][4]=BLACK;
     s->cells[4][3]=BLACK; s->cells[4][4]=WHITE;
-    s->current_turn=0; s->winner=-1;
+    s->current_turn=0; s->winner=-1; s->last_move=-1; s->seq=0;
 }
 
 static int can_flip_dir(GameState *s,int r,int c,int dr,int dc){
@@ -186,6 +203,8 @@ static void flip_dir(GameState *s,int r,int c,int dr,int dc){
 
 static void make_move(GameState *s,int r,int c){
     s->cells[r][c]= s->current_turn==0?BLACK:WHITE;
+    s->last_move = r*BOARD_SIZE+c;
+    s->seq++;
     for(int i=0;i<8;i++) if(can_flip_dir(s,r,c,DIRECTIONS[i][0],DIRECTIONS[i][1])) flip_dir(s,r,c,DIRECTIONS[i][0],DIRECTIONS[i][1]);
 }
 
@@ -236,6 +255,100 @@ static char *create_json_state(const GameState *s){
     return buf;
 }
 
+/* ---- バイナリフレーム ---- */
+static void put_u64(unsigned char *p, unsigned long long v){
+    for(int i=7;i>=0;i--){ p[i]=(unsigned char)(v & 0xFF); v>>=8; }
+}
+
+static void put_u32(unsigned char *p, unsigned int v){
+    for(int i=3;i>=0;i--){ p[i]=(unsigned char)(v & 0xFF); v>>=8; }
+}
+
+static void board_masks(const GameState *s, unsigned long long *black, unsigned long long *white){
+    *black=0; *white=0;
+    for(int i=0;i<BOARD_SIZE;i++)
+        for(int j=0;j<BOARD_SIZE;j++){
+            unsigned long long bit = 1ULL << (i*BOARD_SIZE+j);
+            if(s->cells[i][j]==BLACK) *black|=bit;
+            else if(s->cells[i][j]==WHITE) *white|=bit;
+        }
+}
+
+/* 着手フレームの検証用ハッシュ（クライアントの framing.board_hash と同じ計算） */
+static unsigned int board_hash(unsigned long long black, unsigned long long white){
+    return (unsigned int)((black*0x9E3779B97F4A7C15ULL ^ white*0xC2B2AE3D27D4EB4FULL) >> 32);
+}
+
+/* 黒, 白, 手番, 勝者, 直前の手 (19バイト) */
+static void put_board(const GameState *s, unsigned char *p){
+    unsigned long long black, white;
+    board_masks(s,&black,&white);
+    put_u64(p,black);
+    put_u64(p+8,white);
+    p[16]=(unsigned char)(signed char)s->current_turn;
+    p[17]=(unsigned char)(signed char)s->winner;
+    p[18]= s->last_move<0 ? NO_MOVE : (unsigned char)s->last_move;
+}
+
+static void create_binary_state(const GameState *s, unsigned char *buf){
+    buf[0]=BINARY_MARKER;
+    buf[1]=BOARD_FRAME_SIZE-2;
+    buf[2]=FRAME_BOARD;
+    put_board(s,buf+3);
+}
+
+static void create_snapshot_frame(const GameState *s, unsigned char *buf){
+    buf[0]=BINARY_MARKER;
+    buf[1]=SNAPSHOT_FRAME_SIZE-2;
+    buf[2]=FRAME_SNAPSHOT;
+    put_u32(buf+3,s->seq);
+    put_board(s,buf+7);
+}
+
+/* 直前の手の着手フレーム（last_move >= 0 のときのみ） */
+static void create_move_frame(const GameState *s, unsigned char *buf){
+    unsigned long long black, white;
+    board_masks(s,&black,&white);
+    int r=s->last_move/BOARD_SIZE, c=s->last_move%BOARD_SIZE;
+    buf[0]=BINARY_MARKER;
+    buf[1]=MOVE_FRAME_SIZE-2;
+    buf[2]=FRAME_MOVE;
+    put_u32(buf+3,s->seq);
+    buf[7]=(unsigned char)s->last_move;
+    buf[8]=(unsigned char)s->cells[r][c];
+    buf[9]=(unsigned char)(signed char)s->current_turn;
+    buf[10]=(unsigned char)(signed char)s->winner;
+    put_u32(buf+11,board_hash(black,white));
+}
+
+/* 1クライアントに現在の盤面全体を送る（対応している形式で） */
+static void send_state(const Client *c, const GameState *s){
+    if(c->delta){
+        unsigned char frame[SNAPSHOT_FRAME_SIZE];
+        create_snapshot_frame(s,frame);
+        safe_send(c->socket,frame,sizeof(frame));
+    }else if(c->binary){
+        unsigned char frame[BOARD_FRAME_SIZE];
+        create_binary_state(s,frame);
+        safe_send(c->socket,frame,sizeof(frame));
+    }else{
+        char *json = create_json_state(s);
+        if(!json) return;
+        safe_send(c->socket,json,strlen(json));
+        free(json);
+    }
+}
+
+/* json 中の "key":0/1 を読む（キーがなければ 0 を返す） */
+static int parse_json_flag(const char *json, const char *key, int *value){
+    const char *p = strstr(json, key);
+    if(!p) return 0;
+    p += strlen(key);
+    while (*p && (*p == ' ' || *p == ':')) p++;
+    *value = (*p == '1');
+    return 1;
+}
+
 static void send_error(int sock,const char *msg){
     char err[BUFFER_SIZE];
     snprintf(err,sizeof(err),"{\"error\":\"%s\"}",msg);
@@ -244,11 +357,29 @@ static void send_error(int sock,const char *msg){
 }
 
 static void broadcast_state(const GameState *s){
-    char *json = create_json_state(s);
-    if(!json) return;
-    debug_print("盤面状態ブロードキャスト: %s", json);
+    /* JSON の盤面は JSON で受け取るクライアントがいるときだけ作る */
+    char *json = NULL;
+    for(size_t i=0;i<g_clients->size;i++){
+        if(!g_clients->array[i].binary){
+            json = create_json_state(s);
+            if(!json) return;
+            break;
+        }
+    }
+    unsigned char frame[BOARD_FRAME_SIZE];
+    create_binary_state(s,frame);
+    /* 差分モードのクライアントには着手だけ（着手がなければスナップショット）を送る */
+    unsigned char delta[SNAPSHOT_FRAME_SIZE];
+    size_t delta_len;
+    if(s->last_move>=0){ create_move_frame(s,delta); delta_len=MOVE_FRAME_SIZE; }
+    else{ create_snapshot_frame(s,delta); delta_len=SNAPSHOT_FRAME_SIZE; }
+    debug_print("盤面状態ブロードキャスト: %s", json ? json : "(バイナリのみ)");
     for(size_t i=0;i<g_clients->size;){
-        if(safe_send(g_clients->array[i].socket,json,strlen(json))<0){
+        const Client *c = &g_clients->array[i];
+        ssize_t sent = c->delta ? safe_send(c->socket,delta,delta_len)
+                     : c->binary ? safe_send(c->socket,frame,sizeof(frame))
+                     : safe_send(c->socket,json,strlen(json));
+        if(sent<0){
             perror("send");
             /* 切断処理 */
             remove_client(g_clients,i);
@@ -292,6 +423,29 @@ static void handle_client_disconnect(size_t idx){
 /* ---- クライアントメッセージ ---- */
 static int process_client_message(size_t idx,const char *msg){
     Client *c = &g_clients->array[idx];
+
+    /* 受信形式の要求とスナップショット要求（観戦者も送れる） */
+    int flag, control=0;
+    if(parse_json_flag(msg, "\"binary\"", &flag)){
+        c->binary = flag;
+        debug_print("バイナリフレーム: socket=%d, 有効=%d", c->socket, c->binary);
+        control=1;
+    }
+    if(parse_json_flag(msg, "\"delta\"", &flag)){
+        c->delta = flag;
+        if(flag) c->binary = 1;
+        debug_print("着手フレーム: socket=%d, 有効=%d", c->socket, c->delta);
+        /* 以降の着手を適用する基準の盤面を送る */
+        if(flag) send_state(c,&g_state);
+        control=1;
+    }
+    if(parse_json_flag(msg, "\"snapshot\"", &flag)){
+        debug_print("スナップショット要求: socket=%d", c->socket);
+        send_state(c,&g_state);
+        control=1;
+    }
+    if(control && !strstr(msg, "\"row\"")) return 0;
+
     if(!c->is_player){
         send_error(c->socket,"あなたはプレイヤーではありません");
         return 0;
@@ -379,7 +533,7 @@ int main(void){
         if(FD_ISSET(g_server_fd,&readfds)){
             int new_sd = accept(g_server_fd,NULL,NULL);
             if(new_sd<0){ perror("accept"); continue; }
-            Client cli={.socket=new_sd,.is_player=0,.player_number=-1};
+            Client cli={.socket=new_sd,.is_player=0,.player_number=-1,.binary=0,.delta=0};
             if(!add_client(g_clients,cli)){ perror("add_client"); close(new_sd); continue; }
             size_t idx=g_clients->size-1; /* 追加した要素のインデックス */
 
@@ -389,7 +543,7 @@ int main(void){
                 g_connected_players++;
 
                 char msg[128];
-                snprintf(msg,sizeof(msg),"{\"type\":\"player_assigned\",\"player_number\":%d}",g_clients->array[idx].player_number);
+                snprintf(msg,sizeof(msg),"{\"type\":\"player_assigned\",\"player_number\":%d,\"binary\":1,\"delta\":1}",g_clients->array[idx].player_number);
                 safe_send(new_sd,msg,strlen(msg));
                 printf("[INFO] プレイヤー接続: %d\n",g_clients->array[idx].player_number);
                 debug_print("プレイヤー割り当てメッセージ送信: %s", msg);
@@ -402,7 +556,7 @@ int main(void){
                     free(state_json);
                 }
             }else{
-                const char *spec="{\"type\":\"spectator_assigned\"}";
+                const char *spec="{\"type\":\"spectator_assigned\",\"binary\":1,\"delta\":1}";
                 safe_send(new_sd,spec,strlen(spec));
                 puts("[INFO] 観戦者接続");
                 debug_print("観戦者割り当てメッセージ送信");